@@ -1,4 +1,7 @@
-from .models import *
-from .problems import *
-from .utils import *
-from .workers import *
+from .utils.lazy_module import lazy_module
+from . import models, problems, utils, workers
+
+# Expose the content of all packages, imported on first use (in case of name clashes, the last package wins).
+lazy_module(__name__, {name: '.' + package.__name__.split('.')[-1]
+                       for package in [models, problems, utils, workers]
+                       for name in package.__all__})
@@ -1,21 +1,86 @@
-# Sequential models.
-from .controllers import *
+from miprometheus.utils.lazy_module import lazy_module
 
-# MANN models.
-from .dnc import *
-from .dwm import *
-from .encoder_solver import *
-from .lstm import *
-from .ntm import *
-from .thalnet import *
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    # Sequential models.
+    'ControllerFactory': '.controllers',
+    'FeedforwardController': '.controllers',
+    'FFGRUStateTuple': '.controllers',
+    'FFGRUController': '.controllers',
+    'GRUStateTuple': '.controllers',
+    'GRUController': '.controllers',
+    'LSTMStateTuple': '.controllers',
+    'LSTMController': '.controllers',
+    'RNNStateTuple': '.controllers',
+    'RNNController': '.controllers',
 
-# VQA models.
-from .mac import *
-from .relational_net import *
-from .vision import *
-from .vqa_baselines import *
+    # MANN models.
+    'ControlParams': '.dnc',
+    'DNCCell': '.dnc',
+    'DNC': '.dnc',
+    'MemoryUsage': '.dnc',
+    'Param_Generator': '.dnc',
+    'plot_memory_attention': '.dnc',
+    'plot_memory': '.dnc',
+    'TemporalLinkageState': '.dnc',
+    'TemporalLinkage': '.dnc',
+    'Controller': '.dwm',
+    'DWMCellStateTuple': '.dwm',
+    'DWMCell': '.dwm',
+    'DWM': '.dwm',
+    'Interface': '.dwm',
+    'Memory': '.dwm',
+    'normalize': '.dwm',
+    'sim': '.dwm',
+    'outer_prod': '.dwm',
+    'circular_conv': '.dwm',
+    'EncoderSolverLSTM': '.encoder_solver',
+    'EncoderSolverNTM': '.encoder_solver',
+    'MAECellStateTuple': '.encoder_solver',
+    'MAECell': '.encoder_solver',
+    'MAEInterfaceStateTuple': '.encoder_solver',
+    'MAEInterface': '.encoder_solver',
+    'MAES': '.encoder_solver',
+    'MASCellStateTuple': '.encoder_solver',
+    'MASCell': '.encoder_solver',
+    'MASInterfaceStateTuple': '.encoder_solver',
+    'MASInterface': '.encoder_solver',
+    'LSTM': '.lstm',
+    'NTMCellStateTuple': '.ntm',
+    'NTMCell': '.ntm',
+    'HeadStateTuple': '.ntm',
+    'InterfaceStateTuple': '.ntm',
+    'NTMInterface': '.ntm',
+    'NTM': '.ntm',
+    'ThalNetCell': '.thalnet',
+    'ThalNetModel': '.thalnet',
+    'ThalnetModule': '.thalnet',
 
-# Other imports.
-from .model import Model
-from .model_factory import ModelFactory
-from .sequential_model import SequentialModel
+    # VQA models.
+    'ControlUnit': '.mac',
+    'ImageProcessing': '.mac',
+    'InputUnit': '.mac',
+    'MACUnit': '.mac',
+    'MACNetwork': '.mac',
+    'OutputUnit': '.mac',
+    'ReadUnit': '.mac',
+    'linear': '.mac',
+    'WriteUnit': '.mac',
+    'ConvInputModel': '.relational_net',
+    'PairwiseRelationNetwork': '.relational_net',
+    'SumOfPairsAnalysisNetwork': '.relational_net',
+    'RelationalNetwork': '.relational_net',
+    'AlexnetWrapper': '.vision',
+    'SimpleConvNet': '.vision',
+    'CNN_LSTM': '.vqa_baselines',
+    'StackedAttentionNetwork': '.vqa_baselines',
+    'StackedAttentionLayer': '.vqa_baselines',
+    'AttentionLayer': '.vqa_baselines',
+    'PretrainedImageEncoding': '.vqa_baselines',
+    'MultiHopsStackedAttentionNetwork': '.vqa_baselines',
+
+    # Other imports.
+    'Model': '.model',
+    'ModelFactory': '.model_factory',
+    'SequentialModel': '.sequential_model'
+})
@@ -1,18 +1,15 @@
-from .controller_factory import ControllerFactory
-from .feedforward_controller import FeedforwardController
-from .ffgru_controller import FFGRUStateTuple, FFGRUController
-from .gru_controller import GRUStateTuple, GRUController
-from .lstm_controller import LSTMStateTuple, LSTMController
-from .rnn_controller import RNNStateTuple, RNNController
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = [
-    'ControllerFactory',
-    'FeedforwardController',
-    'FFGRUStateTuple',
-    'FFGRUController',
-    'GRUStateTuple',
-    'GRUController',
-    'LSTMStateTuple',
-    'LSTMController',
-    'RNNStateTuple',
-    'RNNController']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'ControllerFactory': '.controller_factory',
+    'FeedforwardController': '.feedforward_controller',
+    'FFGRUStateTuple': '.ffgru_controller',
+    'FFGRUController': '.ffgru_controller',
+    'GRUStateTuple': '.gru_controller',
+    'GRUController': '.gru_controller',
+    'LSTMStateTuple': '.lstm_controller',
+    'LSTMController': '.lstm_controller',
+    'RNNStateTuple': '.rnn_controller',
+    'RNNController': '.rnn_controller'
+})
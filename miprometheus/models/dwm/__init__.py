@@ -1,19 +1,16 @@
-from .controller import Controller
-from .dwm_cell import DWMCellStateTuple, DWMCell
-from .dwm_model import DWM
-from .interface import InterfaceStateTuple, Interface
-from .memory import Memory
-from .tensor_utils import normalize, sim, outer_prod, circular_conv
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = [
-    'Controller',
-    'DWMCellStateTuple',
-    'DWMCell',
-    'DWM',
-    'InterfaceStateTuple',
-    'Interface',
-    'Memory',
-    'normalize',
-    'sim',
-    'outer_prod',
-    'circular_conv']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'Controller': '.controller',
+    'DWMCellStateTuple': '.dwm_cell',
+    'DWMCell': '.dwm_cell',
+    'DWM': '.dwm_model',
+    'InterfaceStateTuple': '.interface',
+    'Interface': '.interface',
+    'Memory': '.memory',
+    'normalize': '.tensor_utils',
+    'sim': '.tensor_utils',
+    'outer_prod': '.tensor_utils',
+    'circular_conv': '.tensor_utils'
+})
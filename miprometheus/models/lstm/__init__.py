@@ -1,3 +1,6 @@
-from .lstm_model import LSTM
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = ['LSTM']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'LSTM': '.lstm_model'
+})
@@ -72,6 +72,8 @@ class LSTM(SequentialModel):
 
         :param data_dict: DataDict containing at least:
             - "sequences": a tensor of input data of size [BATCH_SIZE x LENGTH_SIZE x INPUT_SIZE]
+            - "sequences_total_length" (optional): used to stop processing the samples which have ended \
+            (see ``SequentialModel.get_active_samples()``)
 
         :returns: Predictions (logits) being a tensor of size  [BATCH_SIZE x LENGTH_SIZE x OUTPUT_SIZE].
 
@@ -101,15 +103,24 @@ class LSTM(SequentialModel):
                 requires_grad=False).type(dtype) for _ in range(
                 self.num_layers)]
 
+        # Number of samples which have not ended yet at each step (None: all sequences have the same length).
+        active_samples = self.get_active_samples(data_dict)
+
         outputs = []
         # Process items one-by-one.
-        for item in inputs_BxSxI.chunk(inputs_BxSxI.size(1), dim=1):
-            h[0], c[0] = self.lstm_layers[0](item.squeeze(1), (h[0], c[0]))
+        for t, item in enumerate(inputs_BxSxI.chunk(inputs_BxSxI.size(1), dim=1)):
+            # Process only the active samples.
+            num_samples = batch_size if active_samples is None else active_samples[t]
+            h_t, c_t = self.narrow_state((h, c), num_samples)
+
+            h_t[0], c_t[0] = self.lstm_layers[0](item.squeeze(1)[:num_samples], (h_t[0], c_t[0]))
             for i in range(1, self.num_layers):
-                h[i], c[i] = self.lstm_layers[i](h[i - 1], (h[i], c[i]))
+                h_t[i], c_t[i] = self.lstm_layers[i](h_t[i - 1], (h_t[i], c_t[i]))
+
+            h, c = self.update_state((h, c), (h_t, c_t), num_samples)
 
-            out = self.linear(h[-1])
-            outputs += [out]
+            out = self.linear(h_t[-1])
+            outputs += [self.pad_output(out, batch_size)]
 
         outputs = torch.stack(outputs, 1)
         return outputs
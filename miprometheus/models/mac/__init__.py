@@ -1,20 +1,14 @@
-from .control_unit import ControlUnit
-from .image_encoding import ImageProcessing
-from .input_unit import InputUnit
-from .mac_unit import MACUnit
-from .model import MACNetwork
-from .output_unit import OutputUnit
-from .read_unit import ReadUnit
-from .utils_mac import linear
-from .write_unit import WriteUnit
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = [
-    'ControlUnit',
-    'ImageProcessing',
-    'InputUnit',
-    'MACUnit',
-    'MACNetwork',
-    'OutputUnit',
-    'ReadUnit',
-    'linear',
-    'WriteUnit']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'ControlUnit': '.control_unit',
+    'ImageProcessing': '.image_encoding',
+    'InputUnit': '.input_unit',
+    'MACUnit': '.mac_unit',
+    'MACNetwork': '.model',
+    'OutputUnit': '.output_unit',
+    'ReadUnit': '.read_unit',
+    'linear': '.utils_mac',
+    'WriteUnit': '.write_unit'
+})
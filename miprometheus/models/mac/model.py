@@ -50,12 +50,9 @@ model.py:
 __author__ = "Vincent Marois , Vincent Albouy"
 
 import os
-import nltk
 import torch
 import numpy as np
-from PIL import Image
 import torch.nn.functional as F
-from torchvision import transforms
 from miprometheus.models.model import Model
 
 from miprometheus.models.mac.input_unit import InputUnit
@@ -116,10 +113,6 @@ class MACNetwork(Model):
                                  'targets': {'size': [-1, self.nb_classes], 'type': [torch.Tensor]}
                                  }
 
-        # transform for the image plotting
-        self.transform = transforms.Compose(
-            [transforms.Resize([224, 224]), transforms.ToTensor()])
-
     def forward(self, data_dict, dropout=0.15):
         """
         Forward pass of the ``MAC`` network. Calls first the ``InputUnit``, then the recurrent \
@@ -232,11 +225,20 @@ class MACNetwork(Model):
         if not self.app_state.visualize:
             return False
 
+        # The plotting dependencies are only needed when the visualization is active.
+        import nltk
+        from PIL import Image
+        from torchvision import transforms
+
         # Initialize timePlot window - if required.
         if self.plotWindow is None:
             from miprometheus.utils.time_plot import TimePlot
             self.plotWindow = TimePlot()
 
+            # transform for the image plotting
+            self.transform = transforms.Compose(
+                [transforms.Resize([224, 224]), transforms.ToTensor()])
+
         # unpack data_dict
         s_questions = data_dict['questions_string']
         question_type = data_dict['questions_type']
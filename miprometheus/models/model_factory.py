@@ -70,7 +70,7 @@ class ModelFactory(object):
             logger.error("Could not find the specified class '{}' in the models package.".format(name))
             exit(-1)
 
-        # Get the actual class.
+        # Get the actual class - this imports its module (and its dependencies) on first use.
         model_class = getattr(models, name)
 
         # Check if class is derived (even indirectly) from Model.
@@ -1,6 +1,11 @@
-from .ntm_cell import NTMCellStateTuple, NTMCell
-from .ntm_interface import HeadStateTuple, InterfaceStateTuple, NTMInterface
-from .ntm_model import NTM
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = ['NTMCellStateTuple', 'NTMCell', 'HeadStateTuple',
-           'InterfaceStateTuple', 'NTMInterface', 'NTM']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'NTMCellStateTuple': '.ntm_cell',
+    'NTMCell': '.ntm_cell',
+    'HeadStateTuple': '.ntm_interface',
+    'InterfaceStateTuple': '.ntm_interface',
+    'NTMInterface': '.ntm_interface',
+    'NTM': '.ntm_model'
+})
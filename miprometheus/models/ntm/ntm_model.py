@@ -79,6 +79,8 @@ class NTM(SequentialModel):
 
         :param data_dict: DataDict containing at least:
             - "sequences": a tensor of input data of size [BATCH_SIZE x LENGTH_SIZE x INPUT_SIZE]
+            - "sequences_total_length" (optional): used to stop processing the samples which have ended \
+            (see ``SequentialModel.get_active_samples()``)
 
         :returns: Predictions (logits) being a tensor of size  [BATCH_SIZE x LENGTH_SIZE x OUTPUT_SIZE].
 
@@ -119,12 +121,23 @@ class NTM(SequentialModel):
             self.cell_state_history = []
             self.cell_state_initial = cell_state
 
+        # Number of samples which have not ended yet at each step (None: all sequences have the same length).
+        active_samples = self.get_active_samples(data_dict)
+
         # Divide sequence into chunks of size [BATCH_SIZE x INPUT_SIZE] and
         # process them one by one.
-        for input_t_Bx1xI in inputs_BxSxI.chunk(inputs_BxSxI.size(1), dim=1):
-            # Process one chunk.
-            output_BxO, cell_state = self.ntm_cell(
-                input_t_Bx1xI.squeeze(1), cell_state)
+        for t, input_t_Bx1xI in enumerate(inputs_BxSxI.chunk(inputs_BxSxI.size(1), dim=1)):
+            if active_samples is None:
+                # Process one chunk.
+                output_BxO, cell_state = self.ntm_cell(
+                    input_t_Bx1xI.squeeze(1), cell_state)
+            else:
+                # Process only the active samples - the others keep their state.
+                num_samples = active_samples[t]
+                output_NxO, cell_state_N = self.ntm_cell(
+                    input_t_Bx1xI.squeeze(1)[:num_samples], self.narrow_state(cell_state, num_samples))
+                cell_state = self.update_state(cell_state, cell_state_N, num_samples)
+                output_BxO = self.pad_output(output_NxO, batch_size)
             # Append to list of logits.
             output_logits_BxO_S += [output_BxO]
 
@@ -1,6 +1,9 @@
-from .conv_input_model import ConvInputModel
-from .functions import PairwiseRelationNetwork, SumOfPairsAnalysisNetwork
-from .relational_network import RelationalNetwork
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = ['ConvInputModel', 'PairwiseRelationNetwork',
-           'SumOfPairsAnalysisNetwork', 'RelationalNetwork']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'ConvInputModel': '.conv_input_model',
+    'PairwiseRelationNetwork': '.functions',
+    'SumOfPairsAnalysisNetwork': '.functions',
+    'RelationalNetwork': '.relational_network'
+})
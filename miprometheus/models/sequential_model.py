@@ -59,6 +59,96 @@ class SequentialModel(Model):
                                  'targets': {'size': [-1, -1, -1], 'type': [torch.Tensor]}
                                  }
 
+    def get_active_samples(self, data_dict):
+        """
+        Returns the number of samples which have not ended yet at each step of a batch of sequences of varying \
+        length, i.e. containing ``sequences_total_length`` (number of items of each sequence, before padding), \
+        sorted by decreasing length.
+
+        The models can then process only these samples at each step (see ``narrow_state()`` and \
+        ``update_state()``), i.e. do not step through the padding.
+
+        :param data_dict: DataDict containing at least "sequences".
+
+        :return: List (of length SEQ_LENGTH) of numbers of active samples, or None when all the sequences \
+        have the same length (or are not sorted).
+
+        """
+        lengths = data_dict['sequences_total_length'] if 'sequences_total_length' in data_dict else None
+        if lengths is None:
+            return None
+
+        seq_length = data_dict['sequences'].size(1)
+        lengths = lengths.cpu().view(-1)
+        if bool((lengths == seq_length).all()) or bool((lengths[1:] > lengths[:-1]).any()):
+            return None
+
+        # Number of sequences longer than each step.
+        steps = torch.arange(seq_length).view(-1, 1).type(lengths.type())
+        return (lengths.view(1, -1) > steps).sum(dim=1).tolist()
+
+    @staticmethod
+    def narrow_state(state, num_samples):
+        """
+        Returns the state of the first ``num_samples`` samples of the batch.
+
+        :param state: State: tensor, (named) tuple or list of states, or None.
+
+        :param num_samples: Number of (first) samples.
+        :type num_samples: int
+
+        :return: Narrowed state.
+
+        """
+        if torch.is_tensor(state):
+            return state[:num_samples]
+        if isinstance(state, (tuple, list)):
+            narrowed = [SequentialModel.narrow_state(s, num_samples) for s in state]
+            return type(state)(*narrowed) if hasattr(state, '_fields') else type(state)(narrowed)
+        return state
+
+    @staticmethod
+    def update_state(state, new_state, num_samples):
+        """
+        Updates the state of the first ``num_samples`` samples of the batch (the ended samples keep their state).
+
+        :param state: State of the whole batch: tensor, (named) tuple or list of states, or None.
+
+        :param new_state: New state of the first ``num_samples`` samples (of the same structure).
+
+        :param num_samples: Number of (first) samples.
+        :type num_samples: int
+
+        :return: Updated state.
+
+        """
+        if torch.is_tensor(state):
+            if num_samples == state.size(0):
+                return new_state
+            return torch.cat([new_state, state[num_samples:]], dim=0)
+        if isinstance(state, (tuple, list)):
+            updated = [SequentialModel.update_state(s, n, num_samples) for s, n in zip(state, new_state)]
+            return type(state)(*updated) if hasattr(state, '_fields') else type(state)(updated)
+        return new_state
+
+    @staticmethod
+    def pad_output(output, batch_size):
+        """
+        Pads (with zeros) the outputs of the active samples to the size of the batch.
+
+        :param output: Output of the first samples of the batch [NUM_SAMPLES x OUTPUT_SIZE].
+
+        :param batch_size: Size of the batch.
+        :type batch_size: int
+
+        :return: [BATCH_SIZE x OUTPUT_SIZE] tensor.
+
+        """
+        if output.size(0) == batch_size:
+            return output
+        padding = torch.zeros((batch_size - output.size(0),) + tuple(output.shape[1:])).type(output.type())
+        return torch.cat([output, padding], dim=0)
+
     def plot(self, data_dict, predictions, sample=0):
         """
         Creates a default interactive visualization, with a slider enabling to
@@ -1,5 +1,8 @@
-from .thalnet_cell import ThalNetCell
-from .thalnet_model import ThalNetModel
-from .thalnet_module import ThalnetModule
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = ['ThalNetCell', 'ThalNetModel', 'ThalnetModule']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'ThalNetCell': '.thalnet_cell',
+    'ThalNetModel': '.thalnet_model',
+    'ThalnetModule': '.thalnet_module'
+})
@@ -1,4 +1,7 @@
-from .alexnet_wrapper import AlexnetWrapper
-from .simple_cnn import SimpleConvNet
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = ['AlexnetWrapper', 'SimpleConvNet']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'AlexnetWrapper': '.alexnet_wrapper',
+    'SimpleConvNet': '.simple_cnn'
+})
@@ -1,2 +1,11 @@
-from .cnn_lstm import *
-from .stacked_attention_networks import *
\ No newline at end of file
+from miprometheus.utils.lazy_module import lazy_module
+
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'CNN_LSTM': '.cnn_lstm',
+    'StackedAttentionNetwork': '.stacked_attention_networks',
+    'StackedAttentionLayer': '.stacked_attention_networks',
+    'AttentionLayer': '.stacked_attention_networks',
+    'PretrainedImageEncoding': '.stacked_attention_networks',
+    'MultiHopsStackedAttentionNetwork': '.stacked_attention_networks'
+})
@@ -1,3 +1,6 @@
-from .cnn_lstm import CNN_LSTM
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = ['CNN_LSTM']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'CNN_LSTM': '.cnn_lstm'
+})
@@ -1,9 +1,46 @@
-# Imports from the different domains.
-from .image_text_to_class import *
-from .image_to_class import *
-from .seq_to_seq import *
-from .video_to_class import *
+from miprometheus.utils.lazy_module import lazy_module
 
-# Other imports.
-from .problem import Problem
-from .problem_factory import ProblemFactory
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    # Imports from the different domains.
+    'CLEVR': '.image_text_to_class',
+    'ObjectRepresentation': '.image_text_to_class',
+    'ImageTextToClassProblem': '.image_text_to_class',
+    'SortOfCLEVR': '.image_text_to_class',
+    'ShapeColorQuery': '.image_text_to_class',
+    'CIFAR10': '.image_to_class',
+    'ImageToClassProblem': '.image_to_class',
+    'MNIST': '.image_to_class',
+    'SequenceComparisonCommandLines': '.seq_to_seq',
+    'SequenceEqualityCommandLines': '.seq_to_seq',
+    'SequenceSymmetryCommandLines': '.seq_to_seq',
+    'DistractionCarry': '.seq_to_seq',
+    'DistractionForget': '.seq_to_seq',
+    'DistractionIgnore': '.seq_to_seq',
+    'InterruptionNot': '.seq_to_seq',
+    'InterruptionReverseRecall': '.seq_to_seq',
+    'InterruptionSwapRecall': '.seq_to_seq',
+    'ManipulationSpatialNot': '.seq_to_seq',
+    'ManipulationSpatialRotation': '.seq_to_seq',
+    'ManipulationTemporalSwap': '.seq_to_seq',
+    'SkipRecallCommandLines': '.seq_to_seq',
+    'OperationSpan': '.seq_to_seq',
+    'ReadingSpan': '.seq_to_seq',
+    'RepeatReverseRecallCommandLines': '.seq_to_seq',
+    'RepeatSerialRecallCommandLines': '.seq_to_seq',
+    'ReverseRecallCommandLines': '.seq_to_seq',
+    'ScratchPadCommandLines': '.seq_to_seq',
+    'SerialRecallCommandLines': '.seq_to_seq',
+    'TextToTextProblem': '.seq_to_seq',
+    'Lang': '.seq_to_seq',
+    'TranslationAnki': '.seq_to_seq',
+    'SeqToSeqProblem': '.seq_to_seq',
+    'PermutedSequentialRowMnist': '.video_to_class',
+    'SequentialPixelMNIST': '.video_to_class',
+    'VideoToClassProblem': '.video_to_class',
+
+    # Other imports.
+    'Problem': '.problem',
+    'CachedProblem': '.cached_problem',
+    'ProblemFactory': '.problem_factory'
+})
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+cached_problem.py: contains the ``CachedProblem`` wrapper, caching on disk the samples returned by \
+the ``__getitem__`` of a problem.
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+import os
+import json
+import uuid
+import socket
+import logging
+import torch
+from multiprocessing.util import Finalize
+
+from miprometheus.utils.data_dict import DataDict
+from miprometheus.utils.problems_utils.data_preparation import atomic_open, get_config_hash
+from miprometheus.utils.problems_utils.sample_store import SampleStore, SampleStoreWriter
+
+
+class CachedProblem(object):
+    """
+    Wrapper persisting the samples returned by the ``__getitem__`` of a problem (e.g. loaded images and \
+    embedded questions) into a ``SampleStore``: the first epoch fills the cache, the next ones read the samples \
+    from memory-mapped files instead of preprocessing them again.
+
+    Selected by the ``cache`` section of the configuration of the problem (see ``ProblemFactory``), e.g.:
+
+        >>> problem:
+        >>>     name: CLEVR
+        >>>     cache:
+        >>>         folder: '~/data/cache'
+        >>>         shard_size: 1024
+
+    The cache is stored in ``<folder>/<problem>_<hash>``, where the hash identifies the configuration of the \
+    problem (except its ``cache`` section): a cache filled with another configuration is never used.
+
+    Each process (e.g. ``DataLoader`` worker) writes its own shards, of (at most) ``shard_size`` samples. The \
+    shards written by the workers become visible at the next epoch (when the workers are restarted).
+
+    All the other attributes & methods are those of the wrapped problem.
+
+    .. warning::
+
+        Only meant for problems whose ``__getitem__`` is deterministic for a given index (i.e. not for the \
+        problems generating random samples, e.g. the algorithmic ones).
+
+        The samples are read one by one, i.e. ``batch_getitem`` is not used.
+
+    """
+
+    # Attributes of the wrapper (all the other ones are those of the wrapped problem).
+    _attributes = ['problem', 'cache_params', 'logger', 'path', 'store', 'writer', 'writer_pid', 'counters',
+                   'slot', 'batch_getitem']
+
+    def __init__(self, problem, params):
+        """
+        Wraps a problem & opens its cache.
+
+        :param problem: Problem.
+        :type problem: ``problems.problem.Problem``
+
+        :param params: ``cache`` section of the configuration of the problem.
+        :type params: ``utils.param_interface.ParamInterface``
+
+        """
+        self.problem = problem
+        self.cache_params = params
+        self.logger = logging.getLogger('CachedProblem')
+
+        params.add_default_params({'folder': '~/data/cache',
+                                   'shard_size': 1024})
+
+        # Path depending on the configuration of the problem.
+        config = {key: value for key, value in problem.params.to_dict().items() if key != 'cache'}
+        config_hash = get_config_hash(config)
+        self.path = os.path.join(os.path.expanduser(params['folder']),
+                                 '{}_{}'.format(problem.__class__.__name__, config_hash[:12]))
+
+        os.makedirs(self.path, exist_ok=True)
+        config_filename = os.path.join(self.path, 'config.json')
+        if not os.path.isfile(config_filename):
+            with atomic_open(config_filename, 'w') as f:
+                json.dump(config, f, sort_keys=True, default=str)
+
+        self.store = SampleStore(self.path)
+        self.logger.info('Caching the samples of {} in {} ({} samples cached)'.format(
+            problem.__class__.__name__, self.path, len(self.store)))
+
+        # Writer of the current process (created on first miss).
+        self.writer = None
+        self.writer_pid = None
+
+        # Numbers of hits & misses, per process (main process: slot 0, workers: 1+), shared with the workers.
+        self.counters = torch.zeros(64, 2, dtype=torch.int64).share_memory_()
+        self.slot = 0
+
+        self.batch_getitem = False
+
+    def __getattr__(self, name):
+        """
+        Returns the attributes of the wrapped problem.
+
+        :param name: Name of the attribute.
+        :type name: str
+
+        """
+        if name in CachedProblem._attributes:
+            # Not set yet (e.g. when unpickling).
+            raise AttributeError(name)
+        return getattr(self.problem, name)
+
+    def __setattr__(self, name, value):
+        """
+        Sets the attributes of the wrapped problem (e.g. changed by curriculum learning), except those of the \
+        wrapper.
+
+        :param name: Name of the attribute.
+        :type name: str
+
+        :param value: Value.
+
+        """
+        if name in CachedProblem._attributes:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.problem, name, value)
+
+    def __getstate__(self):
+        """
+        Drops the writer when pickling the wrapper (e.g. when sending it to ``DataLoader`` workers started with \
+        the "spawn" method), each process writes its own shards.
+
+        """
+        state = self.__dict__.copy()
+        state['writer'] = None
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restores the attributes of the wrapper when unpickling it.
+
+        :param state: Attributes (dict).
+
+        """
+        self.__dict__.update(state)
+
+    def __len__(self):
+        """
+        :return: Size of the dataset of the wrapped problem.
+
+        """
+        return len(self.problem)
+
+    def __getitem__(self, index):
+        """
+        Returns a sample, read from the cache or obtained from the wrapped problem (and then cached).
+
+        :param index: Index of the sample.
+        :type index: int
+
+        :return: ``DataDict`` (sample).
+
+        """
+        index = int(index)
+
+        if index in self.store:
+            self.counters[self.slot, 0] += 1
+            return DataDict(self.store[index])
+
+        self.counters[self.slot, 1] += 1
+        data_dict = self.problem[index]
+        self.cache(index, data_dict)
+
+        return data_dict
+
+    def cache(self, index, data_dict):
+        """
+        Writes a sample to the shard of the current process, completing the shard every ``shard_size`` samples.
+
+        :param index: Index of the sample.
+        :type index: int
+
+        :param data_dict: Sample.
+        :type data_dict: ``DataDict``
+
+        """
+        if self.writer is None or self.writer_pid != os.getpid():
+            # New shard (the writer of the parent process is not inherited by the workers).
+            shard_name = 'shard_{}_{}_{}'.format(socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+            self.writer = SampleStoreWriter(os.path.join(self.path, shard_name))
+            self.writer_pid = os.getpid()
+            # Complete the shard when the process exits (e.g. at the end of the epoch for the workers).
+            Finalize(self.writer, self.writer.close, exitpriority=10)
+
+        self.writer.append(index, data_dict)
+
+        if len(self.writer.indices) >= self.cache_params['shard_size']:
+            self.close_shard()
+
+    def close_shard(self):
+        """
+        Completes the shard of the current process (if any) & reloads the store.
+
+        """
+        if self.writer is not None and self.writer_pid == os.getpid():
+            self.writer.close()
+            self.writer = None
+            self.store = SampleStore(self.path)
+
+    def worker_init_fn(self, worker_id):
+        """
+        Sets the slot of the counters of the worker, reloads the store (e.g. with the shards written during the \
+        previous epoch) & calls the ``worker_init_fn`` of the wrapped problem.
+
+        :param worker_id: the worker id (in [0, ``torch.utils.data.dataloader.DataLoader.num_workers`` - 1])
+        :type worker_id: int
+
+        """
+        self.slot = (worker_id + 1) % self.counters.shape[0]
+        self.writer = None
+        self.store = SampleStore(self.path)
+
+        return self.problem.worker_init_fn(worker_id)
+
+    def initialize_epoch(self, epoch):
+        """
+        Reloads the store, resets the counters & calls the ``initialize_epoch`` of the wrapped problem.
+
+        :param epoch: current epoch index
+        :type epoch: int
+
+        """
+        self.store = SampleStore(self.path)
+        self.counters.zero_()
+
+        self.problem.initialize_epoch(epoch)
+
+    def finalize_epoch(self, epoch):
+        """
+        Completes the shard of the main process & calls the ``finalize_epoch`` of the wrapped problem.
+
+        :param epoch: current epoch index
+        :type epoch: int
+
+        """
+        self.close_shard()
+
+        self.problem.finalize_epoch(epoch)
+
+    def get_hit_rate(self):
+        """
+        :return: Ratio of the samples read from the cache (since the beginning of the epoch).
+
+        """
+        hits, misses = self.counters.sum(dim=0).tolist()
+        return hits / max(1, hits + misses)
+
+    def add_statistics(self, stat_col):
+        """
+        Adds the statistics of the wrapped problem & the cache hit rate to a ``StatisticsCollector``.
+
+        :param stat_col: ``StatisticsCollector``.
+
+        """
+        self.problem.add_statistics(stat_col)
+        stat_col.add_statistic('cache_hit_rate', '{:4.3f}')
+
+    def collect_statistics(self, stat_col, data_dict, logits):
+        """
+        Collects the statistics of the wrapped problem & the cache hit rate.
+
+        :param stat_col: ``StatisticsCollector``.
+
+        :param data_dict: ``DataDict`` containing inputs and targets.
+
+        :param logits: Predictions of the model.
+
+        """
+        self.problem.collect_statistics(stat_col, data_dict, logits)
+        stat_col['cache_hit_rate'] = self.get_hit_rate()
+
+    def add_aggregators(self, stat_agg):
+        """
+        Adds the aggregators of the wrapped problem & the cache hit rate to a ``StatisticsAggregator``.
+
+        :param stat_agg: ``StatisticsAggregator``.
+
+        """
+        self.problem.add_aggregators(stat_agg)
+        stat_agg.add_aggregator('cache_hit_rate', '{:4.3f}')
+
+    def aggregate_statistics(self, stat_col, stat_agg):
+        """
+        Aggregates the statistics of the wrapped problem & the cache hit rate.
+
+        :param stat_col: ``StatisticsCollector``.
+
+        :param stat_agg: ``StatisticsAggregator``.
+
+        """
+        self.problem.aggregate_statistics(stat_col, stat_agg)
+        stat_agg['cache_hit_rate'] = self.get_hit_rate()
@@ -1,6 +1,10 @@
-from .clevr import CLEVR
-from .image_text_to_class_problem import ObjectRepresentation, ImageTextToClassProblem
-from .sort_of_clevr import SortOfCLEVR
-from .shape_color_query import ShapeColorQuery
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = ['CLEVR', 'ObjectRepresentation', 'ImageTextToClassProblem', 'SortOfCLEVR', 'ShapeColorQuery']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'CLEVR': '.clevr',
+    'ObjectRepresentation': '.image_text_to_class_problem',
+    'ImageTextToClassProblem': '.image_text_to_class_problem',
+    'SortOfCLEVR': '.sort_of_clevr',
+    'ShapeColorQuery': '.shape_color_query'
+})
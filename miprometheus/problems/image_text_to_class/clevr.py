@@ -46,7 +46,6 @@
 """
 __author__ = "Vincent Marois"
 
-import matplotlib.pyplot as plt
 from torch.utils.data import DataLoader
 
 import torch
@@ -58,6 +57,9 @@ from PIL import Image
 from torchvision.transforms import ToTensor
 
 from miprometheus.utils.problems_utils.language import Language
+from miprometheus.utils.problems_utils.data_preparation import file_lock, atomic_open, prepare_artefact
+from miprometheus.utils.problems_utils.feature_store import FeatureStore
+from miprometheus.utils.problems_utils.question_store import QuestionStore
 from miprometheus.utils.data_dict import DataDict
 
 from miprometheus.problems.image_text_to_class.image_text_to_class_problem import ImageTextToClassProblem
@@ -124,6 +126,8 @@ class CLEVR(ImageTextToClassProblem):
             - ``raw_images``: whether or not to use to the original images as the visual source. If ``False``, then
               ``feature_extractor`` cannot be empty. The visual source will then be features extracted fron the\
                original images using a specified pretrained CNN.
+            - ``image_cache_size``: In the case of the original images, maximum size (in MB) of the cache of \
+            decoded images shared by the ``DataLoader`` workers (optional, disabled by default).
             - ``cnn_model`` : In the case of features extracted from the original images, the specific CNN model to\
             use. Must be part of ``torchvision.models``.
             - ``num_blocks``: In the case of features extracted from the original images, this represents the number\
@@ -133,6 +137,19 @@ class CLEVR(ImageTextToClassProblem):
 
                     This is not verified in any way by this class.
 
+            - ``dtype``: In the case of features extracted from the original images, the type of the stored\
+            features: ``float32`` (default) or ``float16`` (halves the size of the feature store).
+            - ``batch_size``: Number of images passed at once through ``cnn_model`` when extracting the features\
+            (default: 64).
+            - ``num_workers``: Number of processes loading & decoding the images during the extraction (default: 4).
+            - ``num_threads``: Number of threads used by ``torch`` when extracting the features on CPU (default:\
+            the number of CPUs not used by the ``num_workers`` processes).
+
+            .. note::
+
+                The extraction is checkpointed regularly: if interrupted, it resumes where it stopped the next time \
+                the problem is instantiated.
+
         - `questions`:
 
             - ``embedding_type``: string to indicate the pretrained embedding to use: either "random" to use\
@@ -152,6 +169,9 @@ class CLEVR(ImageTextToClassProblem):
                     - "glove.6B.200d",
                     - "glove.6B.300d"
 
+                The vectors of the words of the questions are extracted once from the pretrained embedding and \
+                stored in ``data_folder/generated_files``: the next instances memory-map this restricted matrix.
+
             - ``embedding_dim``: In the case of a random ``embedding_type``, this is the embedding dimension to use.
 
 
@@ -182,6 +202,7 @@ class CLEVR(ImageTextToClassProblem):
                                  'questions_length': {'size': [-1], 'type': [list, int]},
                                  'questions_string': {'size': [-1, -1], 'type': [list, str]},
                                  'questions_type': {'size': [-1, -1], 'type': [list, str]},
+                                 'questions_family': {'size': [-1], 'type': [torch.Tensor]},
                                  'targets': {'size': [-1], 'type': [torch.Tensor]},
                                  'targets_string': {'size': [-1, -1], 'type': [list, str]},
                                  'index': {'size': [-1], 'type': [list, int]},
@@ -204,9 +225,14 @@ class CLEVR(ImageTextToClassProblem):
             'equal_integer': 'compare_integer',
             'query_material': 'query_attribute'}
 
-        # for storing the number of correct predictions & total number of questions per category
-        self.tuple_list = [[0, 0] for _ in range(len(self.categories .keys()))]
-        self.categories_stats = dict(zip(self.categories .keys(), self.tuple_list))
+        # index the families & categories, and map each family to its category
+        self.family_names = list(self.categories.keys())
+        self.category_names = ['query_attribute', 'compare_integer', 'count', 'compare_attribute', 'exist']
+        self.family_to_category = torch.LongTensor([self.category_names.index(self.categories[family])
+                                                    for family in self.family_names])
+
+        # for storing the number of correct predictions & total number of questions per family
+        self.initialize_epoch(0)
 
         # problem name
         self.name = 'CLEVR'
@@ -217,88 +243,105 @@ class CLEVR(ImageTextToClassProblem):
         if not os.path.isdir(os.path.join(self.data_folder, 'generated_files')):
             self.logger.warning('Folder {} not found, creating it.'.format(os.path.join(self.data_folder,
                                                                                         'generated_files')))
-            os.mkdir(os.path.join(self.data_folder, 'generated_files'))
+            # Other processes might be creating it at the same time.
+            os.makedirs(os.path.join(self.data_folder, 'generated_files'), exist_ok=True)
 
         # check if the folder containing the images feature maps (processed by self.cnn_model) exists or not
         # For the same self.set, this file is the same for CLEVR & CLEVR-Humans
         # It will be different for CLEVR-CoGenT
         if not params['images']['raw_images']:
-            if not os.path.isdir(os.path.join(self.data_folder, 'generated_files', self.cnn_model, self.set)):
-                self.logger.warning('Directory {} not found on disk, extracting the features for each image and storing'
-                                    ' them here.'.format(os.path.join(self.data_folder, 'generated_files', self.cnn_model, self.set)))
-                self.generate_feature_maps_file()
-
-        # check if the file containing the tokenized questions (& answers, image filename, type etc.) exists or not
-        questions_filename = os.path.join(self.data_folder, 'generated_files', '{}_{}_questions.pkl'.format(self.set, self.dataset))
-        if os.path.isfile(questions_filename):
-            self.logger.info('The file {} already exists, loading it.'.format(questions_filename))
-
-            # load questions
-            with open(questions_filename, 'rb') as questions:
-                self.data = pickle.load(questions)
-
-            # load word_dic & answer_dic
-            with open(os.path.join(self.data_folder, 'generated_files', '{}_dics.pkl'.format(self.dataset)), 'rb') as f:
-                dic = pickle.load(f)
-                self.answer_dic = dic['answer_dic']
-                self.word_dic = dic['word_dic']
-
-        else:  # The file doesn't exist: Process the questions
-            self.logger.warning('File {} not found on disk, processing the questions.'.format(questions_filename))
-
-            # We need to ensure that we use the same words & answers dicts for both train & val, otherwise we do not
-            # have the same reference.
-            if self.set == 'val' or self.set == 'valA' or self.set == 'valB':  # handle CoGenT
-                # first generate the words dic using the training samples
-                self.logger.warning('We need to ensure that we use the same words-to-index & answers-to-index dictionaries '
-                               'for both the train & val samples.')
-                self.logger.warning('First, generating the words-to-index & answers-to-index dictionaries from '
-                               'the training samples :')
-                _, self.word_dic, self.answer_dic = self.generate_questions_dics('train' if self.set == 'val' else 'trainA',
-                                                                                 word_dic=None, answer_dic=None)
+            if not FeatureStore.exists(self.image_source):
+                self.logger.warning('Feature store {} not found on disk, extracting the features of the images and '
+                                    'storing them here.'.format(self.image_source))
+            # Only one process creates the feature store, the other ones wait for it.
+            prepare_artefact(self.image_source, self.generate_feature_store, logger=self.logger, resumable=True)
 
-                # then tokenize the questions using the created dictionaries from the training samples
-                self.logger.warning('We can now tokenize the validation questions using the dictionaries created from '
-                                    'the training samples')
-                self.data, self.word_dic, self.answer_dic = self.generate_questions_dics(self.set,
-                                                                                         word_dic=self.word_dic,
-                                                                                         answer_dic=self.answer_dic)
+            # The features are memory-mapped on first access, i.e. in each DataLoader worker.
+            self.feature_store = FeatureStore(self.image_source)
 
-            elif self.set == 'train' or self.set == 'trainA':  # Can directly tokenize the questions
-                self.data, self.word_dic, self.answer_dic = self.generate_questions_dics(self.set, word_dic=None, answer_dic=None)
-
-        # --> At this point, self.data contains the processed questions
-        self.length = len(self.data)
-
-        # create the objects for the specified embeddings
+        else:
+            # the decoded images can be cached in shared memory (the feature maps do not need it: the feature store
+            # is already shared by the workers through the page cache).
+            self.create_image_cache(params['images'], shape=[3, 320, 480])
+
+        # check if the store containing the tokenized questions (& answers, image ids, types etc.) exists or not
+        questions_path = os.path.join(self.data_folder, 'generated_files', '{}_{}_questions'.format(self.set, self.dataset))
+        dics_filename = os.path.join(self.data_folder, 'generated_files', '{}_dics.pkl'.format(self.dataset))
+        if not QuestionStore.exists(questions_path):
+            self.logger.warning('Store {} not found on disk, processing the questions.'.format(questions_path))
+
+            # The words & answers dics are shared by all sets of the dataset variant: only one process at a time
+            # can process the questions.
+            with file_lock(dics_filename, self.logger):
+                if QuestionStore.exists(questions_path):
+                    self.logger.info('The questions were processed by another process.')
+                elif os.path.isfile(questions_path + '.pkl'):
+                    # questions processed by a previous version, stored as a list of dicts.
+                    self.migrate_questions_file(questions_path + '.pkl', questions_path)
+                else:
+                    self.process_questions(dics_filename)
+
+        self.logger.info('Loading the processed questions from {}.'.format(questions_path))
+
+        # the columns of the store are memory-mapped on first access, i.e. in each DataLoader worker.
+        self.question_store = QuestionStore(questions_path)
+
+        # load word_dic & answer_dic
+        with open(dics_filename, 'rb') as f:
+            dic = pickle.load(f)
+            self.answer_dic = dic['answer_dic']
+            self.word_dic = dic['word_dic']
+
+        # --> At this point, self.question_store contains the processed questions
+        self.length = len(self.question_store)
+
+        # family index of each question (-1 if unknown - the last entry is selected by the type id -1)
+        type_to_family = np.array([self.family_names.index(type_name) if type_name in self.family_names else -1
+                                   for type_name in self.question_store.type_names] + [-1], dtype=np.int64)
+        self.questions_family = type_to_family[self.question_store.type_ids]
+
+        # inverse look-up table of the answers: index -> answer
+        self.answer_strings = np.empty(len(self.answer_dic), dtype=object)
+        for answer, answer_index in self.answer_dic.items():
+            self.answer_strings[answer_index] = answer
+
+        # create the embedding look-up table: [len(word_dic) + 1, embedding_dim], row 0 (padding) being zeros.
+        self.n_vocab = len(self.word_dic)+1
         if self.embedding_type == 'random':
             self.logger.info('Constructing random embeddings using a uniform distribution')
-            # instantiate nn.Embeddings look-up-table with specified embedding_dim
-            self.n_vocab = len(self.word_dic)+1
-            self.embed_layer = torch.nn.Embedding(num_embeddings=self.n_vocab, embedding_dim=self.embedding_dim)
 
             # we have to make sure that the weights are the same during training and validation
             weights_filepath = os.path.join(self.data_folder, 'generated_files', '{}_embedding_weights.pkl'.format(self.dataset))
-            if os.path.isfile(weights_filepath):
-                self.logger.info('Found random embedding weights on file, using them.')
-                with open(weights_filepath, 'rb') as f:
-                    self.embed_layer.weight.data = pickle.load(f)
-            else:
+
+            def save_embedding_weights(filepath):
                 self.logger.warning('No weights found on file for random embeddings. Initializing them from a Uniform '
                                     'distribution and saving to file in {}'.format(weights_filepath))
-                self.embed_layer.weight.data.uniform_(0, 1)
-                with open(weights_filepath, 'wb') as f:
-                    pickle.dump(self.embed_layer.weight.data, f)
+                self.embedding_weights = torch.FloatTensor(self.n_vocab, self.embedding_dim).uniform_(0, 1)
+                with open(filepath, 'wb') as f:
+                    pickle.dump(self.embedding_weights, f)
+
+            if not prepare_artefact(weights_filepath, save_embedding_weights, logger=self.logger):
+                self.logger.info('Found random embedding weights on file, using them.')
+                with open(weights_filepath, 'rb') as f:
+                    self.embedding_weights = pickle.load(f)
 
         else:
             self.logger.info('Constructing embeddings using {}'.format(self.embedding_type))
             # instantiate Language class
             self.language = Language('lang')
-            self.questions = [q['string_question'] for q in self.data]
-            # use the questions set to construct the embeddings vectors
-            self.language.build_pretrained_vocab(self.questions, vectors=self.embedding_type)
+            # use the words dictionary to construct the embeddings vectors
+            words = sorted(self.word_dic.keys(), key=lambda word: self.word_dic[word])
+            self.language.build_pretrained_vocab(words, cache_folder=os.path.join(self.data_folder, 'generated_files'),
+                                                 vectors=self.embedding_type)
+
+            self.embedding_weights = torch.zeros(self.n_vocab, self.embedding_dim)
+            self.embedding_weights[torch.LongTensor([self.word_dic[word] for word in words])] = \
+                self.language.embed_words(words)
 
-        # Done! The actual question embedding is handled in __getitem__.
+        self.embedding_weights = self.embedding_weights.detach()
+        self.embedding_weights[0] = 0
+
+        # Done! The questions are embedded by batch in collate_fn.
 
     def parse_param_tree(self, params):
         """
@@ -354,7 +397,11 @@ class CLEVR(ImageTextToClassProblem):
                                                                              "no parameters in 'feature_extractor'."
             # passed, so can continue parsing params
             self.cnn_model = params['images']['feature_extractor']['cnn_model']
-            self.image_source = os.path.join(self.data_folder, 'generated_files', self.cnn_model, self.set)
+            self.feature_dtype = params['images']['feature_extractor'].get('dtype', 'float32')
+            assert self.feature_dtype in ['float32', 'float16'], "The type of the extracted features must be " \
+                                                                 "'float32' or 'float16', got {}".format(self.feature_dtype)
+            self.image_source = os.path.join(self.data_folder, 'generated_files', self.cnn_model,
+                                             '{}_features_{}'.format(self.set, self.feature_dtype))
 
             import torchvision as vision
             assert self.cnn_model in dir(vision.models), "Did not find specified cnn_model in torchvision.models." \
@@ -362,6 +409,12 @@ class CLEVR(ImageTextToClassProblem):
             # this is too complex to check, not doing it.
             self.num_blocks = params['images']['feature_extractor']['num_blocks']
 
+            # parameters of the extraction pipeline.
+            self.extraction_batch_size = params['images']['feature_extractor'].get('batch_size', 64)
+            self.extraction_num_workers = params['images']['feature_extractor'].get('num_workers', 4)
+            self.extraction_num_threads = params['images']['feature_extractor'].get(
+                'num_threads', max(1, (os.cpu_count() or 1) - self.extraction_num_workers))
+
         # get the questions parameters:
         self.embedding_type = params['questions']['embedding_type']
         embedding_types = ["random", "charngram.100d", "fasttext.en.300d", "fasttext.simple.300d", "glove.42B.300d",
@@ -377,12 +430,63 @@ class CLEVR(ImageTextToClassProblem):
                 type(self.embedding_dim))
 
         else:
-            self.embedding_dim = int(self.embedding_type[:-4])
+            # e.g. 'glove.6B.300d' -> 300
+            self.embedding_dim = int(self.embedding_type.split('.')[-1][:-1])
+
+    def process_questions(self, dics_filename):
+        """
+        Processes the questions of the current set, i.e. tokenizes them and creates (or extends) the words & \
+        answers dics, using ``generate_questions_dics()``.
+
+        .. warning::
+
+            Must be called while holding the lock on the dics file, as the processing of the validation questions \
+            reuses (and extends) the dics of the training set.
+
+        :param dics_filename: Path to the file containing the words & answers dics.
+        :type dics_filename: str
+
+        """
+        # We need to ensure that we use the same words & answers dicts for both train & val, otherwise we do not
+        # have the same reference.
+        if self.set == 'val' or self.set == 'valA' or self.set == 'valB':  # handle CoGenT
+            train_set = 'train' if self.set == 'val' else 'trainA'
+            train_questions_path = os.path.join(self.data_folder, 'generated_files',
+                                                '{}_{}_questions'.format(train_set, self.dataset))
+
+            self.logger.warning('We need to ensure that we use the same words-to-index & answers-to-index dictionaries '
+                                'for both the train & val samples.')
+            if (QuestionStore.exists(train_questions_path) or os.path.isfile(train_questions_path + '.pkl')) and \
+                    os.path.isfile(dics_filename):
+                # the training samples were already processed: reuse their dictionaries.
+                self.logger.warning('Using the words-to-index & answers-to-index dictionaries from {}'.format(
+                    dics_filename))
+                with open(dics_filename, 'rb') as f:
+                    dic = pickle.load(f)
+                word_dic, answer_dic = dic['word_dic'], dic['answer_dic']
+            else:
+                # first generate the words dic using the training samples
+                self.logger.warning('First, generating the words-to-index & answers-to-index dictionaries from '
+                                    'the training samples :')
+                _, word_dic, answer_dic = self.generate_questions_dics(train_set, word_dic=None, answer_dic=None)
+
+            # then tokenize the questions using the created dictionaries from the training samples
+            self.logger.warning('We can now tokenize the validation questions using the dictionaries created from '
+                                'the training samples')
+            self.generate_questions_dics(self.set, word_dic=word_dic, answer_dic=answer_dic)
+
+        elif self.set == 'train' or self.set == 'trainA':  # Can directly tokenize the questions
+            self.generate_questions_dics(self.set, word_dic=None, answer_dic=None)
 
     def generate_questions_dics(self, set, word_dic=None, answer_dic=None):
         """
         Loads the questions from the .json file, tokenize them, creates vocab dics and save that to files.
 
+        .. note::
+
+            The questions are tokenized by a pool of processes. The dics are then built sequentially, so that the \
+            words & answers indexes do not depend on the number of processes.
+
         :param set: String to specify which dataset to use: ``train``, ``val`` (``test`` not handled yet.)
         :type set: str
 
@@ -396,13 +500,13 @@ class CLEVR(ImageTextToClassProblem):
 
         :return:
 
-            - A dict, containing for each question:
+            - A ``QuestionStore``, containing for each question:
 
                 - The tokenized question,
                 - The answer,
                 - The original question string,
-                - The original path to the associated image
-                - The question type
+                - The original image filename & id,
+                - The question type.
 
             - The word_dic
             - The answer_dic
@@ -418,6 +522,7 @@ class CLEVR(ImageTextToClassProblem):
         import json
         import tqdm
         import nltk
+        from multiprocessing import Pool
         nltk.download('punkt')  # needed for nltk.word.tokenize
 
         # load questions from the .json file
@@ -432,102 +537,255 @@ class CLEVR(ImageTextToClassProblem):
         with open(os.path.join(self.data_folder, 'questions/index_to_family.json')) as f:
             index_to_family = json.load(f)
 
+        # tokenize the questions in parallel
+        self.logger.info('Tokenizing the {} {} questions'.format(self.dataset, set))
+        strings = [question['question'] for question in data['questions']]
+        with Pool() as pool:
+            words = list(tqdm.tqdm(pool.imap(nltk.word_tokenize, strings, chunksize=1000), total=len(strings),
+                                   unit=" questions", unit_scale=True, unit_divisor=1000))
+
         # start constructing vocab sets
-        result = []
-        word_index = 1  # 0 reserved for padding
-        answer_index = 0
+        word_index = len(word_dic) + 1  # 0 reserved for padding
+        answer_index = len(answer_dic)
 
         self.logger.info('Constructing {} {} words dictionary:'.format(self.dataset, set))
-        # progress bar
-        t = tqdm.tqdm(total=len(data['questions']), unit=" questions", unit_scale=True, unit_divisor=1000)  # Initialize
-        for question in data['questions']:
-            words = nltk.word_tokenize(question['question'])
+        tokens = []
+        answers = []
+        for question, question_words in zip(data['questions'], words):
             question_token = []
-
-            for word in words:
-                try:
-                    question_token.append(word_dic[word])
-                except:
-                    question_token.append(word_index)
+            for word in question_words:
+                if word not in word_dic:
                     word_dic[word] = word_index
                     word_index += 1
+                question_token.append(word_dic[word])
+            tokens.append(question_token)
 
             answer_word = question['answer']
-            try:
-                answer = answer_dic[answer_word]
-            except:
-                answer = answer_index
+            if answer_word not in answer_dic:
                 answer_dic[answer_word] = answer_index
                 answer_index += 1
+            answers.append(answer_dic[answer_word])
 
-            # save sample params as a dict.
-            try:
-                question_type = index_to_family[str(question['question_family_index'])]
-            except:
-                question_type = None
-
-            result.append({'tokenized_question': question_token, 'answer': answer,
-                           'string_question': question['question'], 'imgfile': question['image_filename'],
-                           'question_type': question_type})
-            t.update()
-        t.close()
+        imgfiles = [question['image_filename'] for question in data['questions']]
+        types = [index_to_family.get(str(question.get('question_family_index'))) for question in data['questions']]
 
         self.logger.info('Done: constructed words dictionary of length {}, and answers dictionary of length {}'.format(len(word_dic),
                                                                                                             len(answer_dic)))
-        # save result to file
-        questions_filename = os.path.join(self.data_folder, 'generated_files', '{}_{}_questions.pkl'.format(self.set, self.dataset))
-        with open(questions_filename, 'wb') as f:
-            pickle.dump(result, f)
-
-        self.logger.warning('Saved tokenized questions to file {}.'.format(questions_filename))
-
-        # save dictionaries to file:
-        with open(os.path.join(self.data_folder, 'generated_files', '{}_dics.pkl'.format(self.dataset)), 'wb') as f:
+        # save dictionaries to file (before the questions, which signal that the set was processed):
+        with atomic_open(os.path.join(self.data_folder, 'generated_files', '{}_dics.pkl'.format(self.dataset))) as f:
             pickle.dump({'word_dic': word_dic, 'answer_dic': answer_dic}, f)
+
         self.logger.warning('Saved dics to file {}.'.format(os.path.join(self.data_folder, 'generated_files', '{}_dics.pkl'.format(self.dataset))))
 
+        # save result to the questions store
+        questions_path = os.path.join(self.data_folder, 'generated_files', '{}_{}_questions'.format(set, self.dataset))
+        result = self.save_question_store(questions_path, tokens, answers, strings, imgfiles, types)
+
+        self.logger.warning('Saved tokenized questions to {}.'.format(questions_path))
+
         # return everything
         return result, word_dic, answer_dic
 
-    def generate_feature_maps_file(self):
+    def save_question_store(self, path, tokens, answers, questions, imgfiles, types):
         """
-        Uses GenerateFeatureMaps to pass the ``CLEVR`` images through a pretrained CNN model.
+        Creates a ``QuestionStore`` (under a temporary name, then atomically renamed).
+
+        :param path: Path to the directory of the store.
+        :type path: str
+
+        :param tokens: Tokenized questions (list of lists of word indexes).
+        :type tokens: list
+
+        :param answers: Answer indexes.
+        :type answers: list
+
+        :param questions: Original question strings.
+        :type questions: list
+
+        :param imgfiles: Image filenames.
+        :type imgfiles: list
+
+        :param types: Question types (None if unknown).
+        :type types: list
+
+        :return: ``QuestionStore``.
+
+        """
+        image_ids = [int(imgfile.rsplit('_', 1)[1][:-4]) for imgfile in imgfiles]
+
+        prepare_artefact(path, lambda tmp_path: QuestionStore.create(tmp_path, tokens, answers, image_ids, types,
+                                                                     strings={'questions': questions,
+                                                                              'imgfiles': imgfiles}),
+                         regenerate=True, logger=self.logger)
+        return QuestionStore(path)
+
+    def migrate_questions_file(self, questions_filename, path):
+        """
+        Converts the questions processed by a previous version (stored in a ``.pkl`` file as a list of dicts) \
+        into a ``QuestionStore``.
+
+        :param questions_filename: Path to the ``.pkl`` file.
+        :type questions_filename: str
+
+        :param path: Path to the directory of the store.
+        :type path: str
+
+        """
+        self.logger.warning('Converting the questions stored in {} into {}'.format(questions_filename, path))
+        with open(questions_filename, 'rb') as f:
+            data = pickle.load(f)
+
+        self.save_question_store(path, tokens=[q['tokenized_question'] for q in data],
+                                 answers=[q['answer'] for q in data], questions=[q['string_question'] for q in data],
+                                 imgfiles=[q['imgfile'] for q in data], types=[q['question_type'] for q in data])
+
+        self.logger.warning('Questions successfully converted, the file {} can be removed.'.format(questions_filename))
+
+    def generate_feature_store(self, dir):
+        """
+        Creates the ``FeatureStore`` containing the features maps of the images of the current set:
+
+            - If the feature maps were previously extracted into individual files (one ``.pt`` file per image, \
+            stored in ``generated_files/<cnn_model>/<set>``), they are packed into the store,
+            - Otherwise, they are extracted from the images using ``generate_feature_maps_file()``.
+
+        :param dir: Directory of the feature store.
+        :type dir: str
+
+        """
+        files_dir = os.path.join(self.data_folder, 'generated_files', self.cnn_model, self.set)
+        if os.path.isdir(files_dir):
+            self.migrate_feature_maps_files(files_dir, dir)
+        else:
+            self.generate_feature_maps_file(dir)
+
+    def migrate_feature_maps_files(self, files_dir, dir):
+        """
+        Packs the feature maps previously extracted into individual ``.pt`` files into a ``FeatureStore``.
+
+        :param files_dir: Directory containing the ``.pt`` files.
+        :type files_dir: str
+
+        :param dir: Directory of the feature store.
+        :type dir: str
+
+        """
+        import tqdm
+
+        self.logger.warning('Packing the feature maps stored in {} into {}'.format(files_dir, dir))
+
+        # filenames follow the template <CLEVR|CLEVR-CoGenT>_<set>_<image id>.pt
+        filenames = [f for f in os.listdir(files_dir) if f.endswith('.pt')]
+        image_ids = [int(f.rsplit('_', 1)[1][:-3]) for f in filenames]
+
+        if not filenames:
+            # Nothing to pack: extract the feature maps from the images instead.
+            self.logger.warning('No feature maps found in {}, extracting them from the images.'.format(files_dir))
+            self.generate_feature_maps_file(dir)
+            return
+
+        store = None
+        for image_id, filename in tqdm.tqdm(sorted(zip(image_ids, filenames)), unit="images"):
+            with open(os.path.join(files_dir, filename), 'rb') as f:
+                # stored with the batch dimension (of size 1)
+                features = torch.load(f)[0]
+
+            if store is None:
+                store = FeatureStore.create(dir, image_ids, features.shape, dtype=self.feature_dtype)
+                store_features = store.writable_features()
+
+            store_features[store.get_rows(image_id)] = features
+
+        store_features.flush()
+        self.logger.warning('Feature maps successfully packed, the directory {} can be removed.'.format(files_dir))
+
+    def generate_feature_maps_file(self, dir):
+        """
+        Uses GenerateFeatureMaps to pass the ``CLEVR`` images through a pretrained CNN model (by batches, the \
+        images being decoded by ``DataLoader`` workers), and writes the extracted feature maps into a \
+        ``FeatureStore``.
+
+        The number of extracted images is regularly saved in ``<dir>/progress.txt`` (after flushing the \
+        features): an interrupted extraction is resumed from the last checkpoint.
+
+        :param dir: Directory of the (partial) feature store.
+        :type dir: str
 
         """
         # import lines
         from miprometheus.utils.problems_utils.generate_feature_maps import GenerateFeatureMaps
-        from torch.utils.data import DataLoader
+        from torch.utils.data import DataLoader, Subset
         import tqdm
         from torchvision import transforms
 
-        # create DataLoader of the images dataset.
+        # create the images dataset.
         dataset = GenerateFeatureMaps(image_dir=os.path.join(self.data_folder, 'images', self.set), set=self.set,
                                       cnn_model=self.cnn_model, num_blocks=self.num_blocks,
                                       transform=transforms.Compose([transforms.Resize([224, 224]), transforms.ToTensor(),
                                                                     transforms.Normalize(mean=[0.485, 0.456, 0.406],
                                                                                          std=[0.229, 0.224, 0.225])]),
                                       filename_template='CLEVR_{}_{}.png'.format(self.set, '{}'))
-        dataloader = DataLoader(dataset, batch_size=1, shuffle=False)
-
-        size = len(dataloader)
-        dataloader = iter(dataloader)
-        pbar = tqdm.tqdm(dataloader, total=size, unit="images")
-
-        # create the folder where the extracted features maps will be stored
-        if not os.path.isdir(os.path.join(self.data_folder, 'generated_files', self.cnn_model, self.set)):
-            os.makedirs(os.path.join(self.data_folder, 'generated_files', self.cnn_model, self.set))
-
-        dir = os.path.join(self.data_folder, 'generated_files', self.cnn_model, self.set)
-
-        with torch.no_grad():
-            for i, image in enumerate(pbar):
-                image = image.type(self.app_state.dtype)
-
-                # forward pass, move output to cpu and store it into the file.
-                features = dataset.model(image).detach().cpu().numpy()
-                with open(os.path.join(dir, '{}_{}_{}.pt'.format('CLEVR-CoGenT' if self.dataset=='CLEVR-CoGenT' else 'CLEVR', self.set, str(i).zfill(6))), 'wb') as f:
-                    torch.save(features, f)
 
+        # resume from the last checkpoint if any.
+        progress_file = os.path.join(dir, 'progress.txt')
+        store = None
+        start = 0
+        if FeatureStore.exists(dir) and os.path.isfile(progress_file):
+            with open(progress_file, 'r') as f:
+                start = int(f.read())
+            store = FeatureStore(dir)
+            store_features = store.writable_features()
+            self.logger.warning('Resuming the extraction of the features from image {}/{}'.format(start, len(dataset)))
+
+        def checkpoint(num_extracted):
+            # the features are flushed before the progress is saved.
+            store_features.flush()
+            with atomic_open(progress_file, 'w') as f:
+                f.write(str(num_extracted))
+
+        # create DataLoader of the remaining images.
+        dataloader = DataLoader(Subset(dataset, range(start, len(dataset))), batch_size=self.extraction_batch_size,
+                                shuffle=False, num_workers=self.extraction_num_workers,
+                                pin_memory=torch.cuda.is_available())
+
+        # checkpoint every ~1000 images.
+        checkpoint_interval = max(1, 1000 // self.extraction_batch_size)
+
+        num_threads = torch.get_num_threads()
+        if not torch.cuda.is_available():
+            torch.set_num_threads(self.extraction_num_threads)
+
+        pbar = tqdm.tqdm(total=len(dataset), initial=start, unit="images")
+        i = start
+        try:
+            with torch.no_grad():
+                for batch_index, images in enumerate(dataloader):
+                    images = images.type(self.app_state.dtype)
+
+                    # forward pass, move output to cpu and store it into the feature store.
+                    features = dataset.model(images).detach().cpu().numpy()
+
+                    if store is None:
+                        # the images are indexed from 0 to len(dataset) - 1.
+                        store = FeatureStore.create(dir, np.arange(len(dataset)), features.shape[1:],
+                                                    dtype=self.feature_dtype)
+                        store_features = store.writable_features()
+
+                    store_features[i:i + len(features)] = features
+                    i += len(features)
+                    pbar.update(len(features))
+
+                    if (batch_index + 1) % checkpoint_interval == 0:
+                        checkpoint(i)
+        finally:
+            pbar.close()
+            torch.set_num_threads(num_threads)
+            if store is not None and i > start:
+                checkpoint(i)
+
+        # the store is complete.
+        if os.path.isfile(progress_file):
+            os.remove(progress_file)
         self.logger.warning('Features successfully extracted and stored in {}.'.format(dir))
 
     def __getitem__(self, index):
@@ -540,40 +798,41 @@ class CLEVR(ImageTextToClassProblem):
         'targets_string', 'index','imgfiles'}), with:
 
             - images: extracted feature maps from the raw image
-            - questions: tensor of word indexes
+            - questions: tensor of word indexes (embedded in ``collate_fn``)
             - questions_length: len(question)
             - questions_string: original question string
             - questions_type: category of the question (query, count...)
+            - questions_family: index of the family of the question (-1 if unknown)
             - targets: index of the answer in the answers dictionary
             - targets_string: None for now
             - index: index of the sample
             - imgfiles: image filename
 
         """
-        # load tokenized_question, answer, string_question, image_filename from self.data
-        question, answer, question_string, imgfile, question_type = self.data[index].values()
+        # load tokenized_question, answer, string_question, image_filename from the questions store
+        question = self.question_store.get_tokens(index)
+        answer = int(self.question_store.answers[index])
+        question_string = self.question_store.get_string('questions', index)
+        imgfile = self.question_store.get_string('imgfiles', index)
+        question_type = self.question_store.get_type(index)
+        question_family = self.questions_family[index]
 
         # create the image index to retrieve the feature maps or the original image
-        index = str(imgfile.rsplit('_', 1)[1][:-4]).zfill(6)
-        extension = '.png' if self.raw_image else '.pt'
-        with open(os.path.join(self.image_source, '{}_{}_{}{}'.format('CLEVR-CoGenT' if self.dataset=='CLEVR-CoGenT' else 'CLEVR',
-                                                                      self.set, index, extension)), 'rb') as f:
-            try:
-                img = torch.load(f)  # for feature maps
-                img = torch.from_numpy(img).type(torch.FloatTensor).squeeze()
-            except:
-                img = Image.open(f).convert('RGB')  # for the original images
-                img = ToTensor()(img).type(torch.FloatTensor).squeeze()
-
-        # embed question
-        if self.embedding_type == 'random':
-            # embed question:
-            question = self.embed_layer(torch.LongTensor(question)).type(torch.FloatTensor)
-
+        index = str(self.question_store.image_ids[index]).zfill(6)
+        if self.raw_image:
+            img = self.image_cache.get(int(index)) if self.image_cache is not None else None
+            if img is None:
+                with open(os.path.join(self.image_source, imgfile), 'rb') as f:
+                    img = Image.open(f).convert('RGB')  # for the original images
+                    img = ToTensor()(img).type(torch.FloatTensor).squeeze()
+                if self.image_cache is not None:
+                    self.image_cache.put(int(index), img)
         else:
-            # embed question
-            question = self.language.embed_sentence(question_string)
+            # view on the memory-mapped feature store - converted to float when collating the batch.
+            img = torch.from_numpy(self.feature_store[int(index)])
 
+        # the question is embedded in collate_fn, together with the other questions of the batch.
+        question = torch.from_numpy(question.astype(np.int64))
         question_length = question.shape[0]
 
         # return everything
@@ -584,6 +843,7 @@ class CLEVR(ImageTextToClassProblem):
         data_dict['questions_length'] = question_length
         data_dict['questions_string'] = question_string
         data_dict['questions_type'] = question_type
+        data_dict['questions_family'] = question_family
         data_dict['targets'] = answer
         # leave data_dict['target_string'] as None
         data_dict['index'] = index
@@ -591,6 +851,13 @@ class CLEVR(ImageTextToClassProblem):
 
         return data_dict
 
+    def get_sample_lengths(self):
+        """
+        :return: Array of the lengths (number of words) of the questions.
+
+        """
+        return self.question_store.lengths
+
     def collate_fn(self, batch):
         """
         Combines a list of DataDict (retrieved with ``__getitem__``) into a batch.
@@ -611,31 +878,27 @@ class CLEVR(ImageTextToClassProblem):
         'targets_string', 'index','imgfiles'})
 
         """
-        batch_size = len(batch)
-
-        # get max question length, create tensor of shape [batch_size x maxQuestionLength] & sort questions by
-        # decreasing length
-        max_len = max(map(lambda x: x['questions_length'], batch))
-        sort_by_len = sorted(batch, key=lambda x: x['questions_length'], reverse=True)
-
-        # create tensor containing the embedded questions
-        questions = torch.zeros(batch_size, max_len, self.embedding_dim).type(torch.FloatTensor)
+        # sort questions by decreasing length
+        lengths = torch.LongTensor([elt['questions_length'] for elt in batch])
+        lengths, order = torch.sort(lengths, descending=True)
+        sort_by_len = [batch[i] for i in order.tolist()]
 
         # construct the DataDict and fill it with the batch
         data_dict = DataDict({key: None for key in self.data_definitions.keys()})
 
         data_dict['images'] = torch.stack([elt['images'] for elt in sort_by_len]).type(torch.FloatTensor)
-        data_dict['questions_length'] = [elt['questions_length'] for elt in sort_by_len]
-        data_dict['targets'] = torch.tensor([elt['targets'] for elt in sort_by_len]).type(torch.LongTensor)
+        data_dict['questions_length'] = lengths.tolist()
+        data_dict['targets'] = torch.LongTensor([elt['targets'] for elt in sort_by_len])
+        data_dict['questions_family'] = torch.LongTensor([elt['questions_family'] for elt in sort_by_len])
         data_dict['questions_string'] = [elt['questions_string'] for elt in sort_by_len]
         data_dict['index'] = [elt['index'] for elt in sort_by_len]
         data_dict['imgfiles'] = [elt['imgfiles'] for elt in sort_by_len]
         data_dict['questions_type'] = [elt['questions_type'] for elt in sort_by_len]
 
-        for i, length in enumerate(data_dict['questions_length']):  # only way to do this?
-            questions[i, :length, :] = sort_by_len[i]['questions']
-
-        data_dict['questions'] = questions
+        # pad the word indexes to the length of the longest question (index 0 is reserved for padding) & embed
+        # the whole batch at once - the look-up table is not trained, hence no autograd graph is built.
+        questions = torch.nn.utils.rnn.pad_sequence([elt['questions'] for elt in sort_by_len], batch_first=True)
+        data_dict['questions'] = torch.nn.functional.embedding(questions, self.embedding_weights)
 
         return data_dict
 
@@ -651,19 +914,19 @@ class CLEVR(ImageTextToClassProblem):
 
     def initialize_epoch(self, epoch):
         """
-        Resets the accuracy per category counters.
+        Resets the accuracy per family counters.
 
         :param epoch: current epoch index
         :type epoch: int
         """
-
-        self.categories_stats = dict(zip(self.categories.keys(), self.tuple_list))
+        self.family_correct = torch.zeros(len(self.family_names)).type(torch.LongTensor)
+        self.family_total = torch.zeros(len(self.family_names)).type(torch.LongTensor)
 
     def get_acc_per_family(self, data_dict, logits):
         """
-        Compute the accuracy per family for the current batch. Also accumulates
-        the number of correct predictions & questions per family in self.correct_pred_families (saved
-        to file).
+        Compute the accuracy per family for the current batch. Also accumulates the number of correct \
+        predictions & questions per family (in ``self.family_correct`` & ``self.family_total``) and per \
+        category, and saves them to file.
 
         :param data_dict: DataDict({'images','questions', 'questions_length', 'questions_string', 'questions_type', 'targets', \
             'targets_string', 'index','imgfiles'})
@@ -672,35 +935,32 @@ class CLEVR(ImageTextToClassProblem):
 
         """
         # unpack the DataDict
-        question_types = data_dict['questions_type']
-        targets = data_dict['targets']
-
-        # get correct predictions
-        pred = logits.max(1, keepdim=True)[1]
-        correct = pred.eq(targets.view_as(pred))
-
-        for i in range(correct.size(0)):
-            # update # of questions for the corresponding family
-            self.categories_stats[question_types[i]][1] += 1
+        families = data_dict['questions_family'].cpu()
+        targets = data_dict['targets'].cpu()
 
-            # update the # of correct predictions for the corresponding family
-            if correct[i] == 1: self.categories_stats[question_types[i]][0] += 1
+        # get correct predictions, ignoring the questions of unknown family
+        correct = logits.max(1)[1].cpu().eq(targets)
+        known = families >= 0
+        families = families[known]
 
-        categories_list = ['query_attribute', 'compare_integer', 'count', 'compare_attribute', 'exist']
-        tuple_list_categories = [[0, 0] for _ in range(len(categories_list))]
-        dic_categories = dict(zip(categories_list, tuple_list_categories))
+        # update the # of questions & # of correct predictions for the corresponding families
+        self.family_total += torch.bincount(families, minlength=len(self.family_names))
+        self.family_correct += torch.bincount(families, weights=correct[known].type(torch.FloatTensor),
+                                              minlength=len(self.family_names)).type(torch.LongTensor)
 
-        for category in categories_list:
-            for family in self.categories.keys():
-                if self.categories[family] == category:
-                    dic_categories[category][0] += self.categories_stats[family][0]
-                    dic_categories[category][1] += self.categories_stats[family][1]
+        # aggregate the families into categories
+        category_correct = torch.zeros(len(self.category_names)).type(torch.LongTensor).index_add_(
+            0, self.family_to_category, self.family_correct)
+        category_total = torch.zeros(len(self.category_names)).type(torch.LongTensor).index_add_(
+            0, self.family_to_category, self.family_total)
 
         with open(os.path.join(self.data_folder, 'generated_files',
                                '{}_{}_categories_acc.csv'.format(self.dataset, self.set)), 'w') as f:
             writer = csv.writer(f)
-        for key, value in self.categories_stats.items():
-            writer.writerow([key, value])
+            for names, correct, total in [(self.family_names, self.family_correct, self.family_total),
+                                          (self.category_names, category_correct, category_total)]:
+                for name, value in zip(names, zip(correct.tolist(), total.tolist())):
+                    writer.writerow([name, list(value)])
 
     def show_sample(self, data_dict, sample=0):
         """
@@ -714,6 +974,8 @@ class CLEVR(ImageTextToClassProblem):
         :param sample: sample index to visualize.
         :type sample: int
         """
+        import matplotlib.pyplot as plt
+
         # create plot figures
         plt.figure(1)
 
@@ -725,8 +987,7 @@ class CLEVR(ImageTextToClassProblem):
 
         question = questions_string[sample]
         answer = answers[sample]
-        answer = list(self.answer_dic.keys())[list(self.answer_dic.values()).index(answer.data)]  # dirty hack to go back from the
-        # value in a dict to the key.
+        answer = self.answer_strings[int(answer)]
 
         # open image
         imgfile = imgfiles[sample]
@@ -763,16 +1024,12 @@ class CLEVR(ImageTextToClassProblem):
         # unpack data_dict
         answers = data_dict['targets']
 
-        batch_size = logits.size(0)
-
         # get index of highest probability
         logits_indexes = torch.argmax(logits, dim=-1)
 
-        prediction_string = [list(self.answer_dic.keys())[list(self.answer_dic.values()).index(
-                logits_indexes[batch_num].data)] for batch_num in range(batch_size)]
-
-        answer_string = [list(self.answer_dic.keys())[list(self.answer_dic.values()).index(
-                answers[batch_num].data)] for batch_num in range(batch_size)]
+        # map the indexes to the answers
+        prediction_string = self.answer_strings[logits_indexes.cpu().numpy()].tolist()
+        answer_string = self.answer_strings[answers.cpu().numpy()].tolist()
 
         data_dict['targets_string'] = answer_string
         data_dict['predictions_string'] = prediction_string
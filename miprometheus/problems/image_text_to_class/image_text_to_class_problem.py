@@ -88,6 +88,33 @@ class ImageTextToClassProblem(Problem):
         # "Default" problem name.
         self.name = 'ImageTextToClassProblem'
 
+        # Cache of the decoded images - optional, see create_image_cache().
+        self.image_cache = None
+
+    def create_image_cache(self, params, shape, dtype=torch.float32):
+        """
+        Creates the cache of decoded images (or feature maps), shared by all ``DataLoader`` workers, if \
+        ``image_cache_size`` (maximum size of the cached images, in MB) is set in the parameters.
+
+        .. note::
+
+            Useful when several samples (e.g. questions) refer to the same image: the image is loaded & decoded \
+            once, then retrieved from the cache (as long as it is not evicted, the cache being LRU).
+
+        :param params: Dictionary of parameters (read from configuration ``.yaml`` file).
+
+        :param shape: Shape of a decoded image, e.g. [3, 320, 480].
+        :type shape: list
+
+        :param dtype: Type of the decoded images (DEFAULT: torch.float32).
+
+        """
+        cache_size = params.get('image_cache_size', 0)
+        if cache_size > 0:
+            from miprometheus.utils.problems_utils.shared_cache import SharedTensorCache
+            self.image_cache = SharedTensorCache(cache_size, shape, dtype)
+            self.logger.info('Caching up to {} decoded images in shared memory'.format(self.image_cache.capacity))
+
     def calculate_accuracy(self, data_dict, logits):
         """
         Calculates the accuracy as the mean number of correct answers in a given batch.
@@ -113,16 +140,20 @@ class ImageTextToClassProblem(Problem):
 
     def add_statistics(self, stat_col):
         """
-        Add accuracy statistic to ``StatisticsCollector``.
+        Add accuracy statistic (and the image cache counters, if the cache is used) to ``StatisticsCollector``.
 
         :param stat_col: ``StatisticsCollector``.
 
         """
         stat_col.add_statistic('acc', '{:12.10f}')
 
+        if self.image_cache is not None:
+            stat_col.add_statistic('image_cache_hits', '{:d}')
+            stat_col.add_statistic('image_cache_misses', '{:d}')
+
     def collect_statistics(self, stat_col, data_dict, logits):
         """
-        Collects accuracy.
+        Collects accuracy (and the image cache counters, if the cache is used).
 
         :param stat_col: ``StatisticsCollector``.
 
@@ -134,6 +165,23 @@ class ImageTextToClassProblem(Problem):
         """
         stat_col['acc'] = self.calculate_accuracy(data_dict, logits)
 
+        if self.image_cache is not None:
+            # cumulated over all DataLoader workers.
+            stat_col['image_cache_hits'] = self.image_cache.hits
+            stat_col['image_cache_misses'] = self.image_cache.misses
+
+    def add_aggregators(self, stat_agg):
+        """
+        Adds the image cache counters to ``StatisticsAggregator`` (if the cache is used).
+
+        :param stat_agg: ``StatisticsAggregator``.
+
+        """
+        if self.image_cache is not None:
+            # the last collected values are copied by the worker.
+            stat_agg.add_aggregator('image_cache_hits', '{:d}')
+            stat_agg.add_aggregator('image_cache_misses', '{:d}')
+
 
 if __name__ == '__main__':
 
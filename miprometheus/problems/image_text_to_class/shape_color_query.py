@@ -98,43 +98,35 @@ class ShapeColorQuery(SortOfCLEVR):
         # Return the question as a string.
         return query.format(color, shape)
 
-    def generate_question_matrix(self, objects):
+    def generate_question_matrices(self, scenes):
         """
-        Generates the questions tensor: [# of objects * # of Q, 3, encoding],\
-        where the 2nd dimension (`temporal`) encodes consecutively: shape, color, query
+        Generates the questions tensors: [# of scenes, MAX_NUM_OBJECTS * # of Q, 3, encoding],\
+        where the 3rd dimension (`temporal`) encodes consecutively: shape, color, query
 
-        :param objects: List of objects - abstract scene representation.
-        :type object: list
+        :param scenes: Abstract representation of the scenes (see ``generate_scenes()``).
+        :type scenes: dict
 
-        :return: a 3D tensor [# of questions for the whole scene, 3, num_bits]
+        :return: a 4D tensor [# of scenes, # of questions for the whole scene, 3, num_bits]
 
         """
-
-        # Number of scene questions.
-        num_questions = len(objects) * self.NUM_QUESTIONS
+        num_scenes = len(scenes['colors'])
         # Number of bits in Object and Query vectors.
         num_bits = max(self.NUM_COLORS, self.NUM_SHAPES, self.NUM_QUESTIONS)
 
         # Create query tensor.
-        Q = np.zeros((num_questions, 3, num_bits), dtype=np.bool)
-
-        # Helper matrix - queries for all question types.
-        query_matrix = np.diag(np.ones(num_bits))
-
-        # For every object in the scene.
-        for i, obj in enumerate(objects):
-            # Shape - with special case: query 0 asks about shape, do not
-            # provide answer as part of the query! (+1)
-            Q[i * self.NUM_QUESTIONS +
-                1:(i + 1) * self.NUM_QUESTIONS, 0, obj.shape] = True
-            # Color
-            Q[i * self.NUM_QUESTIONS:(i + 1) * self.NUM_QUESTIONS,
-              1, obj.color] = True
-            # Query.
-            Q[i * self.NUM_QUESTIONS:(i + 1) * self.NUM_QUESTIONS, 2,
-              :num_bits] = query_matrix[:self.NUM_QUESTIONS, :num_bits]
-
-        return Q
+        Q = np.zeros((num_scenes, self.MAX_NUM_OBJECTS, self.NUM_QUESTIONS, 3, num_bits), dtype=np.bool)
+
+        # Shape - with special case: query 0 asks about shape, do not
+        # provide answer as part of the query! (+1)
+        Q[:, :, 1:, 0, :self.NUM_SHAPES] = (scenes['shapes'][..., np.newaxis] ==
+                                            np.arange(self.NUM_SHAPES))[:, :, np.newaxis, :]
+        # Color
+        Q[:, :, :, 1, :self.NUM_COLORS] = (scenes['colors'][..., np.newaxis] ==
+                                           np.arange(self.NUM_COLORS))[:, :, np.newaxis, :]
+        # Query.
+        Q[:, :, :, 2, :] = np.eye(num_bits, dtype=np.bool)[:self.NUM_QUESTIONS]
+
+        return Q.reshape(num_scenes, self.MAX_NUM_OBJECTS * self.NUM_QUESTIONS, 3, num_bits)
 
 
 if __name__ == "__main__":
@@ -24,12 +24,13 @@ __author__ = "Tomasz Kornuta & Vincent Marois"
 import os
 import h5py
 import numpy as np
-from PIL import Image, ImageDraw
+import multiprocessing
 import tqdm
 
 import torch
 from miprometheus.utils.data_dict import DataDict
-from miprometheus.problems.image_text_to_class.image_text_to_class_problem import ImageTextToClassProblem, ObjectRepresentation
+from miprometheus.utils.problems_utils.data_preparation import prepare_artefact
+from miprometheus.problems.image_text_to_class.image_text_to_class_problem import ImageTextToClassProblem
 
 
 class SortOfCLEVR(ImageTextToClassProblem):
@@ -59,6 +60,19 @@ class SortOfCLEVR(ImageTextToClassProblem):
     :param regenerate: Whether to regenerate the dataset
     :type regenerate: Bool
 
+    :param image_cache_size: Maximum size (in MB) of the cache of decoded images shared by the ``DataLoader`` \
+    workers (optional, disabled by default). Several questions refer to the same image.
+    :type image_cache_size: int
+
+    :param generation_workers: Number of processes generating the dataset, each one writing a shard of it \
+    (optional, default: 1).
+    :type generation_workers: int
+
+    :param on_the_fly: Whether to generate the samples on the fly (in ``__getitem__``, i.e. by the ``DataLoader`` \
+    workers) instead of reading them from a file (optional, default: False). Each sample then comes from a new \
+    scene: ``dataset_size`` only sets the size of an epoch.
+    :type on_the_fly: bool
+
     .. note::
 
         When generating the dataset, this class:
@@ -95,6 +109,8 @@ class SortOfCLEVR(ImageTextToClassProblem):
         self.img_size = params["img_size"]
         self.dataset_size = params["dataset_size"]
         self.regenerate = params.get("regenerate", False)
+        self.generation_workers = params.get("generation_workers", 1)
+        self.on_the_fly = params.get("on_the_fly", False)
 
         # Set general color properties.
         self.BG_COLOR = (180, 180, 150)
@@ -109,6 +125,7 @@ class SortOfCLEVR(ImageTextToClassProblem):
         ]
 
         # Other hardcoded parameters.
+        self.FILE_VERSION = 2
         self.NUM_SHAPES = 2
         self.NUM_COLORS = len(self.COLOR)
         self.NUM_QUESTIONS = 7
@@ -118,13 +135,16 @@ class SortOfCLEVR(ImageTextToClassProblem):
         self.MAX_NUM_OBJECTS = min(6, self.NUM_COLORS)
         self.GRID_SIZE = 4
 
+        # Number of scenes generated at once.
+        self.SCENES_PER_BATCH = 256
+
         # Get absolute path.
         data_folder = os.path.expanduser(params['data_folder'])
 
         # create the folder if it doesn't exist
         if not os.path.isdir(data_folder):
             self.logger.warning('Indicated data_folder does not exist, creating it.')
-            os.mkdir(data_folder)
+            os.makedirs(data_folder, exist_ok=True)
 
         # construct the dataset filename from 3 values:
         # set: either 'train', 'test' or 'val'
@@ -147,8 +167,21 @@ class SortOfCLEVR(ImageTextToClassProblem):
                                  'scenes_description': {'size': [-1, -1], 'type': [list, str]},
                                  }
 
-        # Load or generate the dataset.
-        self.load_dataset(data_folder, data_filename)
+        if self.on_the_fly:
+            self.logger.info('Generating the samples on the fly, without dataset file.')
+        else:
+            # Load or generate the dataset.
+            self.load_dataset(data_folder, data_filename)
+
+            # Cache of the decoded images (optional).
+            self.create_image_cache(params, shape=[3, self.img_size, self.img_size], dtype=torch.float64)
+
+        # The HDF5 file is opened on first access, once per process (handles cannot be shared by processes).
+        self._file = None
+        self._file_pid = None
+
+        # __getitem__ can read whole batches at once.
+        self.batch_getitem = True
 
         self.length = self.dataset_size
 
@@ -163,6 +196,9 @@ class SortOfCLEVR(ImageTextToClassProblem):
               samples). If no such file does not exist, it is generated and saved in ``data_folder`` (with\
                the specified ``data_filename``).
 
+            When several processes load the same dataset, a single one generates the file while the others \
+            wait for it (see ``prepare_artefact``).
+
         """
         # name of the file to look for or create
         self.filename = os.path.join(data_folder, data_filename)
@@ -170,7 +206,6 @@ class SortOfCLEVR(ImageTextToClassProblem):
         if self.regenerate:
             self.logger.warning('Regenerate is set to true: regenerating the dataset from scratch, '
                                 'without looking for an existing one.')
-            self.generate_h5py_dataset(self.filename)
 
         else:  # regenerate is false, looking if the file already exists
             if os.path.isfile(self.filename):
@@ -178,72 +213,379 @@ class SortOfCLEVR(ImageTextToClassProblem):
 
             else:  # the file doesn't exist, we need to create it.
                 self.logger.warning('File {} not found on disk, generating a new dataset.'.format(self.filename))
-                self.generate_h5py_dataset(self.filename)
+
+        # Only one process generates the file, the other ones wait for it (and reuse it).
+        prepare_artefact(self.filename, self.generate_h5py_dataset, regenerate=self.regenerate, logger=self.logger)
+
+        # The files generated by previous versions store each sample in a separate group: regenerate them.
+        with h5py.File(self.filename, 'r') as file:
+            version = file.attrs.get('version', 1)
+        if version < self.FILE_VERSION:
+            self.logger.warning('File {} was generated by a previous version, regenerating it.'.format(self.filename))
+            prepare_artefact(self.filename, self.generate_h5py_dataset, regenerate=True, logger=self.logger)
 
     def generate_h5py_dataset(self, filename):
         """
         Generates a whole new ``Sort-of-CLEVR`` dataset and saves it in the form of\
         a HDF5 file.
 
+        If ``generation_workers`` > 1, each worker process generates a shard of the dataset (in a separate file), \
+        the shards being then merged into a single file.
+
         :param filename: name of the file containing the samples.
         :type filename: str
 
         """
-        # open the HDF5 file.
-        file = h5py.File(filename, 'w')
-        # progress bar
-        t = tqdm.tqdm(total=self.dataset_size, unit=" samples", unit_scale=True, unit_divisor=1000)  # Initialise
-        t.set_postfix(file=self.filename, refresh=False)
-        count = 0
+        if self.generation_workers <= 1:
+            self.generate_h5py_shard(filename, self.dataset_size)
+
+        else:
+            shard_sizes = [len(shard) for shard in np.array_split(np.arange(self.dataset_size),
+                                                                  self.generation_workers)]
+            shard_filenames = ['{}.shard{}'.format(filename, i) for i in range(self.generation_workers)]
+            # Each process has its own random seed (drawn from the current one).
+            seeds = np.random.randint(2**31, size=self.generation_workers)
+
+            # The processes are forked, so the problem does not need to be pickled.
+            context = multiprocessing.get_context('fork')
+            processes = [context.Process(target=self.generate_h5py_shard, args=(shard_filename, size, seed, i))
+                         for i, (shard_filename, size, seed) in enumerate(zip(shard_filenames, shard_sizes, seeds))]
+            try:
+                for process in processes:
+                    process.start()
+                for process in processes:
+                    process.join()
+
+                failed = [i for i, process in enumerate(processes) if process.exitcode != 0]
+                if failed:
+                    raise RuntimeError('Generation of the shard(s) {} of {} failed'.format(failed, filename))
+
+                self.merge_h5py_shards(filename, shard_filenames)
+
+            finally:
+                for process in processes:
+                    if process.is_alive():
+                        process.terminate()
+                for shard_filename in shard_filenames:
+                    if os.path.exists(shard_filename):
+                        os.remove(shard_filename)
 
-        while count < self.dataset_size:
+        self.logger.info('Generated dataset with {} samples and saved to {}'.format(self.dataset_size, self.filename))
 
-            # Generate the scene.
-            objects = self.generate_scene_representation()
+    def generate_h5py_shard(self, filename, num_samples, seed=None, position=0):
+        """
+        Generates samples (by batches of scenes) and saves them in a HDF5 file.
 
-            # Generate corresponding image, questions and answers.
-            I = self.generate_image(objects)
-            Q = self.generate_question_matrix(objects)
-            A = self.generate_answer_matrix(objects)
+        The file contains one (chunked) dataset per field, the samples (questions) referring to the images of \
+        their scenes:
 
-            # Iterate through all questions generated for a given scene.
-            for j in range(len(objects) * self.NUM_QUESTIONS):
+            - ``images``: [num_images, img_size, img_size, 3] uint8,
+            - ``scenes_description``: [num_images] str,
+            - ``image_ids``: [num_samples] int32,
+            - ``questions``: [num_samples, <question encoding>] bool,
+            - ``answers``: [num_samples, NUM_COLORS + 4] bool.
 
-                # Create new group.
-                id = str(count)
-                grp = file.create_group(id)
+        :param filename: name of the file containing the samples.
+        :type filename: str
+
+        :param num_samples: Number of samples to generate.
+        :type num_samples: int
+
+        :param seed: Seed of the ``NumPy`` random generator (DEFAULT: None, i.e. current state).
+        :type seed: int
+
+        :param position: Position of the progress bar (DEFAULT: 0).
+        :type position: int
+
+        """
+        if seed is not None:
+            np.random.seed(seed)
+
+        # each scene has at least 2 objects, hence 2 * NUM_QUESTIONS questions.
+        max_num_images = num_samples // (2 * self.NUM_QUESTIONS) + 1
+        chunk_size = min(1024, max(1, num_samples))
+
+        # open the HDF5 file.
+        with h5py.File(filename, 'w') as file:
+            file.attrs['version'] = self.FILE_VERSION
+
+            images = file.create_dataset('images', shape=(max_num_images, self.img_size, self.img_size, 3),
+                                         maxshape=(None, self.img_size, self.img_size, 3), dtype=np.uint8,
+                                         chunks=(1, self.img_size, self.img_size, 3))
+            scenes_description = file.create_dataset('scenes_description', shape=(max_num_images,),
+                                                     maxshape=(None,), dtype=h5py.special_dtype(vlen=str),
+                                                     chunks=(1024,))
+            image_ids = file.create_dataset('image_ids', shape=(num_samples,), dtype=np.int32, chunks=(chunk_size,))
+            # the shape of the questions depends on their encoding: created with the first scenes.
+            questions = None
+            answers = file.create_dataset('answers', shape=(num_samples, self.NUM_COLORS + 4), dtype=np.bool,
+                                          chunks=(chunk_size, self.NUM_COLORS + 4))
+
+            # progress bar
+            t = tqdm.tqdm(total=num_samples, unit=" samples", unit_scale=True, unit_divisor=1000,
+                          position=position)  # Initialise
+            t.set_postfix(file=filename, refresh=False)
+            count = 0
+            image_id = 0
+
+            while count < num_samples:
+
+                # Generate a batch of scenes, with their images, questions and answers.
+                I, descriptions, image_index, Q, A = self.generate_samples(self.SCENES_PER_BATCH)
+
+                if questions is None:
+                    questions = file.create_dataset('questions', shape=(num_samples,) + Q.shape[1:],
+                                                    dtype=np.bool, chunks=(chunk_size,) + Q.shape[1:])
+
+                # Number of questions (and of scenes) to keep.
+                num_questions = min(len(Q), num_samples - count)
+                num_images = image_index[num_questions - 1] + 1
 
                 # Set data.
-                grp['image'] = I
-                grp['question'] = Q[j, ...]
-                grp['answer'] = A[j, ...]
-                grp['scene_description'] = self.scene2str(objects)
-
-                # Increment counter.
-                count += 1
-                t.update()
-
-                # Check whether we generated the required number of samples
-                if count >= self.dataset_size:
-                    break
-
-        # Finalize the generation.
-        t.close()
-        file.close()
-        self.logger.info('Generated dataset with {} samples and saved to {}'.format(self.dataset_size, self.filename))
+                images[image_id:image_id + num_images] = I[:num_images]
+                scenes_description[image_id:image_id + num_images] = descriptions[:num_images]
+                image_ids[count:count + num_questions] = image_id + image_index[:num_questions]
+                questions[count:count + num_questions] = Q[:num_questions]
+                answers[count:count + num_questions] = A[:num_questions]
+
+                # Increment counters.
+                count += num_questions
+                image_id += num_images
+                t.update(num_questions)
+
+            # Remove the unused images.
+            images.resize(image_id, axis=0)
+            scenes_description.resize(image_id, axis=0)
+
+            # Finalize the generation.
+            t.close()
+
+    def merge_h5py_shards(self, filename, shard_filenames):
+        """
+        Merges the HDF5 files generated by ``generate_h5py_shard()`` into a single one, offsetting the image ids.
+
+        :param filename: name of the file containing the merged samples.
+        :type filename: str
+
+        :param shard_filenames: names of the shards files (in order).
+        :type shard_filenames: list
+
+        """
+        shards = [h5py.File(shard_filename, 'r') for shard_filename in shard_filenames]
+        try:
+            with h5py.File(filename, 'w') as file:
+                file.attrs['version'] = self.FILE_VERSION
+
+                for name in ['images', 'scenes_description', 'image_ids', 'questions', 'answers']:
+                    first = shards[0][name]
+                    size = sum(len(shard[name]) for shard in shards)
+                    dataset = file.create_dataset(name, shape=(size,) + first.shape[1:], dtype=first.dtype,
+                                                  chunks=(min(first.chunks[0], size),) + first.chunks[1:])
+
+                    offset = 0
+                    num_images = 0
+                    for shard in shards:
+                        # Copy by blocks of chunks.
+                        block_size = 64 * first.chunks[0]
+                        for start in range(0, len(shard[name]), block_size):
+                            block = shard[name][start:start + block_size]
+                            if name == 'image_ids':
+                                block += num_images
+                            dataset[offset + start:offset + start + len(block)] = block
+
+                        offset += len(shard[name])
+                        num_images += len(shard['images'])
+
+        finally:
+            for shard in shards:
+                shard.close()
+
+    def get_file(self):
+        """
+        Returns the HDF5 file containing the dataset, opened (in read-only mode) on first access in the current \
+        process, e.g. a ``DataLoader`` worker.
+
+        :return: ``h5py.File``.
+
+        """
+        if self._file is None or self._file_pid != os.getpid():
+            self._file = h5py.File(self.filename, 'r')
+            self._file_pid = os.getpid()
+        return self._file
+
+    def __getstate__(self):
+        """
+        Drops the handle of the HDF5 file when pickling the problem (e.g. when sending it to ``DataLoader`` \
+        workers started with the "spawn" method): it will be reopened on first access.
+
+        """
+        state = self.__dict__.copy()
+        state['_file'] = None
+        return state
+
+    def worker_init_fn(self, worker_id):
+        """
+        Seeds the ``NumPy`` random generator of a dataloader worker.
+
+        .. note::
+
+            In the ``on_the_fly`` mode, the scenes are generated with ``NumPy``, and the workers are restarted at \
+            each epoch: the seed is derived from the ``torch`` seed of the worker (set by the ``DataLoader``, \
+            different for each worker and each epoch), so that each epoch brings new scenes.
+
+        :param worker_id: the worker id (in [0, ``torch.utils.data.dataloader.DataLoader.num_workers`` - 1])
+        :type worker_id: int
+
+        """
+        super(SortOfCLEVR, self).worker_init_fn(worker_id)
+
+        np.random.seed(torch.initial_seed() % 2**32)
+
+    def read_images(self, image_ids):
+        """
+        Reads & decodes the images of a batch, using the image cache if set.
+
+        :param image_ids: Ids of the images.
+        :type image_ids: ``np.array``
+
+        :return: ``np.array`` of decoded images [len(image_ids), 3, img_size, img_size] & list of the scenes \
+        descriptions.
+
+        """
+        file = self.get_file()
+
+        # h5py requires increasing indices: read each (unique) image once.
+        unique_ids, inverse = np.unique(image_ids, return_inverse=True)
+        images = np.empty((len(unique_ids), 3, self.img_size, self.img_size), dtype=np.float64)
+
+        missing = []
+        for i, image_id in enumerate(unique_ids.tolist()):
+            image = self.image_cache.get(image_id) if self.image_cache is not None else None
+            if image is None:
+                missing.append(i)
+            else:
+                images[i] = image.numpy()
+
+        if missing:
+            missing_ids = unique_ids[missing]
+            images[missing] = (file['images'][self.get_selection(missing_ids)] / 255).transpose(0, 3, 2, 1)
+            if self.image_cache is not None:
+                for i, image_id in zip(missing, missing_ids.tolist()):
+                    self.image_cache.put(image_id, torch.from_numpy(images[i]))
+
+        scenes_description = file['scenes_description'][self.get_selection(unique_ids)]
+        scenes_description = [scene.decode('utf-8') if isinstance(scene, bytes) else scene
+                              for scene in scenes_description]
+
+        return images[inverse], [scenes_description[i] for i in inverse]
+
+    def get_selection(self, indices):
+        """
+        Returns the selection used to read rows from a HDF5 dataset: a slice if the indices are contiguous \
+        (fastest), the list of indices otherwise.
+
+        :param indices: Sorted, unique indices.
+        :type indices: ``np.array``
+
+        :return: slice or list.
+
+        """
+        if indices[-1] - indices[0] + 1 == len(indices):
+            return slice(int(indices[0]), int(indices[-1]) + 1)
+        return indices.tolist()
+
+    def get_batch(self, indices):
+        """
+        Reads a batch of samples, with one read per field of the dataset.
+
+        :param indices: Indices of the samples.
+        :type indices: list
+
+        :return: ``DataDict({'images','questions', 'targets', 'targets_index', 'scenes_description'})`` containing \
+        the batch.
+
+        """
+        if self.on_the_fly:
+            return self.generate_batch(len(indices))
+
+        file = self.get_file()
+
+        # h5py requires increasing indices: read each (unique) sample once, then reorder.
+        unique_indices, inverse = np.unique(np.asarray(indices, dtype=np.int64), return_inverse=True)
+        selection = self.get_selection(unique_indices)
+
+        image_ids = file['image_ids'][selection][inverse]
+        questions = file['questions'][selection][inverse]
+        answers = file['answers'][selection][inverse]
+
+        images, scenes_description = self.read_images(image_ids)
+
+        return self.batch_to_data_dict(images, questions, answers, scenes_description)
+
+    def generate_batch(self, batch_size):
+        """
+        Generates a batch of samples on the fly, each one being a random question about a new scene.
+
+        :param batch_size: Number of samples.
+        :type batch_size: int
+
+        :return: ``DataDict({'images','questions', 'targets', 'targets_index', 'scenes_description'})`` containing \
+        the batch.
+
+        """
+        scenes = self.generate_scenes(batch_size)
+
+        # Pick a question about one of the objects of each scene.
+        num_questions = scenes['valid'].sum(axis=1) * self.NUM_QUESTIONS
+        question_index = (np.random.rand(batch_size) * num_questions).astype(np.int64)
+        scene_index = np.arange(batch_size)
+
+        images = self.generate_images(scenes).transpose(0, 3, 2, 1) / 255
+        questions = self.generate_question_matrices(scenes)[scene_index, question_index]
+        answers = self.generate_answer_matrices(scenes)[scene_index, question_index]
+
+        return self.batch_to_data_dict(images, questions, answers, self.scenes2str(scenes))
+
+    def batch_to_data_dict(self, images, questions, answers, scenes_description):
+        """
+        Packs the arrays of a batch into a ``DataDict``.
+
+        :param images: Decoded images [batch_size, 3, img_size, img_size].
+        :type images: ``np.array``
+
+        :param questions: Encoded questions.
+        :type questions: ``np.array``
+
+        :param answers: One-hot encoded answers.
+        :type answers: ``np.array``
+
+        :param scenes_description: List of scenes descriptions.
+        :type scenes_description: list
+
+        :return: ``DataDict({'images','questions', 'targets', 'targets_index', 'scenes_description'})``.
+
+        """
+        data_dict = DataDict({key: None for key in self.data_definitions.keys()})
+        data_dict['images'] = torch.from_numpy(images)
+        data_dict['questions'] = torch.from_numpy(questions.astype(np.float32))
+        data_dict['targets_classes'] = torch.from_numpy(answers.astype(np.float32))
+        data_dict['targets'] = torch.from_numpy(np.argmax(answers, axis=1))
+        data_dict['scenes_description'] = scenes_description
+
+        return data_dict
 
     def __getitem__(self, index):
         """
         Getter method to access the dataset and return a sample.
 
-        .. warning::
+        .. note::
 
-            **HDF5 does not support multi threaded data access with num_workers > 1 on the data loading.**
-            A way around this is to move every call for opening the HDF5 file to this ``__getitem__`` method.
+            The HDF5 file is opened once per process (see ``get_file()``).
 
-            See https://discuss.pytorch.org/t/hdf5-multi-threaded-alternative/6189/9 for more info.
+            If passed a list of indices, returns the whole batch (see ``get_batch()``), which is much faster \
+            than reading the samples one by one.
 
-        :param index: index of the sample to return.
+        :param index: index of the sample to return (or list of indices).
 
         :return: DataDict({'images','questions', 'targets', 'targets_index', 'scenes_description'}), with:
 
@@ -254,16 +596,17 @@ class SortOfCLEVR(ImageTextToClassProblem):
             - scenes_description: Scene description.
 
         """
-        # load the file
-        data = h5py.File(self.filename, 'r')
-        sample = data[str(index)]
+        if isinstance(index, (list, tuple, np.ndarray)):
+            return self.get_batch(index)
+
+        batch = self.get_batch([index])
 
         data_dict = DataDict({key: None for key in self.data_definitions.keys()})
-        data_dict['images'] = (sample['image'].value / 255).transpose(2, 1, 0)
-        data_dict['questions'] = sample['question'].value.astype(np.float32)
-        data_dict['targets_classes'] = sample['answer'].value.astype(np.float32)
-        data_dict['targets'] = np.argmax(data_dict['targets_classes'])
-        data_dict['scenes_description'] = sample['scene_description'].value
+        data_dict['images'] = batch['images'][0].numpy()
+        data_dict['questions'] = batch['questions'][0].numpy()
+        data_dict['targets_classes'] = batch['targets_classes'][0].numpy()
+        data_dict['targets'] = batch['targets'][0].numpy()
+        data_dict['scenes_description'] = batch['scenes_description'][0]
 
         return data_dict
 
@@ -387,185 +730,199 @@ class SortOfCLEVR(ImageTextToClassProblem):
             9: 'no',
         }[np.floor(encoded_answer)]
 
-    def scene2str(self, objects):
+    def scenes2str(self, scenes):
         """
-        Returns a string containing the shape, color and position of every object forming the scene.
+        Returns the strings containing the shape, color and position of every object forming the scenes.
 
-        :param objects: List of objects - abstract scene representation.
-        :type object: list
+        :param scenes: Abstract representation of the scenes (see ``generate_scenes()``).
+        :type scenes: dict
 
-        :return: Str containing the scene description.
+        :return: List of str containing the scenes descriptions.
 
         """
-        desc = '| '
-        for obj in objects:
-            # Add description
-            desc = desc + ('{} {} at ({}, {}) | '.format(self.color2str(obj.color),
-                                                         self.shape2str(obj.shape), obj.x, obj.y))
-        return desc
-
-    def generate_scene_representation(self):
+        descriptions = []
+        for x, y, colors, shapes, valid in zip(scenes['x'], scenes['y'], scenes['colors'], scenes['shapes'],
+                                               scenes['valid']):
+            desc = '| '
+            for i in np.flatnonzero(valid):
+                # Add description
+                desc = desc + ('{} {} at ({}, {}) | '.format(self.color2str(colors[i]),
+                                                             self.shape2str(shapes[i]), x[i], y[i]))
+            descriptions.append(desc)
+        return descriptions
+
+    def generate_scenes(self, num_scenes):
         """
-        Generates the scene representation.
+        Generates the representations of several scenes at once.
 
-        :return: List of objects - abstract scene representation.
+        Each scene contains between 2 and ``MAX_NUM_OBJECTS`` objects, stored first in the arrays of the scene \
+        representation.
 
-        """
-        # Generate list of objects - no more then the number of colors.
-        num_objects = np.random.random_integers(2, self.MAX_NUM_OBJECTS)
+        :param num_scenes: Number of scenes to generate.
+        :type num_scenes: int
 
-        # Shuffle "grid positions".
-        grid_positions = np.arange(self.GRID_SIZE * self.GRID_SIZE)
-        np.random.shuffle(grid_positions)
+        :return: Dict of ``np.array`` [num_scenes, MAX_NUM_OBJECTS]: ``x`` & ``y`` (image coordinates), \
+        ``colors``, ``shapes`` & ``valid`` (mask of the objects present in the scenes).
 
-        # Size of a "grid block".
-        block_size = int(self.img_size * 0.9 / self.GRID_SIZE)
+        """
+        # Number of objects - no more then the number of colors.
+        num_objects = np.random.randint(2, self.MAX_NUM_OBJECTS + 1, size=num_scenes)
+        valid = np.arange(self.MAX_NUM_OBJECTS)[np.newaxis, :] < num_objects[:, np.newaxis]
 
-        # Shuffle colors.
-        colors = np.arange(self.NUM_COLORS)
-        np.random.shuffle(colors)
-        colors = colors[:num_objects]
+        # Shuffle "grid positions" & colors (random permutations of each scene).
+        grid_positions = np.argsort(np.random.rand(num_scenes, self.GRID_SIZE * self.GRID_SIZE),
+                                    axis=1)[:, :self.MAX_NUM_OBJECTS]
+        colors = np.argsort(np.random.rand(num_scenes, self.NUM_COLORS), axis=1)[:, :self.MAX_NUM_OBJECTS]
 
         # Generate shapes.
-        shapes = (np.random.rand(num_objects) < 0.5).astype(int)
+        shapes = (np.random.rand(num_scenes, self.MAX_NUM_OBJECTS) < 0.5).astype(np.int64)
 
-        # List of objects presents in the scene.
-        objects = []
+        # Size of a "grid block".
+        block_size = int(self.img_size * 0.9 / self.GRID_SIZE)
 
-        # Generate coordinates.
-        for i in range(num_objects):
-            # Calculate object positions depending on "grid positions"
-            x = grid_positions[i] % self.GRID_SIZE
-            y = (
-                self.GRID_SIZE -
-                np.floor(
-                    grid_positions[i] /
-                    self.GRID_SIZE) -
-                1).astype(
-                np.uint8)
-            # Calculate "image coordinates".
-            x_img = (x + 0.5) * block_size + np.random.random_integers(-2, 2)
-            y_img = (y + 0.5) * block_size + np.random.random_integers(-2, 2)
-            # Add object to list.
-            objects.append(ObjectRepresentation(
-                x_img, y_img, colors[i], shapes[i]))
+        # Calculate object positions depending on "grid positions"
+        x = grid_positions % self.GRID_SIZE
+        y = self.GRID_SIZE - grid_positions // self.GRID_SIZE - 1
 
-        return objects
+        # Calculate "image coordinates".
+        x_img = (x + 0.5) * block_size + np.random.randint(-2, 3, size=x.shape)
+        y_img = (y + 0.5) * block_size + np.random.randint(-2, 3, size=y.shape)
 
-    def generate_image(self, objects):
+        return {'x': x_img, 'y': y_img, 'colors': colors, 'shapes': shapes, 'valid': valid}
+
+    def generate_images(self, scenes):
         """
-        Generates the image on the basis of a given scene representation.
+        Generates the images on the basis of the given scenes representations.
+
+        The objects are rasterised with masks computed for all scenes at once (one object of each scene at a time).
 
-        :param objects: List of objects - abstract scene representation.
-        :type object: list
+        :param scenes: Abstract representation of the scenes (see ``generate_scenes()``).
+        :type scenes: dict
 
-        :return: ``np.array`` containing the generated image.
+        :return: ``np.array`` containing the generated images [num_scenes, img_size, img_size, 3] (uint8).
 
         """
         img_size = self.img_size
         shape_size = int((img_size * 0.9 / self.GRID_SIZE) * 0.7 / 2)
+        colors = np.asarray(self.COLOR, dtype=np.uint8)
 
-        # Generate image [img_size, img_size, 3]
-        img = Image.new('RGB', (img_size, img_size), color=self.BG_COLOR)
-        drawer = ImageDraw.Draw(img)
-
-        for obj in objects:
-            # Calculate object position.
-            position = (obj.x - shape_size, obj.y - shape_size,
-                        obj.x + shape_size, obj.y + shape_size)
-            # Draw object.
-            if obj.shape == 1:
-                drawer.ellipse(position, fill=self.COLOR[obj.color])
-            else:
-                drawer.rectangle(position, fill=self.COLOR[obj.color])
+        images = np.empty((len(scenes['x']), img_size, img_size, 3), dtype=np.uint8)
+        images[:] = self.BG_COLOR
 
-        # Cast to np.
-        return np.array(img)
+        # Coordinates of the pixels: rows (y) & columns (x).
+        rows = np.arange(img_size)[np.newaxis, :, np.newaxis]
+        columns = np.arange(img_size)[np.newaxis, np.newaxis, :]
 
-    def generate_question_matrix(self, objects):
-        """
-        Generates the questions matrix: [# of shape * # of Q, # of color + # of Q].
+        for i in range(self.MAX_NUM_OBJECTS):
+            # Offsets of the pixels from the centers of the objects: [num_scenes, img_size, img_size].
+            dx = columns - scenes['x'][:, i, np.newaxis, np.newaxis]
+            dy = rows - scenes['y'][:, i, np.newaxis, np.newaxis]
 
-        This matrix contains all possible questions for a given scene representation.
+            rectangles = (np.abs(dx) <= shape_size) & (np.abs(dy) <= shape_size)
+            circles = dx ** 2 + dy ** 2 <= shape_size ** 2
+            masks = np.where(scenes['shapes'][:, i, np.newaxis, np.newaxis] == 1, circles, rectangles)
+            masks &= scenes['valid'][:, i, np.newaxis, np.newaxis]
 
+            # Draw objects.
+            images = np.where(masks[..., np.newaxis], colors[scenes['colors'][:, i]][:, np.newaxis, np.newaxis, :],
+                              images)
 
-        :param objects: List of objects - abstract scene representation.
-        :type object: list
+        return images
 
-        :return the questions matrix (``np.array``)
+    def generate_question_matrices(self, scenes):
         """
-        Q = np.zeros((len(objects) * self.NUM_QUESTIONS,
-                      self.NUM_COLORS + self.NUM_QUESTIONS), dtype=np.bool)
+        Generates the questions matrices: [# of scenes, MAX_NUM_OBJECTS * # of Q, # of color + # of Q].
 
-        for i, obj in enumerate(objects):
-            v = np.zeros(self.NUM_COLORS)
-            v[obj.color] = True
-            Q[i * self.NUM_QUESTIONS:(i + 1) * self.NUM_QUESTIONS,
-              :self.NUM_COLORS] = np.tile(v, (self.NUM_QUESTIONS, 1))
-            Q[i * self.NUM_QUESTIONS:(i + 1) * self.NUM_QUESTIONS,
-              self.NUM_COLORS:] = np.diag(np.ones(self.NUM_QUESTIONS))
+        These matrices contain all possible questions about each object slot of the scenes (the questions about \
+        the objects not present in a scene, i.e. not ``valid``, being meaningless).
 
-        return Q
+        :param scenes: Abstract representation of the scenes (see ``generate_scenes()``).
+        :type scenes: dict
 
-    def generate_answer_matrix(self, objects):
+        :return: the questions matrices (``np.array``)
         """
-        Generates the answers matrix: [# of shape * # of Q, # of color + 4]
+        num_scenes = len(scenes['colors'])
+        Q = np.zeros((num_scenes, self.MAX_NUM_OBJECTS, self.NUM_QUESTIONS, self.NUM_COLORS + self.NUM_QUESTIONS),
+                     dtype=np.bool)
 
+        # Color of the object.
+        Q[..., :self.NUM_COLORS] = (scenes['colors'][..., np.newaxis] ==
+                                    np.arange(self.NUM_COLORS))[:, :, np.newaxis, :]
+        # Question type.
+        Q[..., self.NUM_COLORS:] = np.eye(self.NUM_QUESTIONS, dtype=np.bool)
 
-        `# of color + 4` = [color 1, color 2, ... , circle, rectangle, yes, no]
-
-        :param objects: List of objects - abstract scene representation.
-        :type objects: list
+        return Q.reshape(num_scenes, self.MAX_NUM_OBJECTS * self.NUM_QUESTIONS, -1)
 
-        :return: the answer matrix (``np.array``)
+    def generate_answer_matrices(self, scenes):
         """
-        A = np.zeros((len(objects) * self.NUM_QUESTIONS,
-                      self.NUM_COLORS + 4), dtype=np.bool)
+        Generates the answers matrices: [# of scenes, MAX_NUM_OBJECTS * # of Q, # of color + 4]
 
-        for i, obj in enumerate(objects):
-            # Q1: circle or rectangle?
-            if obj.shape:
-                A[i * self.NUM_QUESTIONS, self.NUM_COLORS + 1] = True
-            else:
-                A[i * self.NUM_QUESTIONS, self.NUM_COLORS] = True
 
-            # Q2: bottom?
-            if obj.y > int(self.img_size / 2):
-                A[i * self.NUM_QUESTIONS + 1, self.NUM_COLORS + 2] = True
-            else:
-                A[i * self.NUM_QUESTIONS + 1, self.NUM_COLORS + 3] = True
+        `# of color + 4` = [color 1, color 2, ... , circle, rectangle, yes, no]
 
-            # Q3: left?
-            if obj.x < int(self.img_size / 2):
-                A[i * self.NUM_QUESTIONS + 2, self.NUM_COLORS + 2] = True
-            else:
-                A[i * self.NUM_QUESTIONS + 2, self.NUM_COLORS + 3] = True
+        :param scenes: Abstract representation of the scenes (see ``generate_scenes()``).
+        :type scenes: dict
 
-            # Calculate distances.
-            distances = np.array(
-                [((obj.x - other_obj.x) ** 2 + (obj.y - other_obj.y) ** 2)
-                 for other_obj in objects])
-            idx = distances.argsort()
+        :return: the answers matrices (``np.array``)
+        """
+        x, y, colors, shapes, valid = scenes['x'], scenes['y'], scenes['colors'], scenes['shapes'], scenes['valid']
+        num_scenes = len(x)
+
+        # Calculate distances: [num_scenes, MAX_NUM_OBJECTS, MAX_NUM_OBJECTS].
+        distances = (x[:, :, np.newaxis] - x[:, np.newaxis, :]) ** 2 + (y[:, :, np.newaxis] - y[:, np.newaxis, :]) ** 2
+
+        # Ids of closest (other) and most distant objects, among the objects present in the scenes.
+        absent = ~valid[:, np.newaxis, :]
+        nearest = np.argmin(np.where(absent | np.eye(self.MAX_NUM_OBJECTS, dtype=np.bool), np.inf, distances), axis=2)
+        farthest = np.argmax(np.where(absent, -np.inf, distances), axis=2)
+        scene_index = np.arange(num_scenes)[:, np.newaxis]
+
+        # Answer indices: [num_scenes, MAX_NUM_OBJECTS, NUM_QUESTIONS].
+        answers = np.empty((num_scenes, self.MAX_NUM_OBJECTS, self.NUM_QUESTIONS), dtype=np.int64)
+
+        # Q1: circle or rectangle?
+        answers[:, :, 0] = self.NUM_COLORS + shapes
+        # Q2: bottom?
+        answers[:, :, 1] = np.where(y > int(self.img_size / 2), self.NUM_COLORS + 2, self.NUM_COLORS + 3)
+        # Q3: left?
+        answers[:, :, 2] = np.where(x < int(self.img_size / 2), self.NUM_COLORS + 2, self.NUM_COLORS + 3)
+        # Q4: the shape of the nearest object
+        answers[:, :, 3] = self.NUM_COLORS + shapes[scene_index, nearest]
+        # Q5: the shape of the farthest object
+        answers[:, :, 4] = self.NUM_COLORS + shapes[scene_index, farthest]
+        # Q6: the color of the nearest object
+        answers[:, :, 5] = colors[scene_index, nearest]
+        # Q7: the color of the farthest object
+        answers[:, :, 6] = colors[scene_index, farthest]
+
+        # One-hot encoding.
+        A = answers[..., np.newaxis] == np.arange(self.NUM_COLORS + 4)
+
+        return A.reshape(num_scenes, self.MAX_NUM_OBJECTS * self.NUM_QUESTIONS, -1)
+
+    def generate_samples(self, num_scenes):
+        """
+        Generates several scenes at once, with their images and all the questions about their objects.
 
-            # Ids of closest and most distant objects.
-            min_idx = idx[1]
-            max_idx = idx[-1]
+        :param num_scenes: Number of scenes to generate.
+        :type num_scenes: int
 
-            # Q4: the shape of the nearest object
-            A[i * self.NUM_QUESTIONS + 3,
-              self.NUM_COLORS + objects[min_idx].shape] = True
+        :return: Tuple containing:
 
-            # Q5: the shape of the farthest object
-            A[i * self.NUM_QUESTIONS + 4,
-              self.NUM_COLORS + objects[max_idx].shape] = True
+            - the images [num_scenes, img_size, img_size, 3] (uint8),
+            - the scenes descriptions (list of str),
+            - the index of the scene (image) of each sample,
+            - the questions & the answers of the samples (the questions of each scene being consecutive).
 
-            # Q6: the color of the nearest object
-            A[i * self.NUM_QUESTIONS + 5, objects[min_idx].color] = True
+        """
+        scenes = self.generate_scenes(num_scenes)
 
-            # Q7: the color of the farthest object
-            A[i * self.NUM_QUESTIONS + 6, objects[max_idx].color] = True
+        # Mask of the questions about the objects present in the scenes.
+        valid = np.repeat(scenes['valid'], self.NUM_QUESTIONS, axis=1)
+        image_index = np.nonzero(valid)[0]
 
-        return A
+        return self.generate_images(scenes), self.scenes2str(scenes), image_index, \
+            self.generate_question_matrices(scenes)[valid], self.generate_answer_matrices(scenes)[valid]
 
     def show_sample(self, data_dict, sample=0):
         """
@@ -1,5 +1,8 @@
-from .cifar10 import CIFAR10
-from .image_to_class_problem import ImageToClassProblem
-from .mnist import MNIST
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = ['CIFAR10', 'ImageToClassProblem', 'MNIST']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'CIFAR10': '.cifar10',
+    'ImageToClassProblem': '.image_to_class_problem',
+    'MNIST': '.mnist'
+})
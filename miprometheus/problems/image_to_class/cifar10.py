@@ -57,6 +57,9 @@ class CIFAR10(ImageToClassProblem):
                  ``cifar-10-batches-py`` will be saved,
                 - ``self.use_train_data`` (`bool`, `optional`) : If ``True``, creates dataset from training set, \
                     otherwise creates from test set,
+                - ``self.in_memory`` (`bool`, `optional`) : If ``True``, keeps the images in memory, upscaled & padded \
+                    once (cached in ``<data_folder>/preprocessed``), and reads whole batches at once instead of \
+                    transforming the samples one by one (default: ``False``),
                 - ``self.upscale`` : upscale the images to `[224, 224]` (input size of ``AlexNet``) if ``True``,
                 - ``self.padding`` : possibility to pad the images. e.g. ``self.padding = [0, 0, 0, 0]``. If \
                 padding upscaled images, the padding is applied after upscaling the images.
@@ -104,7 +107,10 @@ class CIFAR10(ImageToClassProblem):
         # up scaling the image to 224, 224 if True
         self.up_scaling = params['up_scaling']
 
-        if self.up_scaling:
+        # keep the preprocessed images in memory if True
+        self.in_memory = params.get('in_memory', False)
+
+        if self.up_scaling and not self.in_memory:
             self.logger.warning('Upscaling the images to [224, 224]. Slows down batches generation.')
 
         # define the default_values dict: holds parameters values that a model may need.
@@ -138,10 +144,21 @@ class CIFAR10(ImageToClassProblem):
         self.labels = 'Airplane Automobile Bird Cat Deer Dog Frog Horse Shipe Truck'.split(
             ' ')
 
+        if self.in_memory:
+            self.load_images_in_memory(self.dataset, os.path.join(data_folder, 'preprocessed'),
+                                       'train' if self.use_train_data else 'test',
+                                       size=[self.height, self.width] if self.up_scaling else None,
+                                       padding=self.padding)
+
     def __getitem__(self, index):
         """
         Getter method to access the dataset and return a sample.
 
+        .. note::
+
+            If ``self.in_memory``, a list of indices can be passed, in which case the whole batch is returned \
+            (see ``get_batch()``).
+
         :param index: index of the sample to return.
         :type index: int
 
@@ -153,6 +170,12 @@ class CIFAR10(ImageToClassProblem):
 
 
         """
+        if self.batch_getitem:
+            # The images are kept in memory: read the batch (or sample) directly.
+            if isinstance(index, (list, tuple, np.ndarray)):
+                return self.get_batch(index)
+            return self.get_sample(index)
+
 
         img, target = self.dataset.__getitem__(index)
         target = torch.tensor(target)
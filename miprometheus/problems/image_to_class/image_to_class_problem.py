@@ -65,6 +65,74 @@ class ImageToClassProblem(Problem):
         # "Default" problem name.
         self.name = 'ImageToClassProblem'
 
+    def load_images_in_memory(self, dataset, folder, split, size=None, padding=None):
+        """
+        Keeps the images of a ``torchvision`` dataset in memory, upscaled & padded once and cached in ``folder`` \
+        (see ``load_preprocessed_images()``). ``__getitem__`` then reads whole batches at once (see \
+        ``get_batch()``).
+
+        :param dataset: ``torchvision`` dataset.
+
+        :param folder: Folder containing the preprocessed images.
+        :type folder: str
+
+        :param split: Name of the split, e.g. ``train``.
+        :type split: str
+
+        :param size: Size [H, W] of the upscaled images (DEFAULT: None, i.e. no upscaling).
+        :type size: list
+
+        :param padding: Padding of the images (DEFAULT: None).
+        :type padding: list
+
+        """
+        from miprometheus.utils.problems_utils.preprocessed_images import load_preprocessed_images
+
+        self.images, targets = load_preprocessed_images(folder, dataset, split, size=size, padding=padding,
+                                                        logger=self.logger)
+        self.targets = torch.from_numpy(targets)
+
+        # __getitem__ can read whole batches at once.
+        self.batch_getitem = True
+
+    def get_batch(self, indices):
+        """
+        Reads a batch of samples from the images kept in memory (see ``load_images_in_memory()``).
+
+        :param indices: Indices of the samples.
+        :type indices: list
+
+        :return: ``DataDict({'images','targets', 'targets_label'})`` containing the batch.
+
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+
+        data_dict = self.create_data_dict()
+        data_dict['images'] = torch.from_numpy(self.images[indices]).float().div_(255)
+        data_dict['targets'] = self.targets[torch.from_numpy(indices)]
+        data_dict['targets_label'] = [self.labels[target] for target in data_dict['targets'].tolist()]
+
+        return data_dict
+
+    def get_sample(self, index):
+        """
+        Reads a single sample from the images kept in memory (see ``load_images_in_memory()``).
+
+        :param index: Index of the sample.
+        :type index: int
+
+        :return: ``DataDict({'images','targets', 'targets_label'})`` containing the sample.
+
+        """
+        batch = self.get_batch([index])
+
+        data_dict = self.create_data_dict()
+        data_dict['images'] = batch['images'][0]
+        data_dict['targets'] = batch['targets'][0]
+        data_dict['targets_label'] = batch['targets_label'][0]
+
+        return data_dict
+
     def calculate_accuracy(self, data_dict, logits):
         """
         Calculates accuracy equal to mean number of correct classification in a given batch.
@@ -22,6 +22,7 @@ __author__ = "Younes Bouhadjar & Vincent Marois"
 
 import os
 import torch
+import numpy as np
 import torch.nn.functional as F
 from torchvision import datasets, transforms
 
@@ -56,6 +57,9 @@ class MNIST(ImageToClassProblem):
                 - ``self.use_train_data`` (`bool`, `optional`) : If True, creates dataset from ``training.pt``,\
                     otherwise from ``test.pt``
                 - ``self.padding`` : possibility to pad the images. e.g. ``self.padding = [0, 0, 0, 0]``,
+                - ``self.in_memory`` (`bool`, `optional`) : If ``True``, keeps the images in memory, upscaled & padded \
+                    once (cached in ``<data_folder>/preprocessed``), and reads whole batches at once instead of \
+                    transforming the samples one by one (default: ``False``),
                 - ``self.upscale`` : upscale the images to `[224, 224]` if ``True``,
                 - ``self.defaut_values`` :
 
@@ -94,7 +98,10 @@ class MNIST(ImageToClassProblem):
         # up scaling the image to 224, 224 if True
         self.up_scaling = params['up_scaling']
 
-        if self.up_scaling:
+        # keep the preprocessed images in memory if True
+        self.in_memory = params.get('in_memory', False)
+
+        if self.up_scaling and not self.in_memory:
             self.logger.warning('Upscaling the images to [224, 224]. Slows down batches generation.')
 
         # define the default_values dict: holds parameters values that a model may need.
@@ -131,10 +138,21 @@ class MNIST(ImageToClassProblem):
         self.labels = 'Zero One Two Three Four Five Six Seven Eight Nine'.split(
             ' ')
 
+        if self.in_memory:
+            self.load_images_in_memory(self.dataset, os.path.join(data_folder, 'preprocessed'),
+                                       'train' if self.use_train_data else 'test',
+                                       size=[self.height, self.width] if self.up_scaling else None,
+                                       padding=self.padding)
+
     def __getitem__(self, index):
         """
         Getter method to access the dataset and return a sample.
 
+        .. note::
+
+            If ``self.in_memory``, a list of indices can be passed, in which case the whole batch is returned \
+            (see ``get_batch()``).
+
         :param index: index of the sample to return.
         :type index: int
 
@@ -146,6 +164,12 @@ class MNIST(ImageToClassProblem):
 
 
         """
+        if self.batch_getitem:
+            # The images are kept in memory: read the batch (or sample) directly.
+            if isinstance(index, (list, tuple, np.ndarray)):
+                return self.get_batch(index)
+            return self.get_sample(index)
+
         img, target = self.dataset.__getitem__(index)
 
         # pad img
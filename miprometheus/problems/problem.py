@@ -97,6 +97,10 @@ class Problem(Dataset):
 
             >>> self.app_state = AppState()
 
+        - indicates whether ``__getitem__`` can return whole batches (when passed a list of indices):
+
+            >>> self.batch_getitem = False
+
         """
         # Store pointer to params.
         self.params = params
@@ -135,6 +139,10 @@ class Problem(Dataset):
         # Get access to AppState: for dtype, visualization flag etc.
         self.app_state = AppState()
 
+        # Whether __getitem__ also accepts a list of indices, returning the whole (collated) batch - used by the
+        # problems which read batches more efficiently than individual samples.
+        self.batch_getitem = False
+
     def create_data_dict(self):
         """
         Returns a DataDict object with keys created on the problem data_definitions and empty values (None).
@@ -456,6 +464,21 @@ class Problem(Dataset):
         """
         pass
         
+    def get_sample_lengths(self):
+        """
+        Returns the lengths of the samples (e.g. the number of words of the questions), used to group samples \
+        of similar lengths into the same batches (see ``LengthBucketBatchSampler``).
+
+        .. note::
+
+            **To be redefined in subclasses yielding variable-length samples.** The base method returns None, \
+            i.e. the lengths are not available.
+
+        :return: Array of the lengths of the samples, or None.
+
+        """
+        return None
+
     def get_epoch_size(self, batch_size):
         """
         Compute the number of iterations ('episodes') to run given the size of the dataset and the batch size to cover
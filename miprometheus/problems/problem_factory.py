@@ -61,7 +61,12 @@ class ProblemFactory(object):
         # Get the class name.
         name = os.path.basename(params['name'])
 
-        # Get the actual class.
+        # Verify that the specified class is in the problems package.
+        if name not in dir(problems):
+            logger.error("Could not find the specified class '{}' in the problems package.".format(name))
+            exit(-1)
+
+        # Get the actual class - this imports its module (and its dependencies) on first use.
         problem_class = getattr(problems, name)
 
         # Check if class is derived (even indirectly) from Problem.
@@ -76,8 +81,15 @@ class ProblemFactory(object):
 
         # Ok, proceed.
         logger.info('Loading the {} problem from {}'.format(name, problem_class.__module__))
+        problem = problem_class(params)
+
+        # Cache the samples on disk if indicated.
+        if 'cache' in params:
+            from miprometheus.problems.cached_problem import CachedProblem
+            problem = CachedProblem(problem, params['cache'])
+
         # return the instantiated problem class
-        return problem_class(params)
+        return problem
 
 
 if __name__ == "__main__":
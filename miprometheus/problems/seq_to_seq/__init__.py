@@ -1,4 +1,29 @@
-from .algorithmic import *
-from .text2text import *
+from miprometheus.utils.lazy_module import lazy_module
 
-from .seq_to_seq_problem import SeqToSeqProblem
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'SequenceComparisonCommandLines': '.algorithmic',
+    'SequenceEqualityCommandLines': '.algorithmic',
+    'SequenceSymmetryCommandLines': '.algorithmic',
+    'DistractionCarry': '.algorithmic',
+    'DistractionForget': '.algorithmic',
+    'DistractionIgnore': '.algorithmic',
+    'InterruptionNot': '.algorithmic',
+    'InterruptionReverseRecall': '.algorithmic',
+    'InterruptionSwapRecall': '.algorithmic',
+    'ManipulationSpatialNot': '.algorithmic',
+    'ManipulationSpatialRotation': '.algorithmic',
+    'ManipulationTemporalSwap': '.algorithmic',
+    'SkipRecallCommandLines': '.algorithmic',
+    'OperationSpan': '.algorithmic',
+    'ReadingSpan': '.algorithmic',
+    'RepeatReverseRecallCommandLines': '.algorithmic',
+    'RepeatSerialRecallCommandLines': '.algorithmic',
+    'ReverseRecallCommandLines': '.algorithmic',
+    'ScratchPadCommandLines': '.algorithmic',
+    'SerialRecallCommandLines': '.algorithmic',
+    'TextToTextProblem': '.text2text',
+    'Lang': '.text2text',
+    'TranslationAnki': '.text2text',
+    'SeqToSeqProblem': '.seq_to_seq_problem'
+})
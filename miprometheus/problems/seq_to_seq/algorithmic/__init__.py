@@ -1,8 +1,25 @@
-from .dual_comparison import *
-from .dual_distraction import *
-from .dual_ignore import *
-from .manipulation_spatial import *
-from .manipulation_temporal import *
-from .recall import *
-
+from miprometheus.utils.lazy_module import lazy_module
 
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'SequenceComparisonCommandLines': '.dual_comparison',
+    'SequenceEqualityCommandLines': '.dual_comparison',
+    'SequenceSymmetryCommandLines': '.dual_comparison',
+    'DistractionCarry': '.dual_distraction',
+    'DistractionForget': '.dual_distraction',
+    'DistractionIgnore': '.dual_distraction',
+    'InterruptionNot': '.dual_ignore',
+    'InterruptionReverseRecall': '.dual_ignore',
+    'InterruptionSwapRecall': '.dual_ignore',
+    'ManipulationSpatialNot': '.manipulation_spatial',
+    'ManipulationSpatialRotation': '.manipulation_spatial',
+    'ManipulationTemporalSwap': '.manipulation_temporal',
+    'SkipRecallCommandLines': '.manipulation_temporal',
+    'OperationSpan': '.recall',
+    'ReadingSpan': '.recall',
+    'RepeatReverseRecallCommandLines': '.recall',
+    'RepeatSerialRecallCommandLines': '.recall',
+    'ReverseRecallCommandLines': '.recall',
+    'ScratchPadCommandLines': '.recall',
+    'SerialRecallCommandLines': '.recall'
+})
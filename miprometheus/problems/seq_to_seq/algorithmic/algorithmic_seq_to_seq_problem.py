@@ -21,6 +21,7 @@ algorithmic_seq_to_seq_problem.py: abstract base class for algorithmic sequentia
 """
 __author__ = "Tomasz Kornuta, Younes Bouhadjar, Vincent Marois"
 
+import os
 from abc import abstractmethod
 import numpy as np
 import torch
@@ -29,6 +30,8 @@ import torch.nn.functional as F
 
 from miprometheus.problems.seq_to_seq.seq_to_seq_problem import SeqToSeqProblem
 from miprometheus.utils.loss.masked_bce_with_logits_loss import MaskedBCEWithLogitsLoss
+from miprometheus.utils.problems_utils.data_preparation import prepare_artefact, get_config_hash
+from miprometheus.utils.problems_utils.sample_store import SampleStore, SampleStoreWriter
 
 
 class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
@@ -46,12 +49,28 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
             - "not_optimized": "__getitem__" generates a single sample, while \
             "collate_fn" collates them.
 
+            - "parallel": "__getitem__" receives the list of indices of a batch and generates the whole \
+            batch (see ``batch_getitem``), i.e. each dataloader worker generates complete batches \
+            independently (with its own random seed), which are prefetched while the model is trained.
+
+            - "materialized": the ``size`` samples are generated once (with the ``materialize_seed`` random \
+            seed) and stored in a ``SampleStore`` in ``data_folder``, from which ``__getitem__`` reads them \
+            (see ``materialize()``). Meant for the validation & test sets: the set is fixed, identical for all \
+            the experiments (e.g. of a grid) using the same configuration of the problem, and costs no generation.
+
     Advantage of the "not_optimized" mode is that a single batch will contain sequences of varying length.
     This mode is around 10 times slower though.
 
+    In the "optimized" & "parallel" modes, setting ``length_groups`` > 1 splits the batch into groups of \
+    samples, each group generated at once with its own random length (see ``generate_batch_of_varying_length``).
+
+    In all modes, the batches contain ``sequences_total_length`` (number of items of each sequence, \
+    before padding), and the sequences of varying length are sorted by decreasing length, so that the \
+    models can stop processing the samples which have ended (see ``SequentialModel.get_active_samples``).
+
     ..warning:
 
-        In both cases the derived classes will work as true data generators, \
+        In all but the "materialized" mode the derived classes will work as true data generators, \
         and not really care about the indices provided from the list. As a result,\
         each epoch will contain newly generated, thus different samples (for the same indices).
 
@@ -59,6 +78,7 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
 
         "optimized" mode is not suited to be used with many dataloader workers, i.e. \
         setting num_workers > 0 will in fact slow the whole generation (by 3-4 times!).
+        Use the "parallel" mode (with num_workers > 0) instead, e.g. for problems with long sequences.
 
     """
 
@@ -118,6 +138,7 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
                                  'masks': {'size': [-1, -1, 1], 'type': [torch.Tensor]},
                                  'sequences_length': {'size': [-1, 1], 'type': [torch.Tensor]},
                                  'num_subsequences': {'size': [-1, 1], 'type': [torch.Tensor]},
+                                 'sequences_total_length': {'size': [-1], 'type': [torch.Tensor]},
                                  }
 
         # Set the default size of the dataset.
@@ -136,18 +157,116 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
         self.params.add_default_params({'randomize_control_lines': True})
         self.randomize_control_lines = params['randomize_control_lines']
 
+        # Number of groups of samples of different lengths in a batch ("optimized" & "parallel" modes).
+        # (DEFAULT: 1, i.e. all the samples of a batch have the same length).
+        self.params.add_default_params({'length_groups': 1})
+        self.length_groups = params['length_groups']
+
+        # Budget of items (batch_size * total length of the samples) of a batch ("optimized" & "parallel" modes).
+        # (DEFAULT: None, i.e. fixed batch size, see ``get_batch_size()``).
+        self.params.add_default_params({'max_tokens': None})
+        self.max_tokens = params['max_tokens']
+
         # Set default data generation mode.
         self.params.add_default_params({'generation_mode': 'optimized'})
         gen_mode = params['generation_mode']
+        # Note: "__getitem__" and "collate_fn" dispatch on the generation mode of each instance (e.g. the training
+        # & validation problems of an experiment can use different modes).
+        if gen_mode == 'parallel':
+            # Whole batches are generated in the dataloader workers.
+            self.batch_getitem = True
+            # The max length is changed by curriculum learning in the main process: share it with the workers.
+            self._max_sequence_length.share_memory_()
+        elif gen_mode == 'materialized':
+            # Samples (or batches) are read from the store.
+            self.batch_getitem = True
+            self.params.add_default_params({'data_folder': '~/data/algorithmic',
+                                            'materialize_seed': 0})
+            # Opened (and generated if needed) on first access.
+            self.store = None
+
+    def __getitem__(self, index):
+        """
+        Returns a sample (or a batch), depending on the generation mode of the problem:
+
+            - "optimized": the index only (see ``do_not_generate_sample``),
+            - "parallel": a whole generated batch (see ``generate_batch_ignore_indices``),
+            - "materialized": sample(s) read from the store (see ``read_materialized_samples``),
+            - "not_optimized": a generated sample (see ``generate_sample_ignore_index``).
+
+        :param index: index of the sample, or list of indices of the samples of the batch.
+
+        :return: index or DataDict({'sequences', 'sequences_length', 'targets', 'masks', 'num_subsequences'}).
+
+        """
+        gen_mode = self.params['generation_mode']
         if gen_mode == 'optimized':
-            # "Attach" the "__getitem__" and "collate_fn" functions - generates whole batch at once, optimized.
-            setattr(self.__class__, '__getitem__', staticmethod(self.do_not_generate_sample))
-            setattr(self.__class__, 'collate_fn', staticmethod(self.collate_by_batch_generation))
+            return self.do_not_generate_sample(index)
+        elif gen_mode == 'parallel':
+            return self.generate_batch_ignore_indices(index)
+        elif gen_mode == 'materialized':
+            return self.read_materialized_samples(index)
         else:
-            # "Attach" the "__getitem__" and "collate_fn" functions - samples are generated one by one, slower.
-            setattr(self.__class__, '__getitem__', staticmethod(self.generate_sample_ignore_index))
-            setattr(self.__class__, 'collate_fn', staticmethod(self.collate_samples_from_batch))
+            return self.generate_sample_ignore_index(index)
+
+    def collate_fn(self, batch):
+        """
+        Combines the samples returned by ``__getitem__`` into a batch, depending on the generation mode of the \
+        problem: the batch is generated at once in the "optimized" & "parallel" modes (see \
+        ``collate_by_batch_generation``), the samples are collated otherwise (see ``collate_samples_from_batch``).
 
+        :param batch: list of the samples (or indices) returned by ``__getitem__``.
+
+        :return: DataDict({'sequences', 'sequences_length', 'targets', 'masks', 'num_subsequences'}).
+
+        """
+        if self.params['generation_mode'] in ['optimized', 'parallel']:
+            return self.collate_by_batch_generation(batch)
+        else:
+            return self.collate_samples_from_batch(batch)
+
+    @property
+    def max_sequence_length(self):
+        """
+        Max length of a single subsequence (number of elements), changed by curriculum learning.
+
+        .. note::
+
+            Stored in a tensor, shared with the dataloader workers in the "parallel" generation mode.
+
+        """
+        return int(self._max_sequence_length[0])
+
+    @max_sequence_length.setter
+    def max_sequence_length(self, max_length):
+        """
+        Sets the max length of a single subsequence.
+
+        :param max_length: Max length.
+        :type max_length: int
+
+        """
+        if '_max_sequence_length' not in self.__dict__:
+            self._max_sequence_length = torch.zeros(1, dtype=torch.int64)
+        self._max_sequence_length[0] = max_length
+
+    def worker_init_fn(self, worker_id):
+        """
+        Seeds the ``NumPy`` random generator of a dataloader worker.
+
+        .. note::
+
+            The samples are generated with ``NumPy``, and the workers are restarted at each epoch: the seed is \
+            derived from the ``torch`` seed of the worker (set by the ``DataLoader``, different for each worker \
+            and each epoch), so that each worker generates its own, new samples.
+
+        :param worker_id: the worker id (in [0, ``torch.utils.data.dataloader.DataLoader.num_workers`` - 1])
+        :type worker_id: int
+
+        """
+        super(AlgorithmicSeqToSeqProblem, self).worker_init_fn(worker_id)
+
+        np.random.seed(torch.initial_seed() % 2**32)
 
     def pad_collate_tensor_list(self, tensor_list, max_seq_len = -1):
         """
@@ -181,6 +300,149 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
 
         return collated_tensors
 
+    def generate_bit_sequences(self, batch_size, length):
+        """
+        Generates a batch of random bit sequences (drawn with probability ``self.bias``), directly in a tensor \
+        of type ``app_state.dtype``.
+
+        :param batch_size: Size of the batch.
+        :param length: Number of items of the sequences.
+
+        :return: [BATCH_SIZE, LENGTH, DATA_BITS] tensor.
+
+        """
+        return self.app_state.dtype(batch_size, int(length), self.data_bits).bernoulli_(self.bias)
+
+    @staticmethod
+    def marker_segments(ctrl_bit, num=1):
+        """
+        Returns the description of ``num`` markers, i.e. single items with a given control bit set \
+        (see ``assemble_batch()``).
+
+        :param ctrl_bit: Index of the control bit set by the marker.
+        :param num: Number of markers (DEFAULT: 1).
+
+        :return: [NUM, 6] array of segments.
+
+        """
+        segments = np.tile(np.array([1, ctrl_bit, -1, 1, 0, -1], dtype=np.int64), (num, 1))
+        return segments
+
+    @staticmethod
+    def data_segments(lengths, offsets, steps=1, shifts=0):
+        """
+        Returns the description of subsequences of data items (see ``assemble_batch()``).
+
+        The item ``k`` of a subsequence of length ``l`` is the item ``offset + (step * k + shift) % l`` of the \
+        batch of bit sequences, e.g. ``step=-1, shift=-1`` reverses the subsequence, whereas ``shift=n`` \
+        rotates it by ``n`` items to the left.
+
+        :param lengths: Lengths of the subsequences.
+        :param offsets: Offsets of the subsequences in the batch of bit sequences.
+        :param steps: Steps of the subsequences (DEFAULT: 1).
+        :param shifts: Shifts of the subsequences (DEFAULT: 0).
+
+        :return: [NUM_SUBSEQUENCES, 6] array of segments.
+
+        """
+        lengths = np.asarray(lengths, dtype=np.int64)
+        segments = np.zeros((len(lengths), 6), dtype=np.int64)
+        segments[:, 0] = lengths
+        segments[:, 1] = -1
+        segments[:, 2] = offsets
+        segments[:, 3] = steps
+        segments[:, 4] = shifts
+        segments[:, 5] = -1
+        return segments
+
+    @staticmethod
+    def dummy_segments(lengths, offsets):
+        """
+        Returns the description of subsequences of dummy items, i.e. items for which the model has to output \
+        the target subsequences (see ``assemble_batch()``).
+
+        :param lengths: Lengths of the subsequences.
+        :param offsets: Offsets of the subsequences in the batch of target bit sequences.
+
+        :return: [NUM_SUBSEQUENCES, 6] array of segments.
+
+        """
+        segments = AlgorithmicSeqToSeqProblem.data_segments(lengths, -1)
+        segments[:, 5] = offsets
+        return segments
+
+    @staticmethod
+    def interleave_segments(*segments):
+        """
+        Interleaves arrays of segments having the same number of rows, e.g. the markers (# #) and the \
+        subsequences (x1 x2) into (# x1 # x2).
+
+        :param segments: [NUM, 6] arrays of segments.
+
+        :return: [len(segments) * NUM, 6] array of segments.
+
+        """
+        return np.stack(segments, axis=1).reshape(-1, 6)
+
+    def assemble_batch(self, bit_sequences, segments, target_bit_sequences=None):
+        """
+        Assembles a batch of inputs, targets & masks from a succession of segments (markers, data subsequences \
+        and dummies), the same for all samples of the batch.
+
+        Each segment is described by a row (length, control bit, input offset, input step, input shift, \
+        target offset) (-1: no control bit / input / target), created by ``marker_segments()``, \
+        ``data_segments()`` & ``dummy_segments()``.
+
+        .. note::
+
+            The segments are placed at once in preallocated tensors: the positions of the items & the indices of \
+            the data items are computed from the lengths of the segments, so that generating a batch costs a few \
+            tensor operations whatever the number of subsequences.
+
+        :param bit_sequences: [BATCH_SIZE, NUM_ITEMS, DATA_BITS] data items (see ``generate_bit_sequences()``).
+        :param segments: [NUM_SEGMENTS, 6] array of segments.
+        :param target_bit_sequences: Target items (DEFAULT: None, i.e. ``bit_sequences``).
+
+        :return: Tuple (inputs, targets, masks), with:
+
+            - inputs: [BATCH_SIZE, SEQ_LENGTH, CONTROL_BITS+DATA_BITS],
+            - targets: [BATCH_SIZE, SEQ_LENGTH, DATA_BITS],
+            - masks: [BATCH_SIZE, SEQ_LENGTH, 1] (set for the dummy items).
+
+        """
+        if target_bit_sequences is None:
+            target_bit_sequences = bit_sequences
+
+        segments = np.concatenate(segments) if isinstance(segments, (list, tuple)) else segments
+        lengths, ctrl_bits, input_offsets, input_steps, input_shifts, target_offsets = segments.T
+
+        # Segment of each item & position of each item in its segment.
+        segment = np.repeat(np.arange(len(segments)), lengths)
+        position = np.arange(len(segment)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+        batch_size, seq_length = bit_sequences.shape[0], len(segment)
+        inputs = self.app_state.dtype(batch_size, seq_length, self.control_bits + self.data_bits).zero_()
+        targets = self.app_state.dtype(batch_size, seq_length, self.data_bits).zero_()
+        masks = torch.zeros([batch_size, seq_length, 1]).type(torch.ByteTensor)
+
+        # Set the control bits.
+        items = np.flatnonzero(ctrl_bits[segment] >= 0)
+        inputs[:, torch.from_numpy(items), torch.from_numpy(ctrl_bits[segment[items]])] = 1
+
+        # Copy the data items.
+        items = np.flatnonzero(input_offsets[segment] >= 0)
+        seg = segment[items]
+        indices = input_offsets[seg] + (input_steps[seg] * position[items] + input_shifts[seg]) % lengths[seg]
+        inputs[:, torch.from_numpy(items), self.control_bits:] = bit_sequences[:, torch.from_numpy(indices)]
+
+        # Copy the target items & set the mask.
+        items = np.flatnonzero(target_offsets[segment] >= 0)
+        indices = target_offsets[segment[items]] + position[items]
+        targets[:, torch.from_numpy(items)] = target_bit_sequences[:, torch.from_numpy(indices)]
+        masks[:, torch.from_numpy(items)] = 1
+
+        return inputs, targets, masks
+
     @abstractmethod
     def generate_batch(self, batch_size):
         """
@@ -229,6 +491,7 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
         """
         # Generate batch of size 1.
         data_dict = self.generate_batch(1)
+        data_dict['sequences_total_length'] = torch.tensor([data_dict['sequences'].shape[1]])
 
         # Squeeze the batch dimension.
         for key in self.data_definitions.keys():
@@ -252,8 +515,12 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
             - targets: [BATCH_SIZE, 2*MAX_SEQ_LENGTH+2, DATA_BITS],
             - mask: [BATCH_SIZE, [2*MAX_SEQ_LENGTH+2]
             - num_subsequences: [BATCH_SIZE, 1]
+            - sequences_total_length: [BATCH_SIZE] (samples sorted by decreasing total length)
 
         """
+        # Sort the samples by decreasing total length.
+        batch_of_dicts = sorted(batch_of_dicts, key=lambda d: d['sequences'].shape[0], reverse=True)
+
         # Get max total (input+markers+output) length.
         max_batch_total_len = max([d['sequences'].shape[0] for d in batch_of_dicts])
 
@@ -287,6 +554,7 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
         data_dict['targets'] = collated_targets
         data_dict['masks'] = collated_masks
         data_dict['num_subsequences'] = collated_num_subsequences
+        data_dict['sequences_total_length'] = torch.tensor([d['sequences'].shape[0] for d in batch_of_dicts])
 
         return data_dict        
 
@@ -310,6 +578,26 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
 
 
 
+    def generate_batch_ignore_indices(self, indices):
+        """
+        Method used as __getitem__ in "parallel" mode: generates a whole batch.
+
+        .. warning::
+
+            As the name of the method suggests, the indices will in fact be ignored during generation.
+
+        :param indices: list of indices of the samples of the batch (IGNORED, only their number is used).
+
+        :return: DataDict({'sequences', 'sequences_length', 'targets', 'masks', 'num_subsequences'}) (see \
+        ``generate_batch``).
+
+        """
+        if not isinstance(indices, (list, tuple, np.ndarray)):
+            # A single sample was requested.
+            return self.generate_sample_ignore_index(indices)
+
+        return self.generate_batch_of_varying_length(len(indices))
+
     def collate_by_batch_generation(self, batch):
         """
         Generates a batch of samples on-the-fly.
@@ -330,8 +618,219 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
             - num_subsequences: [BATCH_SIZE, 1]
 
         """
-        # Generate batch of size 1.
-        data_dict = self.generate_batch(len(batch))
+        # Generate batch.
+        data_dict = self.generate_batch_of_varying_length(len(batch))
+
+        return data_dict
+
+    def get_materialized_path(self):
+        """
+        Returns the path to the store of the materialized samples: ``<data_folder>/<problem>_<hash>``, where the \
+        hash identifies the configuration of the problem (except the ``generation_mode`` & ``data_folder``), \
+        including the ``materialize_seed``.
+
+        :return: Path (str).
+
+        """
+        config = {key: value for key, value in self.params.to_dict().items()
+                  if key not in ['generation_mode', 'data_folder']}
+        config_hash = get_config_hash(config)
+
+        return os.path.join(os.path.expanduser(self.params['data_folder']),
+                            '{}_{}'.format(self.__class__.__name__, config_hash[:12]))
+
+    def materialize(self):
+        """
+        Opens the store of the materialized samples, generating it first if it does not exist.
+
+        The samples are generated batch by batch (see ``generate_batch_of_varying_length``) with the \
+        ``materialize_seed`` random seed (the random generators, CPU & CUDA, are restored afterwards), and stored \
+        without their padding (i.e. ``sequences_total_length`` items).
+
+        .. note::
+
+            When several processes (e.g. the experiments of a grid, or the dataloader workers) need the same \
+            set, only one of them generates it while the others wait and then reuse it.
+
+        :return: ``SampleStore``.
+
+        """
+        path = self.get_materialized_path()
+
+        def build(tmp_path):
+            self.logger.info('Generating {} samples in {}'.format(self.length, path))
+            writer = SampleStoreWriter(os.path.join(tmp_path, 'shard_0'))
+
+            # Fix the random generators (the bits are drawn on the device of app_state.dtype, possibly a GPU).
+            torch_state, numpy_state = torch.get_rng_state(), np.random.get_state()
+            cuda_states = torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None
+            torch.manual_seed(self.params['materialize_seed'])
+            np.random.seed(self.params['materialize_seed'])
+            try:
+                index = 0
+                while index < self.length:
+                    data_dict = self.generate_batch_of_varying_length(min(self.params['batch_size'],
+                                                                          self.length - index))
+                    num_samples = min(data_dict['sequences'].shape[0], self.length - index)
+
+                    for i in range(num_samples):
+                        total_length = int(data_dict['sequences_total_length'][i])
+                        writer.append(index, {
+                            'sequences': data_dict['sequences'][i, :total_length],
+                            'targets': data_dict['targets'][i, :total_length],
+                            'masks': data_dict['masks'][i, :total_length],
+                            'sequences_length': data_dict['sequences_length'][i],
+                            'num_subsequences': data_dict['num_subsequences'][i],
+                            'sequences_total_length': data_dict['sequences_total_length'][i]})
+                        index += 1
+            finally:
+                torch.set_rng_state(torch_state)
+                np.random.set_state(numpy_state)
+                if cuda_states is not None:
+                    torch.cuda.set_rng_state_all(cuda_states)
+
+            writer.close()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        prepare_artefact(path, build, logger=self.logger)
+
+        return SampleStore(path)
+
+    def read_materialized_samples(self, indices):
+        """
+        Method used as __getitem__ in "materialized" mode: reads a sample (or a whole batch) from the store.
+
+        :param indices: index of the sample, or list of indices of the samples of the batch.
+
+        :return: DataDict({'sequences', 'sequences_length', 'targets', 'masks', 'num_subsequences', \
+        'sequences_total_length'}), a single sample (see ``generate_sample_ignore_index``) or a batch \
+        (see ``collate_samples_from_batch``).
+
+        """
+        if self.store is None:
+            self.store = self.materialize()
+
+        if not isinstance(indices, (list, tuple, np.ndarray)):
+            # A single sample was requested.
+            data_dict = self.create_data_dict()
+            for key, value in self.store[int(indices)].items():
+                data_dict[key] = value
+            return data_dict
+
+        return self.collate_samples_from_batch([self.read_materialized_samples(i) for i in indices])
+
+    def get_sample_lengths(self):
+        """
+        Returns the total lengths of the samples in the "materialized" mode (e.g. to group the samples of \
+        similar lengths with ``LengthBucketBatchSampler``), None otherwise (the samples are generated).
+
+        :return: Array of the total lengths of the samples, or None.
+
+        """
+        if self.params['generation_mode'] != 'materialized':
+            return None
+
+        if self.store is None:
+            self.store = self.materialize()
+
+        return np.array([int(self.store[i]['sequences_total_length']) for i in range(len(self.store))])
+
+    def get_max_total_length(self):
+        """
+        Returns the maximal total length (number of items, including the markers) of a sample, given the current \
+        ``self.max_sequence_length``.
+
+        .. note::
+
+            The base method returns the length of a sample made of a single sequence to be stored & recalled \
+            (i.e. 2 * MAX_SEQ_LENGTH + 2). Should be overwritten by the problems with a different structure.
+
+        :return: Maximal total length of a sample.
+
+        """
+        return 2 * self.max_sequence_length + 2
+
+    def get_batch_size(self, batch_size):
+        """
+        Returns the size of the next batch to generate.
+
+        When ``max_tokens`` is set, the batch size is chosen so that the batch contains at most ``max_tokens`` \
+        items (i.e. batch_size * ``get_max_total_length()`` <= ``max_tokens``, with at least one sample): \
+        the batches get smaller as curriculum learning increases ``max_sequence_length``.
+
+        .. note::
+
+            The number of episodes of an epoch is left unchanged (it is still given by the ``batch_size`` \
+            parameter), only the number of samples of the batches varies.
+
+        :param batch_size: Requested batch size (i.e. the number of indices received from the sampler).
+
+        :return: Batch size.
+
+        """
+        if self.max_tokens is None:
+            return batch_size
+
+        return max(1, int(self.max_tokens) // self.get_max_total_length())
+
+    def generate_batch_of_varying_length(self, batch_size):
+        """
+        Generates a batch made of ``self.length_groups`` groups of samples, each group being generated at once \
+        by ``generate_batch`` (i.e. with its own random length).
+
+        The groups are padded to the length of the longest one & sorted by decreasing total length, so that \
+        the models can stop processing the samples which have ended (see ``sequences_total_length``).
+
+        .. note::
+
+            The generation costs ``self.length_groups`` calls to ``generate_batch``, whereas the \
+            "not_optimized" mode generates (and pads) the samples one by one.
+
+        :param batch_size: Size of the batch to be returned (see ``get_batch_size()``).
+
+        :return: DataDict({'sequences', 'sequences_length', 'targets', 'masks', 'num_subsequences', \
+        'sequences_total_length'}), with:
+
+            - sequences: [BATCH_SIZE, MAX_TOTAL_LENGTH, CONTROL_BITS+DATA_BITS]
+            - sequences_length: [BATCH_SIZE, 1]
+            - targets: [BATCH_SIZE, MAX_TOTAL_LENGTH, DATA_BITS]
+            - masks: [BATCH_SIZE, MAX_TOTAL_LENGTH, 1]
+            - num_subsequences: [BATCH_SIZE, 1]
+            - sequences_total_length: [BATCH_SIZE] (number of items of each sequence, before padding)
+
+        """
+        batch_size = self.get_batch_size(batch_size)
+        num_groups = max(1, min(self.length_groups, batch_size))
+
+        # Generate the groups, longest first.
+        group_sizes = [len(group) for group in np.array_split(np.arange(batch_size), num_groups)]
+        groups = [self.generate_batch(size) for size in group_sizes]
+        groups.sort(key=lambda group: group['sequences'].shape[1], reverse=True)
+
+        total_lengths = torch.cat([torch.ones(group['sequences'].shape[0]).type(torch.LongTensor) *
+                                   group['sequences'].shape[1] for group in groups])
+
+        if num_groups == 1:
+            data_dict = groups[0]
+            data_dict['sequences_total_length'] = total_lengths
+            return data_dict
+
+        # Copy the groups into preallocated (padded) tensors.
+        data_dict = self.create_data_dict()
+        max_total_length = groups[0]['sequences'].shape[1]
+        for key in ['sequences', 'targets', 'masks']:
+            first = groups[0][key]
+            data_dict[key] = first.new_zeros((batch_size, max_total_length) + tuple(first.shape[2:]))
+
+            start = 0
+            for group in groups:
+                data_dict[key][start:start + group[key].shape[0], :group[key].shape[1]] = group[key]
+                start += group[key].shape[0]
+
+        for key in ['sequences_length', 'num_subsequences']:
+            data_dict[key] = torch.cat([group[key] for group in groups])
+
+        data_dict['sequences_total_length'] = total_lengths
 
         return data_dict
 
@@ -551,7 +1050,9 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
 
         stat_agg['acc_min'] = min(stat_col['acc'])
         stat_agg['acc_max'] = max(stat_col['acc'])
-        stat_agg['acc'] = torch.mean(torch.tensor(stat_col['acc']))
+        # Average over the samples (the batches may have different sizes, see ``get_batch_size()``).
+        stat_agg['acc'] = torch.sum(torch.tensor(stat_col['acc']) * torch.tensor(stat_col['batch_size']).float()) / \
+            sum(stat_col['batch_size'])
         stat_agg['acc_std'] = 0.0 if len(stat_col['acc']) <= 1 else torch.std(torch.tensor(stat_col['acc']))
         stat_agg['samples_aggregated'] = sum(stat_col['batch_size'])
 
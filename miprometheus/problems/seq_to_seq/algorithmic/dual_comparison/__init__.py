@@ -1,9 +1,8 @@
-from .sequence_comparison_cl import SequenceComparisonCommandLines
-from .sequence_equality_cl import SequenceEqualityCommandLines
-from .sequence_symmetry_cl import SequenceSymmetryCommandLines
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = [
-    'SequenceComparisonCommandLines',
-    'SequenceEqualityCommandLines',
-    'SequenceSymmetryCommandLines'
-    ]
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'SequenceComparisonCommandLines': '.sequence_comparison_cl',
+    'SequenceEqualityCommandLines': '.sequence_equality_cl',
+    'SequenceSymmetryCommandLines': '.sequence_symmetry_cl'
+})
@@ -1,9 +1,8 @@
-from .distraction_carry import DistractionCarry
-from .distraction_forget import DistractionForget
-from .distraction_ignore import DistractionIgnore
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = [
-    'DistractionCarry',
-    'DistractionForget',
-    'DistractionIgnore'
-    ]
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'DistractionCarry': '.distraction_carry',
+    'DistractionForget': '.distraction_forget',
+    'DistractionIgnore': '.distraction_ignore'
+})
@@ -23,7 +23,6 @@ __author__ = "Younes Bouhadjar & Vincent Marois"
 
 import torch
 import numpy as np
-from miprometheus.utils.data_dict import DataDict
 from miprometheus.problems.seq_to_seq.algorithmic.algorithmic_seq_to_seq_problem import AlgorithmicSeqToSeqProblem
 
 
@@ -66,263 +65,81 @@ class DistractionForget(AlgorithmicSeqToSeqProblem):
                                'num_subseq_max': self.num_subseq_max,
                                }
 
-    def __getitem__(self, index):
+    def get_max_total_length(self):
         """
-        Getter that returns one individual sample generated on-the-fly
+        Returns the maximal total length (number of items, including the markers) of a sample, given the current \
+        ``self.max_sequence_length`` (used by ``get_batch_size()``).
 
-        .. note::
-
-            The sequence length is drawn randomly between ``self.min_sequence_length`` and \
-            ``self.max_sequence_length``.
-
-
-        :param index: index of the sample to return.
-
-        :return: DataDict({'sequences', 'sequences_length', 'targets', 'mask', 'num_subsequences'}), with:
-
-            - sequences: [SEQ_LENGTH, CONTROL_BITS+DATA_BITS],
-            - **sequences_length: random value between self.min_sequence_length and self.max_sequence_length**
-            - targets: [SEQ_LENGTH, DATA_BITS],
-            - mask: [SEQ_LENGTH]
-            - num_subsequences: 1
-
-            pattern of inputs: # x1 % y1 & d1 # x2 % y2 & d2 ... # xn % yn & dn $ d`
-            pattern of target:    d   d    y1   d    d    y2  ...   d   d    yn   all(xi)
-            mask: used to mask the data part of the target.
-            xi, yi, and dn(d'): sub sequences x of random length, sub sequence y of random length and dummies.
-
-        # TODO: THE DOCUMENTATION NEEDS TO BE UPDATED
-        # TODO: This is commented for now to avoid the issue with `add_ctrl` and `augment` in AlgorithmicSeqToSeqProblem
-        # TODO: NOT SURE THAT THIS FN IS WORKING WELL (WITHOUT THE PRESENCE OF THE BATCH DIMENSION)
+        :return: num_subseq_max * (4 * max_sequence_length + 3) + 1
 
         """
-        '''
-        # define control channel markers
-        pos = [0, 0, 0, 0]
-        ctrl_data = [0, 0, 0, 0]
-        ctrl_dummy = [0, 0, 1, 0]
-        ctrl_inter = [0, 0, 0, 1]
-        # assign markers
-        markers = ctrl_data, ctrl_dummy, pos
-
-        # number of sub_sequences
-        nb_sub_seq_a = np.random.randint(
-            self.num_subseq_min, self.num_subseq_max + 1)
-        # might be different in future implementation
-        nb_sub_seq_b = nb_sub_seq_a
-
-        # set the sequence length of each marker
-        seq_lengths_a = np.random.randint(
-            low=self.min_sequence_length,
-            high=self.max_sequence_length + 1,
-            size=nb_sub_seq_a)
-        seq_lengths_b = np.random.randint(
-            low=self.min_sequence_length,
-            high=self.max_sequence_length + 1,
-            size=nb_sub_seq_b)
-
-        #  generate subsequences for x and y
-        x = [
-            np.random.binomial(
-                1,
-                self.bias,
-                (n,
-                 self.data_bits)) for n in seq_lengths_a]
-        y = [
-            np.random.binomial(
-                1,
-                self.bias,
-                (n,
-                 self.data_bits)) for n in seq_lengths_b]
-
-        # create the target
-        target = np.concatenate(y + x, axis=0)
-
-        # add marker at the begging of x and dummies of same length,  also a
-        # marker at the begging of dummies is added
-        xx = [self.augment(seq, markers, ctrl_start=[
-                           1, 0, 0, 0], add_marker_data=True) for seq in x]
-        # add marker at the begging of y and dummies of same length, also a
-        # marker at the begging of dummies is added
-        yy = [self.augment(seq, markers, ctrl_start=[
-                           0, 1, 0, 0], add_marker_data=True) for seq in y]
-
-        # this is a marker to separate dummies of x and y at the end of the
-        # sequence
-        inter_seq = self.add_ctrl(
-            np.zeros((1, self.data_bits)), ctrl_inter, pos)
-
-        # data which contains all xs and all ys plus dummies of ys
-        data_1 = [arr for a, b in zip(xx, yy) for arr in a[:-1] + b]
-
-        # dummies of xs
-        data_2 = [a[-1][1:, :] for a in xx]
-
-        # concatenate all parts of the inputs
-        inputs = np.concatenate(data_1 + [inter_seq] + data_2, axis=0)
-
-        # PyTorch variables
-        inputs = torch.from_numpy(inputs).type(self.app_state.dtype)
-        target = torch.from_numpy(target).type(self.app_state.dtype)
-
-        # create the mask
-        mask_all = inputs[:, 0:self.control_bits] == 1
-        mask = mask_all[..., 0]
-        for i in range(self.control_bits):
-            mask = mask_all[..., i] * mask
-
-        # rest ctrl channel of dummies
-        inputs[mask[0], 0:self.control_bits] = 0
-
-        # Create the target with the dummies
-        target_with_dummies = torch.zeros_like(
-            inputs[:, self.control_bits:])
-        target_with_dummies[mask[0], :] = target
+        return self.num_subseq_max * (4 * self.max_sequence_length + 3) + 1
 
-        # Return data_dict.
-        data_dict = DataDict({key: None for key in self.data_definitions.keys()})
-        data_dict['sequences'] = inputs
-        data_dict['sequences_length'] = max(seq_lengths_a)
-        data_dict['targets'] = target_with_dummies
-        data_dict['mask'] = mask
-        data_dict['num_subsequences'] = nb_sub_seq_a + nb_sub_seq_b
-        '''
+    def generate_batch(self, batch_size):
+        """
+        Generates a batch of samples of size ''batch_size'' on-the-fly.
 
-        return DataDict({key: None for key in self.data_definitions.keys()})  # data_dict
+        .. note::
 
-    def collate_fn(self, batch):
-        """
-        Generates a batch of samples on-the-fly
+            The number of subsequences is drawn randomly between ``self.num_subseq_min`` and \
+            ``self.num_subseq_max``, and their lengths between ``self.min_sequence_length`` and \
+            ``self.max_sequence_length``.
 
         .. warning::
-            Because of the fact that the sequence length is randomly drawn between ``self.min_sequence_length`` and \
-            ``self.max_sequence_length`` and then fixed for one given batch (**but varies between batches**), \
-            we cannot follow the scheme `merge together individuals samples that can be retrieved in parallel with\
-            several workers.` Indeed, each sample could have a different sequence length, and merging them together\
-            would then not be possible (we cannot have variable-sequence-length samples within one batch \
-            without padding).
-            Hence, ``collate_fn`` generates on-the-fly a batch of samples, all having the same length (initially\
-            randomly selected).
-            The samples created by ``__getitem__`` are simply not used in this function.
+            All the samples within the batch will have the same sequence length.
 
+        :param batch_size: Size of the batch to be returned.
 
-        :param batch: Should be a list of DataDict retrieved by `__getitem__`, each containing tensors, numbers,\
-        dicts or lists. --> **Not Used Here!**
+        :return: DataDict({'sequences', 'sequences_length', 'targets', 'masks', 'num_subsequences'}), with:
 
-        :return: DataDict({'sequences', 'sequences_length', 'targets', 'mask', 'num_subsequences'}), with:
-
-            - sequences: [BATCH_SIZE, 2*SEQ_LENGTH+2, CONTROL_BITS+DATA_BITS],
-            - **sequences_length: random value between self.min_sequence_length and self.max_sequence_length**
-            - targets: [BATCH_SIZE, 2*SEQ_LENGTH+2, DATA_BITS],
-            - mask: [BATCH_SIZE, [2*SEQ_LENGTH+2]
-            - num_subsequences: 1
+            - sequences: [BATCH_SIZE, SEQ_LENGTH, CONTROL_BITS+DATA_BITS],
+            - sequences_length: [BATCH_SIZE, 1] (max length of the subsequences x)
+            - targets: [BATCH_SIZE, SEQ_LENGTH, DATA_BITS],
+            - masks: [BATCH_SIZE, SEQ_LENGTH, 1]
+            - num_subsequences: [BATCH_SIZE, 1] (number of subsequences x and y)
 
         pattern of inputs: # x1 % y1 & d1 # x2 % y2 & d2 ... # xn % yn & dn $ d`
-        pattern of target:    d   d    y1   d    d    y2  ...   d   d    yn   all(xi)
+        pattern of target:                d1            d2      ...         dn   all(xi)
         mask: used to mask the data part of the target.
         xi, yi, and dn(d'): sub sequences x of random length, sub sequence y of random length and dummies.
 
-        # TODO: THE DOCUMENTATION NEEDS TO BE UPDATED & IMPROVED
-
         """
-        # get the batch_size
-        batch_size = len(batch)
-
-        # define control channel markers
-        pos = [0, 0, 0, 0]
-        ctrl_data = [0, 0, 0, 0]
-        ctrl_dummy = [0, 0, 1, 0]
-        ctrl_inter = [0, 0, 0, 1]
-
-        # assign markers
-        markers = ctrl_data, ctrl_dummy, pos
-
         # number of sub_sequences
-        nb_sub_seq_a = np.random.randint(
-            self.num_subseq_min, self.num_subseq_max + 1)
-
+        nb_sub_seq_a = np.random.randint(self.num_subseq_min, self.num_subseq_max + 1)
         # might be different in future implementation
         nb_sub_seq_b = nb_sub_seq_a
 
         # set the sequence length of each marker
-        seq_lengths_a = np.random.randint(
-            low=self.min_sequence_length,
-            high=self.max_sequence_length + 1,
-            size=nb_sub_seq_a)
-        seq_lengths_b = np.random.randint(
-            low=self.min_sequence_length,
-            high=self.max_sequence_length + 1,
-            size=nb_sub_seq_b)
-
-        #  generate subsequences for x and y
-        x = [
-            np.random.binomial(
-                1,
-                self.bias,
-                (batch_size,
-                 n,
-                 self.data_bits)) for n in seq_lengths_a]
-        y = [
-            np.random.binomial(
-                1,
-                self.bias,
-                (batch_size,
-                 n,
-                 self.data_bits)) for n in seq_lengths_b]
-
-        # create the target
-        target = np.concatenate(y + x, axis=1)
-
-        # add marker at the begging of x and dummies of same length,  also a
-        # marker at the begging of dummies is added
-        xx = [self.augment(seq, markers, ctrl_start=[
-            1, 0, 0, 0], add_marker_data=True) for seq in x]
-
-        # add marker at the begging of y and dummies of same length, also a
-        # marker at the begging of dummies is added
-        yy = [self.augment(seq, markers, ctrl_start=[
-            0, 1, 0, 0], add_marker_data=True) for seq in y]
-
-        # this is a marker to separate dummies of x and y at the end of the
-        # sequence
-        inter_seq = self.add_ctrl(
-            np.zeros((batch_size, 1, self.data_bits)), ctrl_inter, pos)
-
-        # data which contains all xs and all ys plus dummies of ys
-        data_1 = [arr for a, b in zip(xx, yy) for arr in a[:-1] + b]
-
-        # dummies of xs
-        data_2 = [a[-1][:, 1:, :] for a in xx]
-
-        # concatenate all parts of the inputs
-        inputs = np.concatenate(data_1 + [inter_seq] + data_2, axis=1)
-
-        # PyTorch variables
-        inputs = torch.from_numpy(inputs).type(self.app_state.dtype)
-        target = torch.from_numpy(target).type(self.app_state.dtype)
-
-        # create the mask
-        mask_all = inputs[:, :, 0:self.control_bits] == 1
-        mask = mask_all[..., 0]
-        for i in range(self.control_bits):
-            mask = mask_all[..., i] * mask
-
-        # rest ctrl channel of dummies
-        inputs[:, mask[0], 0:self.control_bits] = 0
-
-        # Create the target with the dummies
-        target_with_dummies = torch.zeros_like(
-            inputs[:, :, self.control_bits:])
-        target_with_dummies[:, mask[0], :] = target
+        seq_lengths_a = np.random.randint(low=self.min_sequence_length, high=self.max_sequence_length + 1,
+                                          size=nb_sub_seq_a)
+        seq_lengths_b = np.random.randint(low=self.min_sequence_length, high=self.max_sequence_length + 1,
+                                          size=nb_sub_seq_b)
+
+        # generate all subsequences x followed by all subsequences y, and their offsets
+        bit_seq = self.generate_bit_sequences(batch_size, seq_lengths_a.sum() + seq_lengths_b.sum())
+        offsets_a = np.cumsum(seq_lengths_a) - seq_lengths_a
+        offsets_b = seq_lengths_a.sum() + np.cumsum(seq_lengths_b) - seq_lengths_b
+
+        # add a marker at the beginning of each x and y, y is followed by its dummies (with a marker):
+        # x1 % y1 & d1 # x2 % y2 & d2 ... # xn % yn & dn
+        data = self.interleave_segments(self.marker_segments(0, nb_sub_seq_a),
+                                        self.data_segments(seq_lengths_a, offsets_a),
+                                        self.marker_segments(1, nb_sub_seq_b),
+                                        self.data_segments(seq_lengths_b, offsets_b),
+                                        self.marker_segments(2, nb_sub_seq_b),
+                                        self.dummy_segments(seq_lengths_b, offsets_b))
+
+        # marker separating the dummies of all xs: $ d`
+        inputs, targets, masks = self.assemble_batch(bit_seq, [
+            data, self.marker_segments(3), self.dummy_segments(seq_lengths_a, offsets_a)])
 
         # Return data_dict.
-        data_dict = DataDict({key: None for key in self.data_definitions.keys()})
+        data_dict = self.create_data_dict()
         data_dict['sequences'] = inputs
-        data_dict['sequences_length'] = max(seq_lengths_a)
-        data_dict['targets'] = target_with_dummies
-        data_dict['mask'] = mask
-        data_dict['num_subsequences'] = nb_sub_seq_a + nb_sub_seq_b
-
+        data_dict['targets'] = targets
+        data_dict['masks'] = masks
+        data_dict['sequences_length'] = torch.ones([batch_size, 1]).type(torch.CharTensor) * max(seq_lengths_a).item()
+        data_dict['num_subsequences'] = torch.ones([batch_size, 1]).type(torch.CharTensor) * (nb_sub_seq_a + nb_sub_seq_b)
         return data_dict
 
     # method for changing the maximum length, used mainly during curriculum
@@ -1,9 +1,8 @@
-from .interruption_not import InterruptionNot
-from .interruption_reverse_recall import InterruptionReverseRecall
-from .interruption_swap_recall import InterruptionSwapRecall
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = [
-    'InterruptionNot',
-    'InterruptionReverseRecall',
-    'InterruptionSwapRecall'
-    ]
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'InterruptionNot': '.interruption_not',
+    'InterruptionReverseRecall': '.interruption_reverse_recall',
+    'InterruptionSwapRecall': '.interruption_swap_recall'
+})
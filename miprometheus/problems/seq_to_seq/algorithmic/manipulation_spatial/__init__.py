@@ -1,7 +1,7 @@
-from .manipulation_spatial_not import ManipulationSpatialNot
-from .manipulation_spatial_rotation import ManipulationSpatialRotation
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = [
-    'ManipulationSpatialNot',
-    'ManipulationSpatialRotation'
-    ]
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'ManipulationSpatialNot': '.manipulation_spatial_not',
+    'ManipulationSpatialRotation': '.manipulation_spatial_rotation'
+})
@@ -1,7 +1,7 @@
-from .manipulation_temporal_swap import ManipulationTemporalSwap
-from .skip_recall_cl import SkipRecallCommandLines
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = [
-    'ManipulationTemporalSwap',
-    'SkipRecallCommandLines'
-    ]
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'ManipulationTemporalSwap': '.manipulation_temporal_swap',
+    'SkipRecallCommandLines': '.skip_recall_cl'
+})
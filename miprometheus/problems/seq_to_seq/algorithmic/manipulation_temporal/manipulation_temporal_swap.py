@@ -20,7 +20,6 @@ __author__ = "Tomasz Kornuta, Younes Bouhadjar, Vincent Marois"
 
 import torch
 import numpy as np
-from miprometheus.utils.data_dict import DataDict
 from miprometheus.problems.seq_to_seq.algorithmic.algorithmic_seq_to_seq_problem import AlgorithmicSeqToSeqProblem
 
 
@@ -67,124 +66,31 @@ class ManipulationTemporalSwap(AlgorithmicSeqToSeqProblem):
                                'num_items': self.num_items
                                }
 
-    def __getitem__(self, index):
+    def generate_batch(self, batch_size):
         """
-        Getter that returns one individual sample generated on-the-fly
+        Generates a batch of samples of size ``batch_size`` on-the-fly, with targets rotated by ``num_items``.
 
         .. note::
 
             The sequence length is drawn randomly between ``self.min_sequence_length`` and \
             ``self.max_sequence_length``.
 
-
-        :param index: index of the sample to return.
-
-        :return: DataDict({'sequences', 'sequences_length', 'targets', 'mask', 'num_subsequences'}), with:
-
-            - sequences: [2*SEQ_LENGTH+2, CONTROL_BITS+DATA_BITS],
-            - **sequences_length: random value between self.min_sequence_length and self.max_sequence_length**
-            - targets: [2*SEQ_LENGTH+2, DATA_BITS],
-            - mask: [2*SEQ_LENGTH+2]
-            - num_subsequences: 1
-
-
-        """
-        # Set sequence length.
-        seq_length = np.random.randint(
-            self.min_sequence_length, self.max_sequence_length + 1)
-
-        # Generate batch of random bit sequences [SEQ_LENGTH X DATA_BITS]
-        bit_seq = np.random.binomial(
-            1, self.bias, (seq_length, self.data_bits))
-
-        # Generate input:  [2*SEQ_LENGTH+2, CONTROL_BITS+DATA_BITS]
-        inputs = np.zeros([2 * seq_length + 2,
-                           self.control_bits + self.data_bits],
-                          dtype=np.float32)
-
-        # Set start control marker.
-        inputs[0, 0] = 1  # Memorization bit.
-
-        # Set bit sequence.
-        inputs[1:seq_length + 1, self.control_bits:self.control_bits + self.data_bits] = bit_seq
-
-        # Set end control marker.
-        inputs[seq_length + 1, 1] = 1  # Recall bit.
-
-        # Generate target:  [2*SEQ_LENGTH+2, DATA_BITS] (only data bits!)
-        targets = np.zeros([2 * seq_length + 2, self.data_bits], dtype=np.float32)
-
-        # Set bit sequence.
-
-        # Rotate sequence by shifting the items to right: seq >> num_items
-        # i.e num_items = 2 -> seq_items >> 2
-        # and num_items = -1 -> seq_items << 1
-        # For that reason we must change the sign of num_items
-        num_items = -self.num_items
-
-        # Check if we are using relative or absolute rotation.
-        if -1 < num_items < 1:
-            num_items = num_items * seq_length
-
-        # Round items shift  to int.
-        num_items = np.round(num_items)
-
-        # Modulo items shift with length of the sequence.
-        num_items = int(num_items % seq_length)
-
-        # Apply items shift
-        bit_seq = np.concatenate((bit_seq[num_items:, :], bit_seq[:num_items, :]), axis=0)
-        targets[seq_length + 2:, :] = bit_seq
-
-        # Generate target mask: [2*SEQ_LENGTH+2]
-        mask = torch.zeros([2 * seq_length + 2]).type(self.app_state.ByteTensor)
-        mask[seq_length + 2:] = 1
-
-        # PyTorch variables.
-        ptinputs = torch.from_numpy(inputs).type(self.app_state.dtype)
-        pttargets = torch.from_numpy(targets).type(self.app_state.dtype)
-
-        # Return data_dict.
-        data_dict = DataDict({key: None for key in self.data_definitions.keys()})
-        data_dict['sequences'] = ptinputs
-        data_dict['sequences_length'] = seq_length
-        data_dict['targets'] = pttargets
-        data_dict['mask'] = mask
-        data_dict['num_subsequences'] = 1
-
-        return data_dict
-
-    def collate_fn(self, batch):
-        """
-        Generates a batch of samples on-the-fly
-
         .. warning::
-            Because of the fact that the sequence length is randomly drawn between ``self.min_sequence_length`` and \
-            ``self.max_sequence_length`` and then fixed for one given batch (**but varies between batches**), \
-            we cannot follow the scheme `merge together individuals samples that can be retrieved in parallel with\
-            several workers.` Indeed, each sample could have a different sequence length, and merging them together\
-            would then not be possible (we cannot have variable-sequence-length samples within one batch \
-            without padding).
-            Hence, ``collate_fn`` generates on-the-fly a batch of samples, all having the same length (initially\
-            randomly selected).
-            The samples created by ``__getitem__`` are simply not used in this function.
 
+            All the samples within the batch will have the same sequence length.
 
-        :param batch: Should be a list of DataDict retrieved by `__getitem__`, each containing tensors, numbers,\
-        dicts or lists. --> **Not Used Here!**
+        :param batch_size: Size of the batch to be returned.
 
-        :return: DataDict({'sequences', 'sequences_length', 'targets', 'mask', 'num_subsequences'}), with:
+        :return: DataDict({'sequences', 'sequences_length', 'targets', 'masks', 'num_subsequences'}), with:
 
-            - sequences: [BATCH_SIZE, 2*SEQ_LENGTH+2, CONTROL_BITS+DATA_BITS],
-            - **sequences_length: random value between self.min_sequence_length and self.max_sequence_length**
-            - targets: [BATCH_SIZE, 2*SEQ_LENGTH+2, DATA_BITS],
-            - mask: [BATCH_SIZE, [2*SEQ_LENGTH+2]
-            - num_subsequences: 1
+            - sequences: [BATCH_SIZE, 2*SEQ_LENGTH+2, CONTROL_BITS+DATA_BITS]
+            - sequences_length: [BATCH_SIZE, 1] (the same random value between self.min_sequence_length and \
+            self.max_sequence_length)
+            - targets: [BATCH_SIZE, 2*SEQ_LENGTH+2, DATA_BITS]
+            - masks: [BATCH_SIZE, 2*SEQ_LENGTH+2, 1]
+            - num_subsequences: [BATCH_SIZE, 1]
 
         """
-        # get the batch_size
-        batch_size = len(batch)
-
         # Set sequence length.
         seq_length = np.random.randint(
             self.min_sequence_length, self.max_sequence_length + 1)
@@ -237,30 +143,25 @@ class ManipulationTemporalSwap(AlgorithmicSeqToSeqProblem):
             (bit_seq[:, num_items:, :], bit_seq[:, :num_items, :]), axis=1)
         targets[:, seq_length + 2:, :] = bit_seq
 
-        # Generate target mask: [BATCH_SIZE, 2*SEQ_LENGTH+2]
-        mask = torch.zeros([batch_size, 2 * seq_length + 2]
-                           ).type(self.app_state.ByteTensor)
-        mask[:, seq_length + 2:] = 1
+        # Generate target mask: [BATCH_SIZE, 2*SEQ_LENGTH+2, 1]
+        ptmasks = torch.zeros([batch_size, 2 * seq_length + 2, 1]
+                              ).type(torch.ByteTensor)
+        ptmasks[:, seq_length + 2:, 0] = 1
 
         # PyTorch variables.
         ptinputs = torch.from_numpy(inputs).type(self.app_state.dtype)
         pttargets = torch.from_numpy(targets).type(self.app_state.dtype)
 
         # Return data_dict.
-        data_dict = DataDict({key: None for key in self.data_definitions.keys()})
+        data_dict = self.create_data_dict()
         data_dict['sequences'] = ptinputs
-        data_dict['sequences_length'] = seq_length
+        data_dict['sequences_length'] = torch.ones([batch_size, 1]).type(torch.CharTensor) * seq_length
         data_dict['targets'] = pttargets
-        data_dict['mask'] = mask
-        data_dict['num_subsequences'] = 1
+        data_dict['masks'] = ptmasks
+        data_dict['num_subsequences'] = torch.ones([batch_size, 1]).type(torch.CharTensor)
 
         return data_dict
 
-    # method for changing the maximum length, used mainly during curriculum
-    # learning
-    def set_max_length(self, max_length):
-        self.max_sequence_length = max_length
-
 
 if __name__ == "__main__":
     """ Tests sequence generator - generates and displays a random sample"""
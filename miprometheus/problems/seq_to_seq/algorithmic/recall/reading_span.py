@@ -20,7 +20,6 @@ __author__ = "Younes Bouhadjar, Vincent Marois"
 
 import torch
 import numpy as np
-from miprometheus.utils.data_dict import DataDict
 from miprometheus.problems.seq_to_seq.algorithmic.algorithmic_seq_to_seq_problem import AlgorithmicSeqToSeqProblem
 
 
@@ -50,142 +49,45 @@ class ReadingSpan(AlgorithmicSeqToSeqProblem):
         self.num_subseq_min = params["num_subseq_min"]
         self.num_subseq_max = params["num_subseq_max"]
 
-    def __getitem__(self, index):
+    def get_max_total_length(self):
         """
-        Getter that returns one individual sample generated on-the-fly
-
-        .. note::
-
-            The sequence length is drawn randomly between ``self.min_sequence_length`` and \
-            ``self.max_sequence_length``.
-
-
-        :param index: index of the sample to return.
-
-        :return: DataDict({'sequences', 'sequences_length', 'targets', 'mask', 'num_subsequences'}), with:
-
-            - sequences: [SEQ_LENGTH, CONTROL_BITS+DATA_BITS]. SEQ_LENGTH depends on number of sub-sequences
-                and its lengths.
-
-            - **sequences_length: random value between self.min_sequence_length and self.max_sequence_length**
-            - targets: [SEQ_LENGTH, DATA_BITS],
-            - mask: [SEQ_LENGTH]
-            - num_subsequences: number of subsequences
+        Returns the maximal total length (number of items, including the markers) of a sample, given the current \
+        ``self.max_sequence_length`` (used by ``get_batch_size()``).
 
+        :return: num_subseq_max * (max_sequence_length + 2) + 1
 
         """
-        # TODO: THE DOCUMENTATION NEEDS TO BE UPDATED
-        # TODO: This is commented for now to avoid the issue with `add_ctrl` and `augment` in AlgorithmicSeqToSeqProblem
-        # TODO: NOT SURE THAT THIS FN IS WORKING WELL (WITHOUT THE PRESENCE OF THE BATCH DIMENSION)
-        '''
-        # define control channel markers
-        pos = [0, 0]
-        ctrl_data = [0, 0]
-        ctrl_dummy = [0, 1]
-        ctrl_inter = [0, 1]
-
-        # assign markers
-        markers = ctrl_data, ctrl_dummy, pos
-
-        # number sub sequences
-        num_sub_seq = np.random.randint( self.num_subseq_min, self.num_subseq_max + 1)
-
-        # set the sequence length of each marker
-        seq_length = np.random.randint(low=self.min_sequence_length, high=self.max_sequence_length + 1, 
-                                       size=num_sub_seq)
-
-        #  generate subsequences for x and y
-        x = [np.random.binomial(1, self.bias, (n, self.data_bits)) for n in seq_length]
-        x_last = [a[None, -1, :] for a in x]
-
-        # create the target
-        seq_length_tdummies = sum(seq_length) + seq_length.shape[0] + 1
-        
-        dummies_target = np.zeros([seq_length_tdummies, self.data_bits], dtype=np.float32)
-        targets = np.concatenate([dummies_target] + x_last, axis=0)
-
-        # data of x and dummies
-        xx = [self.augment(seq, markers, ctrl_start=[1, 0], add_marker_data=True, add_marker_dummy=False) for seq in x]
-
-        # data of x
-        data_1 = [arr for a in xx for arr in a[:-1]]
-
-        # this is a marker between sub sequence x and dummies
-        inter_seq = self.add_ctrl(np.zeros((1, self.data_bits)), ctrl_inter, pos)
-
-        # dummies of x
-        x_dummy_last = [a[None, -1, :] for b in xx for a in b[-1:]]
-
-        # concatenate all parts of the inputs
-        inputs = np.concatenate(data_1 + [inter_seq] + x_dummy_last, axis=0)
-
-        # PyTorch variables
-        inputs = torch.from_numpy(inputs).type(self.app_state.dtype)
-        targets = torch.from_numpy(targets).type(self.app_state.dtype)
-        
-        # TODO: batch might have different sequence lengths
-        mask_all = inputs[..., 0:self.control_bits] == 1
-        mask = mask_all[..., 0]
-        for i in range(self.control_bits):
-            mask = mask_all[..., i] * mask
+        return self.num_subseq_max * (self.max_sequence_length + 2) + 1
 
-        # TODO: fix the batch indexing
-        # rest channel values of data dummies
-        inputs[mask[0], 0:self.control_bits] = 0
-
-        # Return data_dict.
-        data_dict = DataDict({key: None for key in self.data_definitions.keys()})
-        data_dict['sequences'] = inputs
-        data_dict['sequences_length'] = max(seq_length)
-        data_dict['targets'] = targets
-        data_dict['mask'] = mask
-        data_dict['num_subsequences'] = num_sub_seq
-        '''
+    def generate_batch(self, batch_size):
+        """
+        Generates a batch of samples of size ''batch_size'' on-the-fly.
 
-        return DataDict({key: None for key in self.data_definitions.keys()}) #data_dict
+        .. note::
 
-    def collate_fn(self, batch):
-        """
-        Generates a batch of samples on-the-fly
+            The number of subsequences is drawn randomly between ``self.num_subseq_min`` and \
+            ``self.num_subseq_max``, and their lengths between ``self.min_sequence_length`` and \
+            ``self.max_sequence_length``.
 
         .. warning::
-            Because of the fact that the sequence length is randomly drawn between ``self.min_sequence_length`` and \
-            ``self.max_sequence_length`` and then fixed for one given batch (**but varies between batches**), \
-            we cannot follow the scheme `merge together individuals samples that can be retrieved in parallel with\
-            several workers.` Indeed, each sample could have a different sequence length, and merging them together\
-            would then not be possible (we cannot have variable-sequence-length samples within one batch \
-            without padding).
-            Hence, ``collate_fn`` generates on-the-fly a batch of samples, all having the same length (initially\
-            randomly selected).
-            The samples created by ``__getitem__`` are simply not used in this function.
-
+            All the samples within the batch will have the same sequence length.
 
-        :param batch: Should be a list of DataDict retrieved by `__getitem__`, each containing tensors, numbers,\
-        dicts or lists. --> **Not Used Here!**
+        :param batch_size: Size of the batch to be returned.
 
-        :return: DataDict({'sequences', 'sequences_length', 'targets', 'mask', 'num_subsequences'}), with:
+        :return: DataDict({'sequences', 'sequences_length', 'targets', 'masks', 'num_subsequences'}), with:
 
             - sequences: [BATCH_SIZE, SEQ_LENGTH, CONTROL_BITS+DATA_BITS],
-            - **sequences_length: random value between self.min_sequence_length and self.max_sequence_length**
+            - sequences_length: [BATCH_SIZE, 1] (max length of the subsequences)
             - targets: [BATCH_SIZE, SEQ_LENGTH, DATA_BITS],
-            - mask: [BATCH_SIZE, SEQ_LENGTH]
-            - num_subsequences: number of subsequences
-
-        # TODO: THE DOCUMENTATION NEEDS TO BE UPDATED
-        """
+            - masks: [BATCH_SIZE, SEQ_LENGTH, 1]
+            - num_subsequences: [BATCH_SIZE, 1] (number of subsequences)
 
-        # get the batch_size
-        batch_size = len(batch)
-
-        # define control channel markers
-        pos = [0, 0]
-        ctrl_data = [0, 0]
-        ctrl_dummy = [0, 1]
-        ctrl_inter = [0, 1]
-
-        # assign markers
-        markers = ctrl_data, ctrl_dummy, pos
+        pattern of inputs: # x1 # x2 ... # xn $ d1 d2 ... dn
+        pattern of target:   ...   ...      ...  last(x1) ... last(xn)
+        mask: used to mask the data part of the target.
+        xi and di: sub sequences x of random length and single dummies.
 
+        """
         # number sub sequences
         num_sub_seq = np.random.randint(self.num_subseq_min, self.num_subseq_max + 1)
 
@@ -193,52 +95,26 @@ class ReadingSpan(AlgorithmicSeqToSeqProblem):
         seq_length = np.random.randint(low=self.min_sequence_length, high=self.max_sequence_length + 1,
                                        size=num_sub_seq)
 
-        #  generate subsequences for x and y
-        x = [np.random.binomial(1, self.bias, (batch_size, n, self.data_bits)) for n in seq_length]
-        x_last = [a[:, None, -1, :] for a in x]
-
-        # create the target
-        seq_length_tdummies = sum(seq_length) + seq_length.shape[0] + 1
-        dummies_target = np.zeros([batch_size, seq_length_tdummies, self.data_bits], dtype=np.float32)
-        targets = np.concatenate([dummies_target] + x_last, axis=1)
-
-        # data of x and dummies
-        xx = [self.augment(seq, markers, ctrl_start=[1, 0], add_marker_data=True, add_marker_dummy=False) for seq in x]
-
-        # data of x
-        data_1 = [arr for a in xx for arr in a[:-1]]
+        # generate all subsequences x, and their offsets
+        bit_seq = self.generate_bit_sequences(batch_size, seq_length.sum())
+        offsets = np.cumsum(seq_length) - seq_length
 
-        # this is a marker between sub sequence x and dummies
-        inter_seq = self.add_ctrl(np.zeros((batch_size, 1, self.data_bits)), ctrl_inter, pos)
+        # add a marker at the beginning of each x: # x1 # x2 ... # xn
+        data = self.interleave_segments(self.marker_segments(0, num_sub_seq),
+                                        self.data_segments(seq_length, offsets))
 
-        # dummies of x
-        x_dummy_last = [a[:, None, -1, :] for b in xx for a in b[-1:]]
-
-        # concatenate all parts of the inputs
-        inputs = np.concatenate(data_1 + [inter_seq] + x_dummy_last, axis=1)
-
-        # PyTorch variables
-        inputs = torch.from_numpy(inputs).type(self.app_state.dtype)
-        targets = torch.from_numpy(targets).type(self.app_state.dtype)
-
-        # TODO: batch might have different sequence lengths
-        mask_all = inputs[..., 0:self.control_bits] == 1
-        mask = mask_all[..., 0]
-        for i in range(self.control_bits):
-            mask = mask_all[..., i] * mask
-
-        # TODO: fix the batch indexing
-        # rest channel values of data dummies
-        inputs[:, mask[0], 0:self.control_bits] = 0
+        # marker between the subsequences and the dummies, one dummy (recalling the last item) per subsequence
+        inputs, targets, masks = self.assemble_batch(bit_seq, [
+            data, self.marker_segments(1),
+            self.dummy_segments(np.ones(num_sub_seq, dtype=np.int64), offsets + seq_length - 1)])
 
         # Return data_dict.
-        data_dict = DataDict({key: None for key in self.data_definitions.keys()})
+        data_dict = self.create_data_dict()
         data_dict['sequences'] = inputs
-        data_dict['sequences_length'] = max(seq_length)
         data_dict['targets'] = targets
-        data_dict['mask'] = mask
-        data_dict['num_subsequences'] = num_sub_seq
-
+        data_dict['masks'] = masks
+        data_dict['sequences_length'] = torch.ones([batch_size, 1]).type(torch.CharTensor) * max(seq_length).item()
+        data_dict['num_subsequences'] = torch.ones([batch_size, 1]).type(torch.CharTensor) * num_sub_seq
         return data_dict
 
     # method for changing the maximum length, used mainly during curriculum
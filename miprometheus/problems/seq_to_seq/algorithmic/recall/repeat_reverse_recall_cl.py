@@ -72,6 +72,16 @@ class RepeatReverseRecallCommandLines(AlgorithmicSeqToSeqProblem):
         self.max_recall_number = params['max_recall_number']
 
 
+    def get_max_total_length(self):
+        """
+        Returns the maximal total length (number of items, including the markers) of a sample, given the current \
+        ``self.max_sequence_length`` (used by ``get_batch_size()``).
+
+        :return: (max_recall_number + 1) * (max_sequence_length + 1)
+
+        """
+        return (self.max_recall_number + 1) * (self.max_sequence_length + 1)
+
     def generate_batch(self, batch_size):
         """
         Generates a batch of samples of size ''batch_size'' on-the-fly.
@@ -57,6 +57,16 @@ class ScratchPadCommandLines(AlgorithmicSeqToSeqProblem):
         self.num_subseq_min = params["num_subseq_min"]
         self.num_subseq_max = params["num_subseq_max"]
 
+    def get_max_total_length(self):
+        """
+        Returns the maximal total length (number of items, including the markers) of a sample, given the current \
+        ``self.max_sequence_length`` (used by ``get_batch_size()``).
+
+        :return: num_subseq_max * (max_sequence_length + 1) + max_sequence_length + 1
+
+        """
+        return self.num_subseq_max * (self.max_sequence_length + 1) + self.max_sequence_length + 1
+
     def generate_batch(self, batch_size):
         """
         Generates a batch of samples of size ''batch_size'' on-the-fly.
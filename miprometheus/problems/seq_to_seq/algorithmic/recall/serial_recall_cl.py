@@ -208,6 +208,16 @@ if __name__ == "__main__":
     print(repr(sample))
     print('__getitem__ works.')
 
+    # Problems using different generation modes (e.g. training & validation) can coexist in the same process.
+    params.add_config_params({'parallel': {'min_sequence_length': 2, 'max_sequence_length': 5,
+                                           'generation_mode': 'parallel'},
+                              'optimized': {'min_sequence_length': 2, 'max_sequence_length': 5}})
+    parallel_dataset = SerialRecallCommandLines(params['parallel'])
+    optimized_dataset = SerialRecallCommandLines(params['optimized'])
+    assert parallel_dataset[list(range(batch_size))]['sequences'].shape[0] == batch_size
+    assert optimized_dataset[0] == 0
+    print('Generation modes of the instances are independent.')
+
     # Display single sample (0) from batch.
     batch = next(iter(problem))
     dataset.show_sample(batch, 0)
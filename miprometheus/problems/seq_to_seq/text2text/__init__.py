@@ -1,4 +1,8 @@
-from .text_to_text_problem import TextToTextProblem, Lang
-from .translation_anki import TranslationAnki
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = ['TextToTextProblem', 'Lang', 'TranslationAnki']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'TextToTextProblem': '.text_to_text_problem',
+    'Lang': '.text_to_text_problem',
+    'TranslationAnki': '.translation_anki'
+})
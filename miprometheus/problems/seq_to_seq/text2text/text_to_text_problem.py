@@ -51,6 +51,7 @@ import re
 import torch
 import torch.nn as nn
 from miprometheus.problems.seq_to_seq.seq_to_seq_problem import SeqToSeqProblem
+from miprometheus.utils.problems_utils.bleu import sentence_bleu, CorpusBLEU
 
 # global tokens
 PAD_token = 0
@@ -101,6 +102,40 @@ class TextToTextProblem(SeqToSeqProblem):
         self.input_lang = None
         self.output_lang = None
 
+        # accumulates the statistics of the collected batches, for the corpus-level BLEU score.
+        self.corpus_bleu = CorpusBLEU()
+
+    def get_BLEU_inputs(self, data_dict, logits):
+        """
+        Returns the indexes of the words of the predicted & target sentences, used to compute the BLEU score.
+
+        The predicted sentences are the most probable words, over the whole length of the logits. The target \
+        sentences are converted from ``targets_text`` using the vocabulary set of the output language (the words \
+        which are not part of it never match a prediction).
+
+        :param data_dict: DataDict({'inputs', 'inputs_length', 'inputs_text', 'targets', 'targets_length', 'outputs_text'}).
+
+        :param logits: Predictions of the model.
+
+        :return: Tensors of the predicted sentences [batch_size x max_length] & their lengths [batch_size], \
+        tensors of the target sentences [batch_size x max_target_length] & their lengths [batch_size].
+
+        """
+        # get most probable words indexes for the batch
+        _, top_indexes = logits.topk(k=1, dim=-1)
+        hypotheses = top_indexes.squeeze(-1)
+        hypotheses_lengths = torch.full((hypotheses.shape[0],), hypotheses.shape[1], dtype=torch.int64)
+
+        # retrieve the indexes of the target sentences
+        sentences = [[self.output_lang.word2index.get(word, -1) for word in sentence.split()]
+                     for sentence in data_dict['targets_text']]
+        references_lengths = torch.tensor([len(sentence) for sentence in sentences], dtype=torch.int64)
+        references = torch.full((len(sentences), max([1] + references_lengths.tolist())), -1, dtype=torch.int64)
+        for i, sentence in enumerate(sentences):
+            references[i, :len(sentence)] = torch.tensor(sentence, dtype=torch.int64)
+
+        return hypotheses, hypotheses_lengths, references, references_lengths
+
     def compute_BLEU_score(self, data_dict, logits):
         """
         Compute the BLEU score in order to evaluate the translation quality
@@ -110,7 +145,9 @@ class TextToTextProblem(SeqToSeqProblem):
 
             Reference paper: http://www.aclweb.org/anthology/P02-1040.pdf
 
-            Implementation inspired from https://machinelearningmastery.com/calculate-bleu-score-for-text-python/
+            The score is computed on the tensors of indexes of the words, for the whole batch at once (see \
+            ``utils.problems_utils.bleu``). It is identical to the score of \
+            ``nltk.translate.bleu_score.sentence_bleu`` with the smoothing function ``SmoothingFunction().method1``.
 
 
             To handle all samples within a batch, we accumulate the individual BLEU score for each pair\
@@ -124,33 +161,9 @@ class TextToTextProblem(SeqToSeqProblem):
         :return: Average BLEU Score for the batch ( 0 < BLEU < 1).
 
         """
-        # get most probable words indexes for the batch
-        _, top_indexes = logits.topk(k=1, dim=-1)
-        logits = top_indexes.squeeze()
-        batch_size = logits.shape[0]
-
-        from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
-
-        # retrieve target sentences from TextAuxTuple
-        targets_text = []
-        for sentence in data_dict['targets_text']:
-            targets_text.append(sentence.split())
+        scores = sentence_bleu(*self.get_BLEU_inputs(data_dict, logits))
 
-        # retrieve text sentences from the logits (which should be tensors of
-        # indexes)
-        logits_text = []
-        for logit in logits:
-            logits_text.append(
-                [self.output_lang.index2word[index.item()] for index in logit])
-
-        bleu_score = 0
-        for i in range(batch_size):
-            # compute bleu score and use a smoothing function
-            bleu_score += sentence_bleu([targets_text[i]],
-                                        logits_text[i],
-                                        smoothing_function=SmoothingFunction().method1)
-
-        return round(bleu_score / batch_size, 4)
+        return round(scores.mean().item(), 4)
 
     def evaluate_loss(self, data_dict, logits):
         """
@@ -187,7 +200,14 @@ class TextToTextProblem(SeqToSeqProblem):
 
     def collect_statistics(self, stat_col, data_dict, logits):
         """
-        Collects BLEU score.
+        Collects BLEU score (average over the batch) and accumulates the statistics of the batch for the \
+        corpus-level BLEU score.
+
+        .. note::
+
+            The accumulated statistics cover the same batches as the collector: they are reset when the \
+            collector has been emptied (e.g. at the start of a validation over the whole set, discarding the \
+            batches of the partial validations).
 
         :param stat_col: ``StatisticsCollector``
 
@@ -196,8 +216,43 @@ class TextToTextProblem(SeqToSeqProblem):
         :param logits: Predictions of the model.
 
         """
+        if len(stat_col['bleu_score']) == 0:
+            self.corpus_bleu.reset()
 
-        stat_col['bleu_score'] = self.compute_BLEU_score(data_dict, logits)
+        scores = self.corpus_bleu.update(*self.get_BLEU_inputs(data_dict, logits))
+
+        stat_col['bleu_score'] = round(scores.mean().item(), 4)
+
+    def add_aggregators(self, stat_agg):
+        """
+        Adds the BLEU score aggregators (average over the episodes & corpus-level score) to a \
+        ``StatisticsAggregator``.
+
+        :param stat_agg: ``StatisticsAggregator``.
+
+        """
+        # Add basic aggregators.
+        super(TextToTextProblem, self).add_aggregators(stat_agg)
+
+        stat_agg.add_aggregator('bleu_score', '{:4.5f}')
+        stat_agg.add_aggregator('corpus_bleu_score', '{:4.5f}')
+
+    def aggregate_statistics(self, stat_col, stat_agg):
+        """
+        Aggregates the BLEU scores: average of the collected scores & corpus-level score of all the sentences \
+        of the collected batches.
+
+        :param stat_col: ``StatisticsCollector``.
+
+        :param stat_agg: ``StatisticsAggregator``.
+
+        """
+        # Aggregate base statistics.
+        super(TextToTextProblem, self).aggregate_statistics(stat_col, stat_agg)
+
+        stat_agg['bleu_score'] = sum(stat_col['bleu_score']) / max(1, len(stat_col['bleu_score']))
+        stat_agg['corpus_bleu_score'] = self.corpus_bleu.score()
+        self.corpus_bleu.reset()
 
     def show_sample(self, data_dict, sample=0):
         """
@@ -268,6 +323,22 @@ class TextToTextProblem(SeqToSeqProblem):
 
         return seq
 
+    def sentence_from_indexes(self, lang, indexes):
+        """
+        Reconstructs a sentence from its list of indexes (terminated by the EOS token), i.e. the inverse of \
+        ``indexes_from_sentence()``.
+
+        :param lang: instance of the ``Lang`` class, having a ``index2word`` dict.
+        :type lang: Lang
+
+        :param indexes: indexes of the words of the sentence, followed by the EOS token.
+        :type indexes: list or ``np.array``
+
+        :return: sentence (str).
+
+        """
+        return ' '.join(lang.index2word[int(index)] for index in indexes[:-1])
+
     def tensor_from_sentence(self, lang, sentence):
         """
         Uses ``indexes_from_sentence()`` to create a tensor of indexes with the
@@ -395,3 +466,32 @@ class Lang(object):
 
         else:  # this word has been seen before, simply update its occurrence
             self.word2count[word] += 1
+
+    def to_dict(self):
+        """
+        :return: dict describing the language (name, list of words ordered by index & occurrences), e.g. to save \
+        the vocabulary set to file (see ``from_dict()``).
+
+        """
+        return {'name': self.name,
+                'words': [self.index2word[index] for index in range(self.n_words)],
+                'word2count': self.word2count}
+
+    @classmethod
+    def from_dict(cls, description):
+        """
+        Creates a ``Lang`` instance from its description (returned by ``to_dict()``).
+
+        :param description: dict describing the language.
+        :type description: dict
+
+        :return: ``Lang`` instance.
+
+        """
+        lang = cls(description['name'])
+        lang.index2word = dict(enumerate(description['words']))
+        lang.word2index = {word: index for index, word in lang.index2word.items()}
+        lang.word2count = dict(description['word2count'])
+        lang.n_words = len(lang.index2word)
+
+        return lang
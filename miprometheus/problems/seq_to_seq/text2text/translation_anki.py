@@ -46,14 +46,17 @@ translation_anki.py: 'toy' translation problem class
 __author__ = "Vincent Marois"
 
 import os
+import json
 import random
 import pickle
+import numpy as np
 
 import torch
-import errno
 
 from miprometheus.utils.data_dict import DataDict
-from miprometheus.problems.seq_to_seq.text2text.text_to_text_problem import TextToTextProblem, Lang
+from miprometheus.utils.problems_utils.data_preparation import file_lock, atomic_open, prepare_artefact, \
+    get_config_hash
+from miprometheus.problems.seq_to_seq.text2text.text_to_text_problem import TextToTextProblem, Lang, EOS_token
 
 
 class TranslationAnki(TextToTextProblem):
@@ -72,6 +75,12 @@ class TranslationAnki(TextToTextProblem):
 
         Take this class as an example and not as a production-ready application.
 
+    .. note::
+
+        The normalized & filtered sentences pairs, converted to indexes, are prepared once and stored in \
+        ``data_folder`` (see ``build_corpus()``), along with the vocabulary sets: the next instances memory-map \
+        them and assemble the batches by slicing the (flat) arrays of indexes.
+
 
     """
 
@@ -104,8 +113,14 @@ class TranslationAnki(TextToTextProblem):
         # other attributes
         self.input_lang = None  # will be a Lang instance
         self.output_lang = None  # will be a Lang instance
-        self.pairs = []  # will contain original string sentences
-        self.tensor_pairs = []  # will contain the tensors of indexes
+        self.pairs = []  # will contain original string sentences (only when building the corpus)
+
+        # will contain the (memory-mapped) flat arrays of indexes of the input & target sentences, and the offsets
+        # of the sentences in these arrays.
+        self.input_indexes = None
+        self.input_offsets = None
+        self.target_indexes = None
+        self.target_offsets = None
 
         # for datasets storage & handling
         self.root = os.path.expanduser(params['data_folder'])
@@ -123,15 +138,18 @@ class TranslationAnki(TextToTextProblem):
         self.input_lang = Lang('eng')
         self.output_lang = Lang(self.output_lang_name)
 
-        # preprocess source data
+        # preprocess source data (once) & load the corpus of indexes
         self.download()
-        self.input_lang, self.output_lang, self.pairs = self.prepare_data()
-
-        # create tensors of indexes from string pairs
-        self.tensor_pairs = self.tensors_from_pairs(self.pairs, self.input_lang, self.output_lang)
+        corpus_path = self.get_corpus_path()
+        if not prepare_artefact(corpus_path, self.build_corpus, logger=self.logger):
+            self.logger.info('Found the preprocessed corpus in {}, using it.'.format(corpus_path))
+        self.load_corpus(corpus_path)
 
         # get the dataset size
-        self.length = len(self.tensor_pairs)
+        self.length = len(self.input_offsets) - 1
+
+        # the batches are assembled directly from the arrays of indexes.
+        self.batch_getitem = True
 
         # create the nn.Embedding layer for the input vocabulary set
         self.logger.info('Constructing random embeddings for the input vocabulary set')
@@ -141,16 +159,17 @@ class TranslationAnki(TextToTextProblem):
         weights_filepath = os.path.join(self.root, 'input_{}_{}_embed_weights.pkl'.format(self.input_lang.n_words,
                                                                                           self.embedding_dim))
 
-        if os.path.isfile(weights_filepath):
-            self.logger.info('Found random embedding weights on file for the input vocabulary, using them.')
-            with open(weights_filepath, 'rb') as f:
-                self.input_embed_layer.weight.data = pickle.load(f)
-        else:
+        def save_embedding_weights(filepath):
             self.logger.warning('No weights found on file for the random embedding of the input vocabulary. '
                                 'Initializing them and saving to file in {}'.format(weights_filepath))
-            with open(weights_filepath, 'wb') as f:
+            with open(filepath, 'wb') as f:
                 pickle.dump(self.input_embed_layer.weight.data, f)
 
+        if not prepare_artefact(weights_filepath, save_embedding_weights, logger=self.logger):
+            self.logger.info('Found random embedding weights on file for the input vocabulary, using them.')
+            with open(weights_filepath, 'rb') as f:
+                self.input_embed_layer.weight.data = pickle.load(f)
+
         # create the nn.Embedding layer for the output vocabulary set
         self.logger.info('Constructing random embeddings for the output vocabulary set')
         self.output_embed_layer = torch.nn.Embedding(num_embeddings=self.output_lang.n_words,
@@ -160,16 +179,17 @@ class TranslationAnki(TextToTextProblem):
         weights_filepath = os.path.join(self.root, 'output_{}_{}_embed_weights.pkl'.format(self.output_lang.n_words,
                                                                                            self.embedding_dim))
 
-        if os.path.isfile(weights_filepath):
-            self.logger.info('Found random embedding weights on file for the output vocabulary, using them.')
-            with open(weights_filepath, 'rb') as f:
-                self.output_embed_layer.weight.data = pickle.load(f)
-        else:
+        def save_embedding_weights(filepath):
             self.logger.warning('No weights found on file for the random embedding of the output vocabulary. '
                                 'Initializing them and saving to file in {}'.format(weights_filepath))
-            with open(weights_filepath, 'wb') as f:
+            with open(filepath, 'wb') as f:
                 pickle.dump(self.output_embed_layer.weight.data, f)
 
+        if not prepare_artefact(weights_filepath, save_embedding_weights, logger=self.logger):
+            self.logger.info('Found random embedding weights on file for the output vocabulary, using them.')
+            with open(weights_filepath, 'rb') as f:
+                self.output_embed_layer.weight.data = pickle.load(f)
+
         # the actual embedding is handled in __getitem__.
 
         # define the default_values dict: holds parameters values that a model may need.
@@ -246,6 +266,88 @@ class TranslationAnki(TextToTextProblem):
 
         return self.input_lang, self.output_lang, self.pairs
 
+    def get_corpus_path(self):
+        """
+        :return: Path to the preprocessed corpus, depending on the dataset (training or inference set, of the \
+        specified training size) & on the parameters of the preprocessing.
+
+        .. note::
+
+            The size & modification time of the split file are part of the configuration, so that the corpus \
+            is rebuilt when the split is regenerated.
+
+        """
+        dataset_file = self.training_file if self.use_train_data else self.test_file
+        dataset_stat = os.stat(os.path.join(self.root, self.processed_folder, dataset_file))
+
+        config = {'max_sequence_length': self.max_sequence_length,
+                  'eng_prefixes': self.eng_prefixes,
+                  'reverse': self.reverse,
+                  'dataset_size': dataset_stat.st_size,
+                  'dataset_mtime': dataset_stat.st_mtime}
+        config_hash = get_config_hash(config)
+
+        return os.path.join(self.root, self.processed_folder,
+                            '{}_{}'.format(os.path.splitext(dataset_file)[0], config_hash[:12]))
+
+    def build_corpus(self, path):
+        """
+        Prepares the data (see ``prepare_data()``) and stores in the directory ``path``:
+
+            - the vocabulary sets of the input & output languages (``vocabularies.json``),
+            - for the input & target sentences: the indexes of their words, followed by the EOS token, \
+            concatenated in a flat int32 array (``<input|target>_indexes.npy``) & the offsets [N+1] of the \
+            sentences in this array (``<input|target>_offsets.npy``).
+
+        :param path: Path to the directory to create.
+        :type path: str
+
+        """
+        os.makedirs(path)
+
+        input_lang, output_lang, pairs = self.prepare_data()
+
+        for side, lang, position in [('input', input_lang, 0), ('target', output_lang, 1)]:
+            sentences = [pair[position].split(' ') for pair in pairs]
+
+            indexes = np.fromiter((index for sentence in sentences
+                                   for index in [lang.word2index[word] for word in sentence] + [EOS_token]),
+                                  dtype=np.int32)
+            offsets = np.zeros(len(sentences) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(sentence) + 1 for sentence in sentences])
+
+            np.save(os.path.join(path, side + '_indexes.npy'), indexes)
+            np.save(os.path.join(path, side + '_offsets.npy'), offsets)
+
+        with open(os.path.join(path, 'vocabularies.json'), 'w', encoding='utf-8') as f:
+            json.dump({'input': input_lang.to_dict(), 'output': output_lang.to_dict()}, f)
+
+        # The sentences are reconstructed from the indexes when needed.
+        self.pairs = []
+
+    def load_corpus(self, path):
+        """
+        Loads the vocabulary sets & memory-maps the arrays of indexes of the preprocessed corpus.
+
+        :param path: Path to the directory of the corpus (see ``build_corpus()``).
+        :type path: str
+
+        """
+        with open(os.path.join(path, 'vocabularies.json'), 'r', encoding='utf-8') as f:
+            vocabularies = json.load(f)
+        self.input_lang = Lang.from_dict(vocabularies['input'])
+        self.output_lang = Lang.from_dict(vocabularies['output'])
+
+        self.input_indexes = np.load(os.path.join(path, 'input_indexes.npy'), mmap_mode='r')
+        self.input_offsets = np.load(os.path.join(path, 'input_offsets.npy'))
+        self.target_indexes = np.load(os.path.join(path, 'target_indexes.npy'), mmap_mode='r')
+        self.target_offsets = np.load(os.path.join(path, 'target_offsets.npy'))
+
+        self.logger.info("Loaded {} sentence pairs".format(len(self.input_offsets) - 1))
+        self.logger.info("Number of words in I/O languages:")
+        self.logger.info('{}: {}'.format(self.input_lang.name, self.input_lang.n_words))
+        self.logger.info('{}: {}'.format(self.output_lang.name, self.output_lang.n_words))
+
     def _check_exists(self):
         """
         :return: True if the training & inference datasets (of the specified training\
@@ -276,6 +378,7 @@ class TranslationAnki(TextToTextProblem):
         # import lines
         from six.moves.urllib.request import Request, urlopen
         import zipfile
+        import shutil
 
         # check if the files already exist
         if self._check_exists():
@@ -283,70 +386,67 @@ class TranslationAnki(TextToTextProblem):
             return
 
         # try to create directories for storing files if not already exist
-        try:
-            os.makedirs(os.path.join(self.root, self.raw_folder))
-            os.makedirs(os.path.join(self.root, self.processed_folder))
-        except OSError as e:
-            if e.errno == errno.EEXIST:
-                pass
-            else:
-                raise
+        os.makedirs(os.path.join(self.root, self.raw_folder), exist_ok=True)
+        os.makedirs(os.path.join(self.root, self.processed_folder), exist_ok=True)
 
         # construct the url from self.output_lang_name
         # Warning: The source files are named like 'eng-fra.zip' -> careful on
         # the language abbreviation!
         url = 'http://www.manythings.org/anki/' + self.output_lang_name + '-eng.zip'
 
-        self.logger.warning('Downloading original source file from {}'.format(url))
-        # have to do a Request in order to pass headers to avoid server
-        # security features blocking spider/bot user agent
-        request = Request(
-            url, headers={
-                'User-Agent': 'Mozilla/5.0 (X11; U; Linux i686) Gecko/20071127 Firefox/2.0.0.11'})
-        data = urlopen(request)
-
-        # write raw data to file
-        filename = url.rpartition('/')[2]
-        filepath = os.path.join(self.root, self.raw_folder, filename)
-
-        with open(filepath, 'wb') as f:
-            f.write(data.read())
-        with zipfile.ZipFile(filepath, 'r') as zip_f:
-            zip_f.extractall(os.path.join(self.root, self.raw_folder))
-        os.unlink(filepath)
-
-        # read raw data, split it in training & inference sets and save it to
-        # file
-        lines = open(
-            os.path.join(
-                self.root,
-                self.raw_folder,
-                self.output_lang_name +
-                '.txt'),
-            encoding='utf-8'). read().strip().split('\n')
-
-        # shuffle list of lines
-        random.shuffle(lines)
-
-        nb_samples = len(lines)
-        self.logger.info('Total number of samples: {}'.format(nb_samples))
-        nb_training_samples = round(self.training_size * nb_samples)
-
-        # choose nb_training_samples elements at random in lines to create the
-        # training set
-        training_samples_index = random.sample(
-            range(len(lines)), nb_training_samples)
-        training_samples = []
-        for index in sorted(training_samples_index, reverse=True):
-            training_samples.append(lines.pop(index))
-        inference_samples = lines
-
-        with open(os.path.join(self.root, self.processed_folder, self.training_file), 'w') as training_f:
-            training_f.write('\n'.join(line for line in training_samples))
-            training_f.close()
-        with open(os.path.join(self.root, self.processed_folder, self.test_file), 'w') as test_f:
-            test_f.write('\n'.join(line for line in inference_samples))
-            test_f.close()
+        def download_raw_file(filepath):
+            self.logger.warning('Downloading original source file from {}'.format(url))
+            # have to do a Request in order to pass headers to avoid server
+            # security features blocking spider/bot user agent
+            request = Request(
+                url, headers={
+                    'User-Agent': 'Mozilla/5.0 (X11; U; Linux i686) Gecko/20071127 Firefox/2.0.0.11'})
+            data = urlopen(request)
+
+            # write raw data to file & extract the main file from the archive
+            zip_filepath = filepath + '.zip'
+            with open(zip_filepath, 'wb') as f:
+                f.write(data.read())
+            with zipfile.ZipFile(zip_filepath, 'r') as zip_f:
+                with zip_f.open(self.output_lang_name + '.txt') as source, open(filepath, 'wb') as target:
+                    shutil.copyfileobj(source, target)
+            os.unlink(zip_filepath)
+
+        # The raw file is shared by all training sizes: only one process downloads it.
+        raw_filepath = os.path.join(self.root, self.raw_folder, self.output_lang_name + '.txt')
+        prepare_artefact(raw_filepath, download_raw_file, logger=self.logger)
+
+        # Only one process splits the raw data, the other ones wait for it and reuse the split.
+        with file_lock(os.path.join(self.root, self.processed_folder, self.training_file), self.logger):
+            if self._check_exists():
+                self.logger.info('Files were processed by another process.')
+                return
+
+            # read raw data, split it in training & inference sets and save it to
+            # file
+            lines = open(raw_filepath, encoding='utf-8'). read().strip().split('\n')
+
+            # shuffle list of lines
+            random.shuffle(lines)
+
+            nb_samples = len(lines)
+            self.logger.info('Total number of samples: {}'.format(nb_samples))
+            nb_training_samples = round(self.training_size * nb_samples)
+
+            # choose nb_training_samples elements at random in lines to create the
+            # training set
+            training_samples_index = random.sample(
+                range(len(lines)), nb_training_samples)
+            training_samples = []
+            for index in sorted(training_samples_index, reverse=True):
+                training_samples.append(lines.pop(index))
+            inference_samples = lines
+
+            # The training file is published last, as _check_exists() looks for both files.
+            with atomic_open(os.path.join(self.root, self.processed_folder, self.test_file), 'w') as test_f:
+                test_f.write('\n'.join(line for line in inference_samples))
+            with atomic_open(os.path.join(self.root, self.processed_folder, self.training_file), 'w') as training_f:
+                training_f.write('\n'.join(line for line in training_samples))
 
         self.logger.info('Processing done.')
 
@@ -384,7 +484,12 @@ class TranslationAnki(TextToTextProblem):
 
     def __getitem__(self, index):
         """
-        Retrieves a sample from ``self.tensor_pairs`` and get the associated strings from ``self.pairs``.
+        Retrieves a sample (indexes of the words of the sentences, embedded) from the memory-mapped corpus and \
+        reconstructs the associated strings.
+
+        .. note::
+
+            A list of indices can be passed, in which case the whole batch is returned (see ``get_batch()``).
 
 
         :param index: index of the sample to return.
@@ -393,28 +498,115 @@ class TranslationAnki(TextToTextProblem):
         :return: DataDict({'inputs', 'inputs_length', 'inputs_text' 'targets', 'targets_length', 'targets_text'}).
 
         """
-        # get tensors and strings
-        input_tensor, target_tensor = self.tensor_pairs[index]
-        input_text, target_text = self.pairs[index]
+        if isinstance(index, (list, tuple, np.ndarray)):
+            return self.get_batch(index)
+
+        # get indexes and strings
+        input_indexes = self.input_indexes[self.input_offsets[index]:self.input_offsets[index + 1]]
+        target_indexes = self.target_indexes[self.target_offsets[index]:self.target_offsets[index + 1]]
 
-        # embed the input sentence:
-        input_tensor = self.input_embed_layer(torch.LongTensor(input_tensor)).type(torch.FloatTensor)
+        # the random embeddings are fixed: no need to track their gradients.
+        with torch.no_grad():
+            # embed the input sentence:
+            input_tensor = self.input_embed_layer(
+                torch.from_numpy(input_indexes.astype(np.int64))).type(torch.FloatTensor)
 
-        # embed the output sentence:
-        target_tensor = self.output_embed_layer(torch.LongTensor(target_tensor)).type(torch.FloatTensor)
+            # embed the output sentence:
+            target_tensor = self.output_embed_layer(
+                torch.from_numpy(target_indexes.astype(np.int64))).type(torch.FloatTensor)
 
         # return data_dict
         data_dict = DataDict({key: None for key in self.data_definitions.keys()})
         data_dict['inputs'] = input_tensor
         data_dict['inputs_length'] = len(input_tensor)
-        data_dict['inputs_text'] = input_text
+        data_dict['inputs_text'] = self.sentence_from_indexes(self.input_lang, input_indexes)
 
         data_dict['targets'] = target_tensor
         data_dict['targets_length'] = len(target_tensor)
-        data_dict['targets_text'] = target_text
+        data_dict['targets_text'] = self.sentence_from_indexes(self.output_lang, target_indexes)
+
+        return data_dict
+
+    def gather_indexes(self, indexes, offsets, indices):
+        """
+        Gathers the indexes of several sentences into a padded array, by slicing the flat array of indexes.
+
+        :param indexes: Flat array of the indexes of all the sentences.
+        :type indexes: ``np.array``
+
+        :param offsets: Offsets [N+1] of the sentences in ``indexes``.
+        :type offsets: ``np.array``
+
+        :param indices: Indices [batch_size] of the sentences.
+        :type indices: ``np.array``
+
+        :return: ``np.array`` of int64 indexes [batch_size x max_length], padded with the PAD token (0) & \
+        ``np.array`` of the lengths of the sentences.
+
+        """
+        lengths = offsets[indices + 1] - offsets[indices]
+
+        # positions of the words in the flat array (only valid before the end of each sentence).
+        steps = np.arange(lengths.max() if len(lengths) > 0 else 0)
+        mask = steps[np.newaxis, :] < lengths[:, np.newaxis]
+        positions = np.where(mask, offsets[indices][:, np.newaxis] + steps[np.newaxis, :], 0)
+
+        return np.where(mask, indexes[positions], 0).astype(np.int64), lengths
+
+    def get_batch(self, indices):
+        """
+        Assembles a batch directly from the memory-mapped corpus: the indexes of the sentences are gathered in \
+        padded arrays, which are embedded at once.
+
+        The batch is identical to the one returned by ``collate_fn()`` on the individual samples (i.e. sorted \
+        decreasingly as a function of the input sentences length, and padded with zeros).
+
+        :param indices: Indices of the samples of the batch.
+        :type indices: list
+
+        :return: ``DataDict({'inputs', 'inputs_length', 'inputs_text' 'targets', 'targets_length', 'targets_text'})``\
+        containing the batch.
+
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+
+        # sort the batch by decreasing input length (stable, as in collate_fn()).
+        input_lengths = self.input_offsets[indices + 1] - self.input_offsets[indices]
+        indices = indices[np.argsort(-input_lengths, kind='stable')]
+
+        input_indexes, input_lengths = self.gather_indexes(self.input_indexes, self.input_offsets, indices)
+        target_indexes, target_lengths = self.gather_indexes(self.target_indexes, self.target_offsets, indices)
+
+        with torch.no_grad():
+            # embed the padded sentences & zero the padding.
+            inputs = self.input_embed_layer(torch.from_numpy(input_indexes)).type(torch.FloatTensor)
+            inputs *= torch.from_numpy(input_indexes != 0).type(torch.FloatTensor).unsqueeze(-1)
+
+            targets = self.output_embed_layer(torch.from_numpy(target_indexes)).type(torch.FloatTensor)
+            targets *= torch.from_numpy(target_indexes != 0).type(torch.FloatTensor).unsqueeze(-1)
+
+        # construct the DataDict and fill it with the batch
+        data_dict = DataDict({key: None for key in self.data_definitions.keys()})
+
+        data_dict['inputs'] = inputs
+        data_dict['inputs_length'] = input_lengths.tolist()
+        data_dict['inputs_text'] = [self.sentence_from_indexes(self.input_lang, sentence[:length])
+                                    for sentence, length in zip(input_indexes, input_lengths)]
+
+        data_dict['targets'] = targets
+        data_dict['targets_length'] = target_lengths.tolist()
+        data_dict['targets_text'] = [self.sentence_from_indexes(self.output_lang, sentence[:length])
+                                     for sentence, length in zip(target_indexes, target_lengths)]
 
         return data_dict
 
+    def get_sample_lengths(self):
+        """
+        :return: List of the lengths of the sentence pairs (i.e. max of the input & target lengths).
+
+        """
+        return np.maximum(np.diff(self.input_offsets), np.diff(self.target_offsets)).tolist()
+
     def collate_fn(self, batch):
         """
         Combines a list of DataDict (retrieved with ``__getitem__``) into a batch.
@@ -1,3 +1,8 @@
-from .seq_mnist_to_class import *
+from miprometheus.utils.lazy_module import lazy_module
 
-from .video_to_class_problem import VideoToClassProblem
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'PermutedSequentialRowMnist': '.seq_mnist_to_class',
+    'SequentialPixelMNIST': '.seq_mnist_to_class',
+    'VideoToClassProblem': '.video_to_class_problem'
+})
@@ -1,5 +1,7 @@
-from .permuted_sequential_row_mnist import PermutedSequentialRowMnist
-from .sequential_pixel_mnist import SequentialPixelMNIST
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = ['PermutedSequentialRowMnist',
-           'SequentialPixelMNIST']
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'PermutedSequentialRowMnist': '.permuted_sequential_row_mnist',
+    'SequentialPixelMNIST': '.sequential_pixel_mnist'
+})
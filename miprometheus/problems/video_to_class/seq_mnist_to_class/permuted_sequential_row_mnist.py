@@ -19,7 +19,9 @@
  apply a permutation over the rows"""
 __author__ = "Younes Bouhadjar & Vincent Marois"
 
+import os
 import torch
+import numpy as np
 from torchvision import datasets, transforms
 
 from miprometheus.utils.data_dict import DataDict
@@ -51,6 +53,9 @@ class PermutedSequentialRowMnist(VideoToClassProblem):
                     and  ``processed/test.pt`` will be saved,
                 - ``self.use_train_data`` (`bool`, `optional`) : If True, creates dataset from ``training.pt``,\
                     otherwise from ``test.pt``
+                - ``self.in_memory`` (`bool`, `optional`) : If ``True``, keeps the images in memory (cached in \
+                    ``<root_dir>/preprocessed``) and reads whole batches at once instead of transforming the \
+                    samples one by one (default: ``False``),
                 - ``self.defaut_values`` :
 
                     >>> self.default_values = {'nb_classes': 10,
@@ -76,6 +81,7 @@ class PermutedSequentialRowMnist(VideoToClassProblem):
         # Retrieve parameters from the dictionary.
         self.use_train_data = params['use_train_data']
         self.root_dir = params['root_dir']
+        self.in_memory = params.get('in_memory', False)
 
         self.num_rows = 28
         self.num_columns = 28
@@ -99,9 +105,9 @@ class PermutedSequentialRowMnist(VideoToClassProblem):
         self.labels = 'Zero One Two Three Four Five Six Seven Eight Nine'.split(' ')
 
         # define transforms
-        pixel_permutation = torch.randperm(self.num_rows)
+        self.pixel_permutation = torch.randperm(self.num_rows)
         transform = transforms.Compose([transforms.ToTensor(),
-                                        transforms.Lambda(lambda x: x[:, pixel_permutation])])
+                                        transforms.Lambda(lambda x: x[:, self.pixel_permutation])])
 
         # load the dataset
         self.dataset = datasets.MNIST(self.root_dir, train=self.use_train_data,
@@ -109,6 +115,49 @@ class PermutedSequentialRowMnist(VideoToClassProblem):
 
         self.length = len(self.dataset)
 
+        if self.in_memory:
+            self.load_images_in_memory()
+
+    def load_images_in_memory(self):
+        """
+        Keeps the images in memory (see ``load_preprocessed_images()``): ``__getitem__`` then reads whole \
+        batches at once (see ``get_batch()``).
+
+        """
+        from miprometheus.utils.problems_utils.preprocessed_images import load_preprocessed_images
+
+        self.images, targets = load_preprocessed_images(
+            os.path.join(os.path.expanduser(self.root_dir), 'preprocessed'), self.dataset,
+            'train' if self.use_train_data else 'test', logger=self.logger)
+        self.targets = torch.from_numpy(targets)
+
+        # __getitem__ can read whole batches at once.
+        self.batch_getitem = True
+
+    def get_batch(self, indices):
+        """
+        Reads a batch of samples from the images kept in memory, with their rows permuted.
+
+        :param indices: Indices of the samples.
+        :type indices: list
+
+        :return: ``DataDict({'images', 'mask', 'targets', 'targets_label'})`` containing the batch.
+
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+
+        # create mask
+        mask = torch.zeros(len(indices), self.num_rows).type(self.app_state.IntTensor)
+        mask[:, -1] = 1
+
+        data_dict = DataDict({key: None for key in self.data_definitions.keys()})
+        data_dict['images'] = torch.from_numpy(self.images[indices]).float().div_(255)[:, :, self.pixel_permutation]
+        data_dict['mask'] = mask
+        data_dict['targets'] = self.targets[torch.from_numpy(indices)]
+        data_dict['targets_label'] = [self.labels[target] for target in data_dict['targets'].tolist()]
+
+        return data_dict
+
     def __getitem__(self, index):
         """
         Getter method to access the dataset and return a sample.
@@ -125,6 +174,13 @@ class PermutedSequentialRowMnist(VideoToClassProblem):
 
 
         """
+        if self.batch_getitem:
+            # The images are kept in memory: read the batch (or sample) directly.
+            if isinstance(index, (list, tuple, np.ndarray)):
+                return self.get_batch(index)
+            batch = self.get_batch([index])
+            return DataDict({key: value[0] for key, value in batch.items()})
+
         # get sample
         img, target = self.dataset.__getitem__(index)
 
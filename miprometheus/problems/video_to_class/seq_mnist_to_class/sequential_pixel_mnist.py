@@ -19,7 +19,9 @@
  transform it to a sequence of pixels."""
 __author__ = "Younes Bouhadjar & Vincent Marois"
 
+import os
 import torch
+import numpy as np
 from torchvision import datasets, transforms
 
 from miprometheus.utils.data_dict import DataDict
@@ -51,6 +53,9 @@ class SequentialPixelMNIST(VideoToClassProblem):
                     and  ``processed/test.pt`` will be saved,
                 - ``self.use_train_data`` (`bool`, `optional`) : If True, creates dataset from ``training.pt``,\
                     otherwise from ``test.pt``
+                - ``self.in_memory`` (`bool`, `optional`) : If ``True``, keeps the images in memory (cached in \
+                    ``<root_dir>/preprocessed``) and reads whole batches at once instead of transforming the \
+                    samples one by one (default: ``False``),
                 - ``self.defaut_values`` :
 
                     >>> self.default_values = {'nb_classes': 10,
@@ -73,6 +78,7 @@ class SequentialPixelMNIST(VideoToClassProblem):
         # Retrieve parameters from the dictionary.
         self.use_train_data = params['use_train_data']
         self.root_dir = params['root_dir']
+        self.in_memory = params.get('in_memory', False)
 
         self.num_rows = 28
         self.num_columns = 28
@@ -103,6 +109,50 @@ class SequentialPixelMNIST(VideoToClassProblem):
 
         self.length = len(self.dataset)
 
+        if self.in_memory:
+            self.load_images_in_memory()
+
+    def load_images_in_memory(self):
+        """
+        Keeps the images in memory (see ``load_preprocessed_images()``): ``__getitem__`` then reads whole \
+        batches at once (see ``get_batch()``).
+
+        """
+        from miprometheus.utils.problems_utils.preprocessed_images import load_preprocessed_images
+
+        self.images, targets = load_preprocessed_images(
+            os.path.join(os.path.expanduser(self.root_dir), 'preprocessed'), self.dataset,
+            'train' if self.use_train_data else 'test', logger=self.logger)
+        self.targets = torch.from_numpy(targets)
+
+        # __getitem__ can read whole batches at once.
+        self.batch_getitem = True
+
+    def get_batch(self, indices):
+        """
+        Reads a batch of samples from the images kept in memory, flattened into sequences of pixels.
+
+        :param indices: Indices of the samples.
+        :type indices: list
+
+        :return: ``DataDict({'sequences', 'mask', 'targets', 'targets_label'})`` containing the batch.
+
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        batch_size = len(indices)
+
+        # create mask
+        mask = torch.zeros(batch_size, self.num_rows * self.num_columns).type(self.app_state.IntTensor)
+        mask[:, -1] = 1
+
+        data_dict = DataDict({key: None for key in self.data_definitions.keys()})
+        data_dict['sequences'] = torch.from_numpy(self.images[indices]).float().div_(255).view(batch_size, -1)
+        data_dict['mask'] = mask
+        data_dict['targets'] = self.targets[torch.from_numpy(indices)]
+        data_dict['targets_label'] = [self.labels[target] for target in data_dict['targets'].tolist()]
+
+        return data_dict
+
     def __getitem__(self, index):
         """
         Getter method to access the dataset and return a sample.
@@ -117,6 +167,13 @@ class SequentialPixelMNIST(VideoToClassProblem):
             - targets: Index of the target class
 
         """
+        if self.batch_getitem:
+            # The images are kept in memory: read the batch (or sample) directly.
+            if isinstance(index, (list, tuple, np.ndarray)):
+                return self.get_batch(index)
+            batch = self.get_batch([index])
+            return DataDict({key: value[0] for key, value in batch.items()})
+
         # get sample
         img, target = self.dataset.__getitem__(index)
 
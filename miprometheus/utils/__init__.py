@@ -1,11 +1,43 @@
-from .app_state import AppState
-from .param_interface import ParamInterface
-from .param_registry import MetaSingletonABC, ParamRegistry
-from .singleton import SingletonMetaClass
-from .statistics_collector import StatisticsCollector
-from .statistics_aggregator import StatisticsAggregator
-from .time_plot import TimePlot
-from .data_dict import DataDict
+from . import lazy_module as _lazy_module
 
-from .loss import *
-from .problems_utils import *
+# The classes (& functions) are imported on first use, e.g. TimePlot (which imports matplotlib) only when
+# the visualization is active.
+_lazy_module.lazy_module(__name__, {
+    'AppState': '.app_state',
+    'ParamInterface': '.param_interface',
+    'MetaSingletonABC': '.param_registry',
+    'ParamRegistry': '.param_registry',
+    'SingletonMetaClass': '.singleton',
+    'StatisticsCollector': '.statistics_collector',
+    'StatisticsAggregator': '.statistics_aggregator',
+    'TimePlot': '.time_plot',
+    'ProgressReporter': '.progress_stream',
+    'ProgressMonitor': '.progress_stream',
+    'CurriculumController': '.curriculum_controller',
+    'DataDict': '.data_dict',
+    'LazyModule': '.lazy_module',
+
+    # Losses.
+    'MaskedCrossEntropyLoss': '.loss',
+    'MaskedBCEWithLogitsLoss': '.loss',
+
+    # Problems utils.
+    'file_lock': '.problems_utils',
+    'atomic_open': '.problems_utils',
+    'prepare_artefact': '.problems_utils',
+    'get_config_hash': '.problems_utils',
+    'FeatureStore': '.problems_utils',
+    'QuestionStore': '.problems_utils',
+    'LengthBucketBatchSampler': '.problems_utils',
+    'SharedTensorCache': '.problems_utils',
+    'BatchIndexSampler': '.problems_utils',
+    'unwrap_batch': '.problems_utils',
+    'load_preprocessed_images': '.problems_utils',
+    'transform_images': '.problems_utils',
+    'GenerateFeatureMaps': '.problems_utils',
+    'Language': '.problems_utils',
+    'SampleStore': '.problems_utils',
+    'SampleStoreWriter': '.problems_utils',
+    'sentence_bleu': '.problems_utils',
+    'CorpusBLEU': '.problems_utils'
+})
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+curriculum_controller.py: contains the ``CurriculumController``, adapting the difficulty of the training problem \
+to the performance of the model (instead of following a fixed schedule).
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import logging
+from collections import deque
+
+
+class CurriculumController(object):
+    """
+    Performance-aware curriculum learning: raises or lowers some parameters ("knobs", e.g. \
+    ``max_sequence_length``) of the training problem, depending on the rolling average of a statistic \
+    (by default the accuracy) collected during the validations (or the training episodes).
+
+    Configured by the ``adaptive`` subsection of the ``curriculum_learning`` section, e.g.:
+
+        >>> curriculum_learning:
+        >>>     initial_max_sequence_length: 2
+        >>>     adaptive:
+        >>>         knobs: [max_sequence_length]
+        >>>         source: validation
+        >>>         statistic: acc
+        >>>         window: 3
+        >>>         raise_threshold: 0.95
+        >>>         lower_threshold: 0.6
+
+    Each knob goes (in steps of size ``step``) from its initial value (``initial_<knob>`` curriculum parameter, \
+    or its current value) to its final value (``<knob>`` parameter of the problem). The knobs are raised one \
+    after the other (in the order of the list) and lowered in the reverse order.
+
+    The monitored statistic comes from the validation (``source: validation``: the partial validations of the \
+    ``OnlineTrainer``, the full validations of the ``OfflineTrainer``) or from the training episodes \
+    (``source: training``, i.e. the performance at the current difficulty, when the validation problem uses \
+    the final values of the knobs).
+
+    A decision is taken when the window is full, i.e. after ``window`` values at the current difficulty:
+
+        - the difficulty is raised if the average is >= ``raise_threshold``,
+        - the difficulty is lowered if the average is < ``lower_threshold``.
+
+    The window is emptied after each change.
+
+    .. warning::
+
+        The knobs must be attributes of the problem visible by the ``DataLoader`` workers (e.g. \
+        ``max_sequence_length`` of the algorithmic problems, which is stored in shared memory) when \
+        ``num_workers`` > 0.
+
+    """
+
+    def __init__(self, params, curriculum_params, problem):
+        """
+        Initializes the controller & sets the knobs of the problem to their initial values.
+
+        :param params: Parameters of the controller (``adaptive`` subsection of ``curriculum_learning``).
+        :type params: ``utils.param_interface.ParamInterface``
+
+        :param curriculum_params: ``curriculum_learning`` section (containing the ``initial_<knob>`` values).
+        :type curriculum_params: ``utils.param_interface.ParamInterface``
+
+        :param problem: Training problem.
+        :type problem: ``problems.problem.Problem``
+
+        """
+        self.logger = logging.getLogger('CurriculumController')
+
+        params.add_default_params({'knobs': ['max_sequence_length'],
+                                   'source': 'validation',
+                                   'statistic': 'acc',
+                                   'window': 3,
+                                   'raise_threshold': 0.95,
+                                   'lower_threshold': 0.0,
+                                   'step': 1})
+
+        self.problem = problem
+        self.knobs = list(params['knobs'])
+        self.source = params['source']
+        self.statistic = params['statistic']
+        self.raise_threshold = params['raise_threshold']
+        self.lower_threshold = params['lower_threshold']
+        self.step = params['step']
+
+        # Rolling window of the monitored statistic.
+        self.values = deque(maxlen=params['window'])
+
+        # Range of values of every knob.
+        self.initial_values = {}
+        self.final_values = {}
+        for knob in self.knobs:
+            initial_key = 'initial_' + knob
+            self.initial_values[knob] = curriculum_params[initial_key] if initial_key in curriculum_params \
+                else getattr(problem, knob)
+            self.final_values[knob] = problem.params[knob]
+            setattr(problem, knob, self.initial_values[knob])
+
+        # Last decision (-1: lowered, 0: none, +1: raised), until collected.
+        self.decision = 0
+
+        self.logger.info("Adaptive curriculum learning: raising {} when the average {} of the last {} {} values "
+                         "is >= {}".format(self.knobs, self.statistic, params['window'], self.source,
+                                           self.raise_threshold))
+
+    def get_level(self):
+        """
+        :return: Current difficulty level, i.e. the number of steps done from the initial values of the knobs.
+
+        """
+        return sum((getattr(self.problem, knob) - self.initial_values[knob]) // self.step for knob in self.knobs)
+
+    def is_done(self):
+        """
+        :return: True if all the knobs reached their final values.
+
+        """
+        return all(getattr(self.problem, knob) >= self.final_values[knob] for knob in self.knobs)
+
+    def update(self, value, episode):
+        """
+        Adds a new value of the monitored statistic to the window, and raises or lowers the difficulty if needed.
+
+        :param value: New value of the monitored statistic (e.g. accuracy on the validation batch).
+        :type value: float
+
+        :param episode: Current episode.
+        :type episode: int
+
+        :return: True if the curriculum is finished (all the knobs reached their final values).
+
+        """
+        self.values.append(float(value))
+
+        # Wait for the window to be full.
+        if len(self.values) < self.values.maxlen:
+            return self.is_done()
+
+        average = sum(self.values) / len(self.values)
+
+        if average >= self.raise_threshold:
+            # Raise the first knob which didn't reach its final value.
+            for knob in self.knobs:
+                current = getattr(self.problem, knob)
+                if current < self.final_values[knob]:
+                    self.change(knob, min(current + self.step, self.final_values[knob]), +1, average, episode)
+                    break
+
+        elif average < self.lower_threshold:
+            # Lower the last knob which was raised.
+            for knob in reversed(self.knobs):
+                current = getattr(self.problem, knob)
+                if current > self.initial_values[knob]:
+                    self.change(knob, max(current - self.step, self.initial_values[knob]), -1, average, episode)
+                    break
+
+        return self.is_done()
+
+    def change(self, knob, value, decision, average, episode):
+        """
+        Sets a new value of a knob of the problem and empties the window.
+
+        :param knob: Name of the knob.
+        :type knob: str
+
+        :param value: New value.
+
+        :param decision: +1 (raised) or -1 (lowered).
+        :type decision: int
+
+        :param average: Average of the monitored statistic which lead to the decision.
+        :type average: float
+
+        :param episode: Current episode.
+        :type episode: int
+
+        """
+        self.logger.info("Episode {}: average {} = {:.4f}, {} {} from {} to {}".format(
+            episode, self.statistic, average, 'raising' if decision > 0 else 'lowering', knob,
+            getattr(self.problem, knob), value))
+
+        setattr(self.problem, knob, value)
+        self.values.clear()
+
+        self.decision = decision
+
+    def add_statistics(self, stat_col):
+        """
+        Adds the curriculum statistics (difficulty level & last decision) to a ``StatisticsCollector``.
+
+        :param stat_col: ``StatisticsCollector``.
+
+        """
+        stat_col.add_statistic('curriculum_level', '{:d}')
+        stat_col.add_statistic('curriculum_decision', '{:+d}')
+
+    def collect_statistics(self, stat_col):
+        """
+        Collects the curriculum statistics, i.e. the current level & the decision taken since the last \
+        collection (0 if none).
+
+        :param stat_col: ``StatisticsCollector``.
+
+        """
+        stat_col['curriculum_level'] = self.get_level()
+        stat_col['curriculum_decision'] = self.decision
+        self.decision = 0
+
+    def add_aggregators(self, stat_agg):
+        """
+        Adds the curriculum aggregators to a ``StatisticsAggregator``.
+
+        :param stat_agg: ``StatisticsAggregator``.
+
+        """
+        stat_agg.add_aggregator('curriculum_level', '{:d}')
+        stat_agg.add_aggregator('curriculum_raises', '{:d}')
+        stat_agg.add_aggregator('curriculum_lowers', '{:d}')
+
+    def aggregate_statistics(self, stat_col, stat_agg):
+        """
+        Aggregates the curriculum statistics: last level & number of raises/lowers over the collected episodes.
+
+        :param stat_col: ``StatisticsCollector``.
+
+        :param stat_agg: ``StatisticsAggregator``.
+
+        """
+        decisions = stat_col['curriculum_decision']
+        stat_agg['curriculum_level'] = stat_col['curriculum_level'][-1] if len(decisions) > 0 else self.get_level()
+        stat_agg['curriculum_raises'] = sum(1 for d in decisions if d > 0)
+        stat_agg['curriculum_lowers'] = sum(1 for d in decisions if d < 0)
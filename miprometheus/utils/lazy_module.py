@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+lazy_module.py: contains the ``LazyModule`` class & the ``lazy_module()`` helper, making the attributes \
+(classes, functions) exposed by a package imported on first use, instead of when importing the package.
+
+This way, e.g. loading a single problem does not import the (heavy) dependencies of all other problems.
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+import sys
+import types
+import importlib
+
+
+class LazyModule(types.ModuleType):
+    """
+    Module class resolving the missing attributes using a registry, which maps their names to the (absolute \
+    or relative) paths of the modules defining them.
+
+    """
+
+    def __getattr__(self, name):
+        """
+        Called when the attribute was not found: imports the module defining it (and caches the attribute).
+
+        :param name: Name of the attribute.
+        :type name: str
+
+        :return: The attribute.
+
+        """
+        registry = self.__dict__.get('_lazy_registry', {})
+        if name not in registry:
+            raise AttributeError("module '{}' has no attribute '{}'".format(self.__name__, name))
+
+        module = importlib.import_module(registry[name], package=self.__name__)
+        value = getattr(module, name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        """
+        :return: List of the attributes, including the ones that were not imported yet.
+
+        """
+        return sorted(set(super(LazyModule, self).__dir__()) | set(self.__dict__.get('_lazy_registry', {})))
+
+
+def lazy_module(module_name, registry):
+    """
+    Turns a (package) module into a ``LazyModule``.
+
+    Usage, in the ``__init__.py`` of a package:
+
+        >>> lazy_module(__name__, {'CLEVR': '.clevr', 'SortOfCLEVR': '.sort_of_clevr'})
+
+    .. note::
+
+        ``__all__`` is set to the names in the registry, so ``from package import *`` still works (and imports \
+        all of them).
+
+    :param module_name: Name of the module (``__name__``).
+    :type module_name: str
+
+    :param registry: Dictionary mapping the names of the attributes to the paths of their modules.
+    :type registry: dict
+
+    """
+    module = sys.modules[module_name]
+    module._lazy_registry = registry
+    module.__all__ = list(registry.keys())
+    module.__class__ = LazyModule
@@ -1,4 +1,23 @@
-from .generate_feature_maps import GenerateFeatureMaps
-from .language import Language
+from miprometheus.utils.lazy_module import lazy_module
 
-__all__ = ['GenerateFeatureMaps', 'Language']
\ No newline at end of file
+# The classes (& functions) are imported on first use.
+lazy_module(__name__, {
+    'file_lock': '.data_preparation',
+    'atomic_open': '.data_preparation',
+    'prepare_artefact': '.data_preparation',
+    'get_config_hash': '.data_preparation',
+    'FeatureStore': '.feature_store',
+    'QuestionStore': '.question_store',
+    'LengthBucketBatchSampler': '.length_bucket_sampler',
+    'SharedTensorCache': '.shared_cache',
+    'BatchIndexSampler': '.batch_index_sampler',
+    'unwrap_batch': '.batch_index_sampler',
+    'load_preprocessed_images': '.preprocessed_images',
+    'transform_images': '.preprocessed_images',
+    'GenerateFeatureMaps': '.generate_feature_maps',
+    'Language': '.language',
+    'SampleStore': '.sample_store',
+    'SampleStoreWriter': '.sample_store',
+    'sentence_bleu': '.bleu',
+    'CorpusBLEU': '.bleu'
+})
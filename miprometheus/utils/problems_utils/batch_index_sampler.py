@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+batch_index_sampler.py: contains the ``BatchIndexSampler`` & ``unwrap_batch()``, used to pass whole batches of \
+indices to the ``__getitem__`` of the problems reading batches at once (i.e. with ``batch_getitem`` set).
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+from torch.utils.data.sampler import Sampler
+
+
+class BatchIndexSampler(Sampler):
+    """
+    Sampler yielding the batches (lists of indices) of a batch sampler as single "indices".
+
+    Used with ``batch_size=1`` and ``collate_fn=unwrap_batch``, the ``DataLoader`` then calls \
+    ``problem[list_of_indices]`` once per batch, which returns the whole batch:
+
+        >>> DataLoader(problem, sampler=BatchIndexSampler(batch_sampler), batch_size=1, collate_fn=unwrap_batch)
+
+    """
+
+    def __init__(self, batch_sampler):
+        """
+        :param batch_sampler: Sampler yielding lists of indices, e.g. ``torch.utils.data.sampler.BatchSampler``.
+
+        """
+        self.batch_sampler = batch_sampler
+
+    def __iter__(self):
+        """
+        :return: Iterator over the batches of indices.
+
+        """
+        return iter(self.batch_sampler)
+
+    def __len__(self):
+        """
+        :return: Number of batches.
+
+        """
+        return len(self.batch_sampler)
+
+
+def unwrap_batch(batch):
+    """
+    ``collate_fn`` returning the (only) element of a "batch" of already collated batches.
+
+    :param batch: List containing a single batch (``DataDict``).
+    :type batch: list
+
+    :return: The batch.
+
+    """
+    return batch[0]
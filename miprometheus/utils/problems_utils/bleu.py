@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+bleu.py: contains functions computing the BLEU score directly on (padded) tensors of word indexes, for whole \
+batches at once, and the ``CorpusBLEU`` accumulator computing the corpus-level BLEU score over several batches.
+
+The scores are those of ``nltk.translate.bleu_score`` (``sentence_bleu`` & ``corpus_bleu``, with a single \
+reference per hypothesis and uniform weights), optionally smoothed as with ``SmoothingFunction().method1``.
+
+"""
+__author__ = "Vincent Marois"
+
+import torch
+
+
+def ngram_statistics(hypotheses, hypotheses_lengths, references, references_lengths, max_order=4):
+    """
+    Counts, for every pair of sentences & every order n, the n-grams of the hypothesis and the number of them \
+    matching the reference (clipped by their number of occurrences in the reference).
+
+    .. note::
+
+        The n-grams of all the sentences of the batch are identified at once (using ``torch.unique`` on the \
+        n-grams, prefixed by the index of their sentence), and counted with ``torch.bincount``.
+
+    :param hypotheses: Indexes of the words of the hypotheses [batch_size x max_hypothesis_length].
+    :type hypotheses: ``torch.Tensor``
+
+    :param hypotheses_lengths: Lengths of the hypotheses [batch_size].
+    :type hypotheses_lengths: ``torch.Tensor``
+
+    :param references: Indexes of the words of the references [batch_size x max_reference_length].
+    :type references: ``torch.Tensor``
+
+    :param references_lengths: Lengths of the references [batch_size].
+    :type references_lengths: ``torch.Tensor``
+
+    :param max_order: Maximum order of the n-grams (DEFAULT: 4).
+    :type max_order: int
+
+    :return: Numbers of matching n-grams [batch_size x max_order] & numbers of n-grams of the hypotheses \
+    [batch_size x max_order] (int64 tensors).
+
+    """
+    batch_size = hypotheses.shape[0]
+    device = hypotheses.device
+    hypotheses_lengths = hypotheses_lengths.to(device).long()
+    references_lengths = references_lengths.to(device).long()
+    references = references.to(device).long()
+    hypotheses = hypotheses.long()
+
+    sentences = torch.arange(batch_size, device=device)
+    numerators = torch.zeros(batch_size, max_order, dtype=torch.int64, device=device)
+    denominators = torch.zeros(batch_size, max_order, dtype=torch.int64, device=device)
+
+    def get_ngrams(sequences, lengths, n):
+        # n-grams [number of n-grams x (n+1)], prefixed by the index of their sentence.
+        if sequences.shape[1] < n:
+            return sequences.new_zeros(0, n + 1)
+        windows = sequences.unfold(1, n, 1)
+        valid = torch.arange(windows.shape[1], device=device).unsqueeze(0) <= (lengths - n).unsqueeze(1)
+        prefixed = torch.cat([sentences.view(-1, 1, 1).expand(-1, windows.shape[1], 1), windows], dim=2)
+        return prefixed[valid]
+
+    for n in range(1, max_order + 1):
+        hypotheses_ngrams = get_ngrams(hypotheses, hypotheses_lengths, n)
+        references_ngrams = get_ngrams(references, references_lengths, n)
+
+        denominators[:, n - 1] = torch.clamp(hypotheses_lengths - n + 1, min=0)
+        if len(hypotheses_ngrams) == 0 or len(references_ngrams) == 0:
+            continue
+
+        # Identify the distinct n-grams of every sentence.
+        ngrams, ids = torch.unique(torch.cat([hypotheses_ngrams, references_ngrams]), dim=0, return_inverse=True)
+        hypotheses_counts = torch.bincount(ids[:len(hypotheses_ngrams)], minlength=len(ngrams))
+        references_counts = torch.bincount(ids[len(hypotheses_ngrams):], minlength=len(ngrams))
+
+        # Clipped counts, summed per sentence.
+        numerators[:, n - 1].index_add_(0, ngrams[:, 0], torch.min(hypotheses_counts, references_counts))
+
+    return numerators, denominators
+
+
+def bleu_from_statistics(numerators, denominators, hypotheses_lengths, references_lengths, epsilon=0.1):
+    """
+    Computes BLEU scores from the n-gram statistics (see ``ngram_statistics()``) & lengths of the sentences.
+
+    The precisions with no match are smoothed by adding ``epsilon`` to their numerator (``method1`` of \
+    ``nltk.translate.bleu_score.SmoothingFunction``). A score is 0 when no unigram matches.
+
+    :param numerators: Numbers of matching n-grams [... x max_order].
+    :type numerators: ``torch.Tensor``
+
+    :param denominators: Numbers of n-grams of the hypotheses [... x max_order] (counted as at least 1).
+    :type denominators: ``torch.Tensor``
+
+    :param hypotheses_lengths: Lengths of the hypotheses [...].
+    :type hypotheses_lengths: ``torch.Tensor``
+
+    :param references_lengths: Lengths of the references [...].
+    :type references_lengths: ``torch.Tensor``
+
+    :param epsilon: Smoothing of the precisions with no match (DEFAULT: 0.1, 0 meaning no smoothing).
+    :type epsilon: float
+
+    :return: BLEU scores [...] (float64 tensor).
+
+    """
+    numerators = numerators.double()
+    denominators = torch.clamp(denominators.double(), min=1)
+    hypotheses_lengths = hypotheses_lengths.double()
+    references_lengths = references_lengths.double().to(hypotheses_lengths.device)
+
+    # Smoothed precisions, combined with uniform weights.
+    precisions = torch.where(numerators > 0, numerators, torch.full_like(numerators, epsilon)) / denominators
+    log_precisions = torch.log(precisions).mean(dim=-1)
+
+    # Brevity penalty: exp(1 - r / c) if c <= r (0 if c == 0), else 1.
+    brevity_penalty = torch.where(hypotheses_lengths > references_lengths, torch.ones_like(hypotheses_lengths),
+                                  torch.exp(1 - references_lengths / torch.clamp(hypotheses_lengths, min=1)))
+    brevity_penalty = torch.where(hypotheses_lengths > 0, brevity_penalty, torch.zeros_like(brevity_penalty))
+
+    scores = brevity_penalty * torch.exp(log_precisions)
+
+    return torch.where(numerators[..., 0] > 0, scores, torch.zeros_like(scores))
+
+
+def sentence_bleu(hypotheses, hypotheses_lengths, references, references_lengths, max_order=4, epsilon=0.1):
+    """
+    Computes the BLEU score of every pair of sentences of a batch.
+
+    :param hypotheses: Indexes of the words of the hypotheses [batch_size x max_hypothesis_length].
+    :type hypotheses: ``torch.Tensor``
+
+    :param hypotheses_lengths: Lengths of the hypotheses [batch_size].
+    :type hypotheses_lengths: ``torch.Tensor``
+
+    :param references: Indexes of the words of the references [batch_size x max_reference_length].
+    :type references: ``torch.Tensor``
+
+    :param references_lengths: Lengths of the references [batch_size].
+    :type references_lengths: ``torch.Tensor``
+
+    :param max_order: Maximum order of the n-grams (DEFAULT: 4).
+    :type max_order: int
+
+    :param epsilon: Smoothing of the precisions with no match (DEFAULT: 0.1).
+    :type epsilon: float
+
+    :return: BLEU scores [batch_size] (float64 tensor).
+
+    """
+    numerators, denominators = ngram_statistics(hypotheses, hypotheses_lengths, references, references_lengths,
+                                                max_order)
+
+    return bleu_from_statistics(numerators, denominators, hypotheses_lengths, references_lengths, epsilon)
+
+
+class CorpusBLEU(object):
+    """
+    Accumulates the n-gram statistics & lengths of the sentences of several batches, to compute the \
+    corpus-level BLEU score (i.e. the precisions are computed over all the sentences, instead of averaging \
+    the scores of the sentences).
+
+    """
+
+    def __init__(self, max_order=4, epsilon=0.1):
+        """
+        Initializes the (empty) accumulator.
+
+        :param max_order: Maximum order of the n-grams (DEFAULT: 4).
+        :type max_order: int
+
+        :param epsilon: Smoothing of the precisions with no match (DEFAULT: 0.1).
+        :type epsilon: float
+
+        """
+        self.max_order = max_order
+        self.epsilon = epsilon
+        self.reset()
+
+    def reset(self):
+        """
+        Empties the accumulator.
+
+        """
+        self.numerators = torch.zeros(self.max_order, dtype=torch.int64)
+        self.denominators = torch.zeros(self.max_order, dtype=torch.int64)
+        self.hypotheses_length = 0
+        self.references_length = 0
+
+    def update(self, hypotheses, hypotheses_lengths, references, references_lengths):
+        """
+        Adds a batch of pairs of sentences to the accumulator.
+
+        :param hypotheses: Indexes of the words of the hypotheses [batch_size x max_hypothesis_length].
+        :type hypotheses: ``torch.Tensor``
+
+        :param hypotheses_lengths: Lengths of the hypotheses [batch_size].
+        :type hypotheses_lengths: ``torch.Tensor``
+
+        :param references: Indexes of the words of the references [batch_size x max_reference_length].
+        :type references: ``torch.Tensor``
+
+        :param references_lengths: Lengths of the references [batch_size].
+        :type references_lengths: ``torch.Tensor``
+
+        :return: BLEU scores of the sentences of the batch [batch_size] (float64 tensor).
+
+        """
+        numerators, denominators = ngram_statistics(hypotheses, hypotheses_lengths, references, references_lengths,
+                                                    self.max_order)
+
+        # The number of n-grams of every hypothesis is counted as at least 1 (as in nltk).
+        self.numerators += numerators.sum(dim=0).cpu()
+        self.denominators += torch.clamp(denominators, min=1).sum(dim=0).cpu()
+        self.hypotheses_length += int(hypotheses_lengths.sum())
+        self.references_length += int(references_lengths.sum())
+
+        return bleu_from_statistics(numerators, denominators, hypotheses_lengths, references_lengths, self.epsilon)
+
+    def score(self):
+        """
+        :return: Corpus-level BLEU score of the accumulated sentences (float).
+
+        """
+        if self.hypotheses_length == 0:
+            return 0.0
+
+        return bleu_from_statistics(self.numerators, self.denominators, torch.tensor(self.hypotheses_length),
+                                    torch.tensor(self.references_length), self.epsilon).item()
+
+
+if __name__ == '__main__':
+    import math
+    from nltk.translate.bleu_score import sentence_bleu as nltk_sentence_bleu, corpus_bleu, SmoothingFunction
+
+    torch.manual_seed(0)
+    hyps = torch.randint(0, 6, (32, 12))
+    hyps_lengths = torch.randint(0, 13, (32,))
+    refs = torch.randint(0, 6, (32, 10))
+    refs_lengths = torch.randint(1, 11, (32,))
+
+    corpus = CorpusBLEU()
+    scores = corpus.update(hyps, hyps_lengths, refs, refs_lengths)
+
+    hyps_list = [h[:l].tolist() for h, l in zip(hyps, hyps_lengths)]
+    refs_list = [[r[:l].tolist()] for r, l in zip(refs, refs_lengths)]
+    nltk_scores = [nltk_sentence_bleu(r, h, smoothing_function=SmoothingFunction().method1)
+                   for r, h in zip(refs_list, hyps_list)]
+
+    print('Max difference with nltk (sentence level): {}'.format(
+        max(abs(s - n) for s, n in zip(scores.tolist(), nltk_scores))))
+    print('Corpus level: {} (nltk: {})'.format(
+        corpus.score(), corpus_bleu(refs_list, hyps_list, smoothing_function=SmoothingFunction().method1)))
+    assert math.isclose(corpus.score(), corpus_bleu(refs_list, hyps_list,
+                                                    smoothing_function=SmoothingFunction().method1), abs_tol=1e-9)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+data_preparation.py: contains helpers coordinating the one-time preparation of the dataset artefacts \
+(generated files or directories) between concurrent processes, e.g. the experiments of a grid sharing the \
+same ``data_folder``:
+
+    - ``file_lock`` serializes the processes preparing the same artefact,
+    - ``atomic_open`` & ``prepare_artefact`` build an artefact under a temporary name and publish it with \
+    an atomic rename, so that other processes never see it partially written,
+    - ``get_config_hash`` identifies an artefact by the configuration it was built from.
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+import os
+import json
+import time
+import fcntl
+import shutil
+import socket
+import hashlib
+from contextlib import contextmanager
+
+
+def get_config_hash(config):
+    """
+    Returns the hash of a configuration, used to name the artefact built from it (so that a change of \
+    configuration results in a different artefact).
+
+    .. note::
+
+        The configuration is serialized to JSON with sorted keys, the values which are not serializable \
+        being converted with ``str()``.
+
+    :param config: Configuration of the artefact.
+    :type config: dict
+
+    :return: MD5 hex digest of the configuration (str).
+
+    """
+    return hashlib.md5(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def get_temporary_path(path):
+    """
+    Returns the temporary path under which an artefact is built by the current process.
+
+    .. note::
+
+        The temporary path is located in the same directory as the artefact (i.e. on the same filesystem), \
+        so that it can be renamed atomically.
+
+    :param path: Path to the artefact.
+    :type path: str
+
+    :return: Temporary path (str), unique to the current process.
+
+    """
+    return '{}.tmp-{}-{}'.format(os.path.normpath(path), socket.gethostname(), os.getpid())
+
+
+def remove_artefact(path):
+    """
+    Removes an artefact (file or directory), if it exists.
+
+    :param path: Path to the artefact.
+    :type path: str
+
+    """
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+@contextmanager
+def file_lock(path, logger=None):
+    """
+    Holds an exclusive lock associated with an artefact, blocking until it is acquired.
+
+    .. note::
+
+        The lock is taken on a separate ``<path>.lock`` file, which is never removed (removing it would allow \
+        two processes to hold "the" lock on two different files). POSIX record locks are used, which are \
+        also supported by NFS.
+
+    :param path: Path to the artefact.
+    :type path: str
+
+    :param logger: Logger used to signal that the process waits for another one (DEFAULT: None).
+
+    """
+    lock_filename = os.path.normpath(path) + '.lock'
+    os.makedirs(os.path.dirname(os.path.abspath(lock_filename)), exist_ok=True)
+
+    with open(lock_filename, 'a') as lock_file:
+        try:
+            fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            if logger is not None:
+                logger.info('Waiting for another process preparing {}'.format(path))
+            fcntl.lockf(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.lockf(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def atomic_open(path, mode='wb', **kwargs):
+    """
+    Opens a file under a temporary name and renames it to ``path`` when exiting the context without error \
+    (the temporary file is removed otherwise).
+
+    :param path: Path to the file to write.
+    :type path: str
+
+    :param mode: Mode in which the file is opened (DEFAULT: 'wb').
+    :type mode: str
+
+    :param kwargs: Additional arguments passed to ``open()`` (e.g. encoding).
+
+    :return: File object.
+
+    """
+    tmp_path = get_temporary_path(path)
+    try:
+        with open(tmp_path, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        remove_artefact(tmp_path)
+        raise
+
+
+def get_partial_path(path):
+    """
+    Returns the path under which a resumable artefact is built.
+
+    .. note::
+
+        Unlike the path returned by ``get_temporary_path()``, it does not depend on the process, so that \
+        another process (holding the lock) can resume the build after an interruption.
+
+    :param path: Path to the artefact.
+    :type path: str
+
+    :return: Partial path (str).
+
+    """
+    return os.path.normpath(path) + '.partial'
+
+
+def prepare_artefact(path, build_fn, regenerate=False, logger=None, resumable=False):
+    """
+    Makes sure that an artefact exists, building it if needed. When several processes need the same \
+    missing artefact, exactly one of them builds it while the others wait and then reuse it.
+
+    The artefact is built by ``build_fn(tmp_path)`` under a temporary path, then atomically published.
+
+    If ``resumable`` is set, the artefact is built under ``get_partial_path(path)``, which is kept if the \
+    build fails or is interrupted: ``build_fn`` is then responsible for resuming from its content.
+
+    :param path: Path to the artefact (file or directory).
+    :type path: str
+
+    :param build_fn: Function building the artefact at the path passed as its (only) argument.
+
+    :param regenerate: Whether to rebuild the artefact even if it exists. An artefact published by another \
+    process while waiting for the lock is reused nonetheless (DEFAULT: False).
+    :type regenerate: bool
+
+    :param logger: Logger (DEFAULT: None).
+
+    :param resumable: Whether to keep the partially built artefact on failure (DEFAULT: False).
+    :type resumable: bool
+
+    :return: True if the artefact was built by the current process, False if it was reused.
+
+    """
+    if os.path.exists(path) and not regenerate:
+        return False
+
+    requested = time.time()
+
+    with file_lock(path, logger):
+        # Check again: the artefact might have been published while waiting for the lock.
+        if os.path.exists(path) and (not regenerate or os.path.getmtime(path) >= requested):
+            if logger is not None:
+                logger.info('{} was prepared by another process, reusing it'.format(path))
+            return False
+
+        if resumable:
+            tmp_path = get_partial_path(path)
+            if os.path.exists(tmp_path) and logger is not None:
+                logger.info('Resuming the preparation of {} from {}'.format(path, tmp_path))
+        else:
+            tmp_path = get_temporary_path(path)
+            remove_artefact(tmp_path)
+        try:
+            build_fn(tmp_path)
+            # Publish.
+            remove_artefact(path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if not resumable:
+                remove_artefact(tmp_path)
+            raise
+
+    return True
+
+
+if __name__ == '__main__':
+    from tempfile import mkdtemp
+    from multiprocessing import Pool
+
+    artefact = os.path.join(mkdtemp(), 'artefact.txt')
+
+    def build(tmp_path):
+        time.sleep(0.5)
+        with open(tmp_path, 'w') as f:
+            f.write('built by {}'.format(os.getpid()))
+
+    # Four processes need the same artefact: a single one builds it.
+    with Pool(4) as pool:
+        built = pool.starmap(prepare_artefact, [(artefact, build)] * 4)
+
+    print('Number of processes which built the artefact: {}'.format(sum(built)))
+    with open(artefact, 'r') as f:
+        print(f.read())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+feature_store.py: contains the ``FeatureStore`` class, a packed, memory-mapped store of fixed-size feature maps \
+(e.g. extracted from the images of a dataset by a pretrained CNN), indexed by image id.
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+import os
+import numpy as np
+
+
+class FeatureStore(object):
+    """
+    Store of feature maps, kept in a directory containing two ``.npy`` files:
+
+        - ``features.npy``: contiguous array of shape [N, <feature shape>] (e.g. float32 or float16),
+        - ``image_ids.npy``: sorted array of the N image ids, the i-th id indexing the i-th row.
+
+    The features are memory-mapped (lazily, i.e. by each ``DataLoader`` worker using the store): reading a \
+    feature map returns a view on the mapped file, which is shared by all processes through the page cache.
+
+    .. note::
+
+        The array is mapped in copy-on-write mode, so the returned views are writable (e.g. \
+        ``torch.from_numpy`` accepts them) while the file is never modified.
+
+    """
+
+    def __init__(self, path):
+        """
+        Opens an existing store.
+
+        :param path: Path to the directory of the store.
+        :type path: str
+
+        """
+        self.path = path
+        self.image_ids = np.load(os.path.join(path, 'image_ids.npy'))
+
+        # Check whether the ids can be used directly as row indices.
+        self.ids_are_rows = np.array_equal(self.image_ids, np.arange(len(self.image_ids)))
+
+        # Mapped on first access, in the process using the store.
+        self._features = None
+
+    @staticmethod
+    def create(path, image_ids, feature_shape, dtype=np.float32):
+        """
+        Creates a new (empty) store, whose rows must then be filled through ``FeatureStore.writable_features()``.
+
+        :param path: Path to the directory of the store (created if needed).
+        :type path: str
+
+        :param image_ids: Ids of the images (will be sorted).
+        :type image_ids: list or ``np.array``
+
+        :param feature_shape: Shape of a single feature map, e.g. [1024, 14, 14].
+        :type feature_shape: list
+
+        :param dtype: Type of the stored features (DEFAULT: np.float32).
+
+        :return: ``FeatureStore``.
+
+        """
+        os.makedirs(path, exist_ok=True)
+
+        image_ids = np.sort(np.asarray(image_ids, dtype=np.int64))
+        np.save(os.path.join(path, 'image_ids.npy'), image_ids)
+
+        features = np.lib.format.open_memmap(os.path.join(path, 'features.npy'), mode='w+', dtype=np.dtype(dtype),
+                                             shape=(len(image_ids),) + tuple(feature_shape))
+        del features
+
+        return FeatureStore(path)
+
+    @staticmethod
+    def exists(path):
+        """
+        :param path: Path to the directory of the store.
+        :type path: str
+
+        :return: True if a (complete) store exists at ``path``.
+
+        """
+        return os.path.isfile(os.path.join(path, 'features.npy')) and \
+            os.path.isfile(os.path.join(path, 'image_ids.npy'))
+
+    @property
+    def features(self):
+        """
+        :return: The memory-mapped array of features (mapped on first access).
+
+        """
+        if self._features is None:
+            self._features = np.load(os.path.join(self.path, 'features.npy'), mmap_mode='c')
+        return self._features
+
+    def writable_features(self):
+        """
+        :return: The array of features, mapped in read-write mode (used to fill the store).
+
+        """
+        return np.load(os.path.join(self.path, 'features.npy'), mmap_mode='r+')
+
+    def get_rows(self, image_ids):
+        """
+        Returns the rows corresponding to image ids.
+
+        :param image_ids: Image id(s).
+        :type image_ids: int or ``np.array``
+
+        :return: Row index(es).
+
+        """
+        if self.ids_are_rows:
+            rows = image_ids
+        else:
+            rows = np.searchsorted(self.image_ids, image_ids)
+
+        if np.any(np.asarray(rows) >= len(self.image_ids)) or np.any(self.image_ids[rows] != image_ids):
+            raise KeyError('Image id(s) {} not found in the feature store {}'.format(image_ids, self.path))
+
+        return rows
+
+    def __getitem__(self, image_id):
+        """
+        Returns the feature map of an image.
+
+        :param image_id: Id of the image.
+        :type image_id: int
+
+        :return: ``np.array`` (view on the mapped file, no copy involved).
+
+        """
+        return self.features[self.get_rows(image_id)]
+
+    def __len__(self):
+        """
+        :return: Number of feature maps in the store.
+
+        """
+        return len(self.image_ids)
+
+    def __getstate__(self):
+        """
+        Drops the mapping when pickling the store (e.g. when sending it to ``DataLoader`` workers started with \
+        the "spawn" method), it will be recreated on first access.
+
+        """
+        state = self.__dict__.copy()
+        state['_features'] = None
+        return state
+
+
+if __name__ == '__main__':
+    from tempfile import mkdtemp
+
+    store_path = os.path.join(mkdtemp(), 'features')
+    store = FeatureStore.create(store_path, image_ids=[2, 0, 1], feature_shape=[4, 2, 2], dtype=np.float16)
+
+    features = store.writable_features()
+    features[:] = np.arange(3)[:, None, None, None]
+    features.flush()
+
+    store = FeatureStore(store_path)
+    print('Feature map of image 2: {}, dtype {}, shares memory with the mapping: {}'.format(
+        store[2].shape, store[2].dtype, np.shares_memory(store[2], store.features)))
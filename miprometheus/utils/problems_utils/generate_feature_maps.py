@@ -128,8 +128,10 @@ class GenerateFeatureMaps(Dataset):
         self.model.cuda() if torch.cuda.is_available() else None
         self.model.eval()
 
-        # set the dataset size as the numbers of images in the folder
-        self.length = len(os.listdir(os.path.expanduser(self.image_dir)))
+        # set the dataset size as the numbers of images in the folder (following the filename template)
+        prefix, suffix = self.filename_template.split('{}')
+        self.length = len([f for f in os.listdir(os.path.expanduser(self.image_dir))
+                           if f.startswith(prefix) and f.endswith(suffix)])
 
     def __getitem__(self, index):
         """
@@ -44,10 +44,55 @@ __author__ = "Vincent Marois, Ryan L. McAvoy"
 
 """
 
+import os
+import json
+import numpy as np
 import torch
-from collections import Counter, OrderedDict
+from collections import Counter, OrderedDict, defaultdict
 import torchtext.vocab as vocab
 
+from miprometheus.utils.problems_utils.data_preparation import prepare_artefact, get_config_hash
+
+
+def _default_unk_index():
+    """
+    :return: Index of the unknown token (first special token), returned for the words out of the vocabulary.
+
+    """
+    return 0
+
+
+class RestrictedVocab(object):
+    """
+    Vocabulary restricted to the words of a dataset, along with their pretrained embedding vectors, memory-mapped \
+    from the file extracted by ``Language.build_pretrained_vocab()``.
+
+    Provides the attributes of the torchtext ``Vocab`` used by ``Language`` (``itos``, ``stoi`` & ``vectors``).
+
+    """
+
+    def __init__(self, path):
+        """
+        Loads the words & memory-maps their vectors.
+
+        :param path: Path to the directory containing ``itos.json`` & ``vectors.npy``.
+        :type path: str
+
+        """
+        with open(os.path.join(path, 'itos.json'), 'r', encoding='utf-8') as f:
+            self.itos = json.load(f)
+        self.stoi = defaultdict(_default_unk_index, {word: index for index, word in enumerate(self.itos)})
+
+        # Mapped in copy-on-write mode: the tensor is writable while the file is never modified.
+        self.vectors = torch.from_numpy(np.load(os.path.join(path, 'vectors.npy'), mmap_mode='c'))
+
+    def __len__(self):
+        """
+        :return: Number of words in the vocabulary.
+
+        """
+        return len(self.itos)
+
 
 class Language(object):
     """
@@ -78,14 +123,8 @@ class Language(object):
         :returns: FloatTensor of embedded vectors [max_sentence_length, embedding size]
 
         """
-        outsentence = torch.zeros(
-            (len(sentence.split()), self.vocab.vectors.size()[1]))
-
-        # embed a word at a time
-        for i, word in enumerate(sentence.split()):
-            outsentence[i, :] = self.embed_word(word)
-
-        return outsentence
+        # embed all the words at once
+        return self.embed_words(sentence.split())
 
     def embed_word(self, word):
         """
@@ -100,6 +139,17 @@ class Language(object):
         index = self.vocab.stoi[word]
         return self.vocab.vectors[index]
 
+    def embed_words(self, words):
+        """
+        Embed a list of words at once (e.g. a vocabulary, to build an embedding look-up table).
+
+        :param words: List of strings, each containing a single word to embed
+        :returns: FloatTensor of embedded vectors [len(words), embedding size]
+
+        """
+        indexes = torch.LongTensor([self.vocab.stoi[word] for word in words])
+        return self.vocab.vectors.index_select(0, indexes)
+
     def return_index_from_word(self, word):
         """
         returns the index of a word in the vocab.
@@ -119,12 +169,18 @@ class Language(object):
 
         return self.vocab.itos[index]
 
-    def build_pretrained_vocab(self, data_set, **kwargs):
+    def build_pretrained_vocab(self, data_set, cache_folder=None, **kwargs):
         """
         Construct the torchtext Vocab object from a list of sentences. This
         allows us to load only vectors we actually need.
 
+        If ``cache_folder`` is indicated, the vectors of the words of the vocabulary are extracted once (loading \
+        the whole pretrained embedding with torchtext) and stored in ``cache_folder``, in a directory depending on \
+        the vocabulary & the embedding type. The next calls memory-map this (compact) matrix instead, see \
+        ``RestrictedVocab``.
+
         :param data_set: A list containing strings (either sentences or just single word string work)
+        :param cache_folder: Folder in which the restricted embedding matrix is stored (DEFAULT: None, i.e. no cache)
         :param \**kwargs: The keyword arguments for the vectors class from torch text. The most important kwarg is vectors which is a string containing the embedding type to be loaded
 
         """
@@ -140,7 +196,28 @@ class Language(object):
             tok for tok in [self.unk_token, self.pad_token, self.init_token,
                             self.eos_token]
             if tok is not None))
-        self.vocab = self.vocab_cls(counter, specials=specials, **kwargs)
+
+        if cache_folder is None:
+            self.vocab = self.vocab_cls(counter, specials=specials, **kwargs)
+            return
+
+        # The restricted matrix depends on the words (& their counts, which determine their order) and on the
+        # embedding type.
+        config = {'counter': sorted(counter.items()), 'specials': specials, 'kwargs': kwargs}
+        config_hash = get_config_hash(config)
+        path = os.path.join(os.path.expanduser(cache_folder),
+                            '{}_vocab_{}'.format(kwargs.get('vectors', 'vectors'), config_hash[:12]))
+
+        def extract_vectors(tmp_path):
+            # Load the whole pretrained embedding (once) & keep the vectors of the vocabulary.
+            full_vocab = self.vocab_cls(counter, specials=specials, **kwargs)
+            os.makedirs(tmp_path)
+            np.save(os.path.join(tmp_path, 'vectors.npy'), full_vocab.vectors.numpy().astype(np.float32))
+            with open(os.path.join(tmp_path, 'itos.json'), 'w', encoding='utf-8') as f:
+                json.dump(list(full_vocab.itos), f)
+
+        prepare_artefact(path, extract_vectors)
+        self.vocab = RestrictedVocab(path)
 
 
 """
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+length_bucket_sampler.py: contains the ``LengthBucketBatchSampler``, a ``BatchSampler`` grouping the samples of \
+a ``Problem`` with similar lengths (e.g. the number of words of a question) into the same batches, which limits \
+the padding of variable-length samples.
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+import numpy as np
+from torch.utils.data.sampler import Sampler
+
+
+class LengthBucketBatchSampler(Sampler):
+    """
+    Batch sampler distributing the samples into length buckets, each batch being drawn from a single bucket.
+
+    The lengths of the samples are provided by ``Problem.get_sample_lengths()``.
+
+    Can be selected in the ``dataloader`` section of the configuration, e.g.:
+
+        >>> dataloader:
+        >>>     batch_sampler:
+        >>>         name: LengthBucketBatchSampler
+        >>>         boundaries: [10, 15, 20, 30]  # buckets: [0, 10[, [10, 15[, ..., [30, +inf[
+        >>>         shuffle: True
+        >>>         max_tokens: 2048  # optional: token budget per batch (replaces the batch size)
+
+    """
+
+    def __init__(self, lengths, batch_size, boundaries=None, shuffle=True, max_tokens=None, drop_last=False):
+        """
+        Distributes the samples into the buckets.
+
+        :param lengths: Lengths of the samples of the problem.
+        :type lengths: list or ``np.array``
+
+        :param batch_size: Number of samples in a batch.
+        :type batch_size: int
+
+        :param boundaries: Sorted boundaries (lengths) of the buckets. If None, each length has its own bucket \
+        (DEFAULT: None).
+        :type boundaries: list
+
+        :param shuffle: Whether to shuffle the samples within the buckets & the order of the batches across the \
+        buckets at each epoch (DEFAULT: True).
+        :type shuffle: bool
+
+        :param max_tokens: Maximum number of tokens (i.e. number of samples x length of the longest one) in a \
+        batch. If set, the batches are filled up to this budget instead of having ``batch_size`` samples \
+        (DEFAULT: None).
+        :type max_tokens: int
+
+        :param drop_last: Whether to drop the last incomplete batch of each bucket (DEFAULT: False).
+        :type drop_last: bool
+
+        """
+        assert lengths is not None, "The problem does not provide the lengths of its samples, hence cannot be " \
+                                    "used with the LengthBucketBatchSampler"
+
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.max_tokens = max_tokens
+        self.drop_last = drop_last
+
+        if boundaries is None:
+            # one bucket per length.
+            _, bucket_ids = np.unique(self.lengths, return_inverse=True)
+        else:
+            bucket_ids = np.digitize(self.lengths, np.sort(boundaries))
+
+        # list of the (indices of the) samples of each non-empty bucket.
+        order = np.argsort(bucket_ids, kind='mergesort')
+        splits = np.flatnonzero(np.diff(bucket_ids[order])) + 1
+        self.buckets = np.split(order, splits) if len(order) > 0 else []
+
+        if max_tokens is not None:
+            assert max_tokens >= self.lengths.max(), "max_tokens ({}) must be at least the length of the longest " \
+                                                     "sample ({})".format(max_tokens, self.lengths.max())
+
+        # number of batches - in the token-budget mode, it depends on the order of the samples: estimated from the
+        # sorted buckets.
+        self.num_batches = sum(len(batches) for batches in map(self.split_bucket, self.buckets))
+
+    def split_bucket(self, bucket):
+        """
+        Splits the samples of a bucket into batches.
+
+        :param bucket: Indices of the samples of the bucket.
+        :type bucket: ``np.array``
+
+        :return: list of batches (lists of indices).
+
+        """
+        if self.max_tokens is None:
+            batches = [bucket[i:i + self.batch_size].tolist() for i in range(0, len(bucket), self.batch_size)]
+            if self.drop_last and len(batches) > 0 and len(batches[-1]) < self.batch_size:
+                batches.pop()
+            return batches
+
+        batches = []
+        batch = []
+        max_length = 0
+        for index, length in zip(bucket.tolist(), self.lengths[bucket].tolist()):
+            # close the batch if adding the sample exceeds the token budget.
+            if batch and (len(batch) + 1) * max(max_length, length) > self.max_tokens:
+                batches.append(batch)
+                batch = []
+                max_length = 0
+            batch.append(index)
+            max_length = max(max_length, length)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def __iter__(self):
+        """
+        :return: Iterator over the batches (lists of indices) of an epoch.
+
+        """
+        batches = []
+        for bucket in self.buckets:
+            if self.shuffle:
+                bucket = bucket[np.random.permutation(len(bucket))]
+            batches.extend(self.split_bucket(bucket))
+
+        if self.shuffle:
+            batches = [batches[i] for i in np.random.permutation(len(batches))]
+
+        return iter(batches)
+
+    def __len__(self):
+        """
+        :return: Number of batches in an epoch.
+
+        """
+        return self.num_batches
+
+
+if __name__ == '__main__':
+    lengths = np.random.randint(3, 40, size=1000)
+
+    sampler = LengthBucketBatchSampler(lengths, batch_size=64, boundaries=[10, 20, 30])
+    padding = [1 - lengths[batch].mean() / lengths[batch].max() for batch in sampler]
+    print('{} batches, average padding: {:.1%}'.format(len(sampler), np.mean(padding)))
+
+    sampler = LengthBucketBatchSampler(lengths, batch_size=64, max_tokens=1024)
+    print('Token budget: {} batches, max tokens per batch: {}'.format(
+        len(sampler), max(len(batch) * lengths[batch].max() for batch in sampler)))
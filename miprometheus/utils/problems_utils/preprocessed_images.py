@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+preprocessed_images.py: contains functions used to keep the images of small ``torchvision`` datasets (e.g. \
+``MNIST``, ``CIFAR10``) in a single uint8 array, preprocessed once & cached on disk, and to transform whole \
+batches of them (instead of going through the ``PIL`` transforms sample by sample).
+
+"""
+__author__ = "Younes Bouhadjar & Vincent Marois"
+
+import os
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from miprometheus.utils.problems_utils.data_preparation import prepare_artefact
+
+
+def get_torchvision_data(dataset):
+    """
+    Returns the raw images & targets of a ``torchvision`` dataset (``MNIST`` or ``CIFAR10``), for the different \
+    versions of ``torchvision`` (``train_data`` / ``test_data`` or ``data`` attributes).
+
+    :param dataset: ``torchvision.datasets.MNIST`` or ``torchvision.datasets.CIFAR10``.
+
+    :return: ``np.array`` of uint8 images [N, C, H, W] & ``np.array`` of int64 targets [N].
+
+    """
+    if hasattr(dataset, 'data'):
+        data, targets = dataset.data, dataset.targets
+    elif dataset.train:
+        data, targets = dataset.train_data, dataset.train_labels
+    else:
+        data, targets = dataset.test_data, dataset.test_labels
+
+    data = data.numpy() if torch.is_tensor(data) else np.asarray(data)
+    targets = targets.numpy() if torch.is_tensor(targets) else np.asarray(targets)
+
+    # [N, H, W] (grayscale) or [N, H, W, C].
+    images = data[:, np.newaxis] if data.ndim == 3 else data.transpose(0, 3, 1, 2)
+
+    return np.ascontiguousarray(images, dtype=np.uint8), targets.astype(np.int64)
+
+
+def transform_images(images, size=None, padding=None):
+    """
+    Transforms a batch of images: converts them to float (in [0, 1]), upscales them (bilinear interpolation) & \
+    pads them.
+
+    :param images: uint8 images [batch_size, C, H, W].
+    :type images: ``torch.Tensor``
+
+    :param size: Size [H, W] of the upscaled images (DEFAULT: None, i.e. no upscaling).
+    :type size: list
+
+    :param padding: Padding of the images (last dim by (x1, x2) and 2nd to last by (x3, x4)) (DEFAULT: None).
+    :type padding: list
+
+    :return: float32 ``torch.Tensor``.
+
+    """
+    images = images.float().div_(255)
+
+    if size is not None and list(images.shape[2:]) != list(size):
+        # F.interpolate replaces F.upsample from pytorch 0.4.1.
+        interpolate = F.interpolate if hasattr(F, 'interpolate') else F.upsample
+        images = interpolate(images, size=tuple(size), mode='bilinear', align_corners=False)
+
+    if padding is not None and any(padding):
+        images = F.pad(images, list(padding), 'constant', 0)
+
+    return images
+
+
+def load_preprocessed_images(folder, dataset, split, size=None, padding=None, logger=None, batch_size=1024):
+    """
+    Returns the images of a ``torchvision`` dataset upscaled & padded (see ``transform_images()``), stored as \
+    uint8 in a ``.npy`` file (created on first use in ``folder``) which is memory-mapped: the images are \
+    shared by all ``DataLoader`` workers through the page cache.
+
+    .. note::
+
+        The name of the file depends on the split, size & padding, e.g. ``train_224x224_pad_0_0_0_0.npy``.
+
+        The upscaled images are much bigger than the original ones (e.g. 3 GB for the ``MNIST`` training set \
+        upscaled to [224, 224]).
+
+    :param folder: Folder containing the preprocessed images.
+    :type folder: str
+
+    :param dataset: ``torchvision.datasets.MNIST`` or ``torchvision.datasets.CIFAR10``.
+
+    :param split: Name of the split, e.g. ``train``.
+    :type split: str
+
+    :param size: Size [H, W] of the upscaled images (DEFAULT: None, i.e. no upscaling).
+    :type size: list
+
+    :param padding: Padding of the images (DEFAULT: None).
+    :type padding: list
+
+    :param logger: Logger (DEFAULT: None).
+
+    :param batch_size: Number of images preprocessed at once (DEFAULT: 1024).
+    :type batch_size: int
+
+    :return: ``np.memmap`` of uint8 images [N, C, H', W'] & ``np.array`` of int64 targets [N].
+
+    """
+    images, targets = get_torchvision_data(dataset)
+
+    height, width = size if size is not None else images.shape[2:]
+    padding = list(padding) if padding is not None else [0, 0, 0, 0]
+    filename = os.path.join(folder, '{}_{}x{}_pad_{}.npy'.format(split, height, width,
+                                                                '_'.join(str(p) for p in padding)))
+
+    def build(path):
+        # shape of the preprocessed images.
+        shape = tuple(transform_images(torch.from_numpy(images[:1]), size, padding).shape[1:])
+        preprocessed = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(len(images),) + shape)
+
+        for start in range(0, len(images), batch_size):
+            batch = transform_images(torch.from_numpy(images[start:start + batch_size]), size, padding)
+            preprocessed[start:start + len(batch)] = batch.mul_(255).round_().byte().numpy()
+
+        preprocessed.flush()
+        del preprocessed
+
+    os.makedirs(folder, exist_ok=True)
+    prepare_artefact(filename, build, logger=logger)
+
+    return np.load(filename, mmap_mode='r'), targets
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+question_store.py: contains the ``QuestionStore`` class, a columnar, memory-mapped store of tokenized questions \
+(with their answers, image ids, types & original strings), e.g. for VQA problems.
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+import os
+import json
+import numpy as np
+
+
+class QuestionStore(object):
+    """
+    Store of N tokenized questions, kept in a directory containing one ``.npy`` file per column:
+
+        - ``tokens.npy``: int32 array containing the word indexes of all questions, concatenated,
+        - ``offsets.npy``: int64 array of size N + 1, the tokens of the i-th question being \
+        ``tokens[offsets[i]:offsets[i+1]]``,
+        - ``answers.npy``: int16 array of the answer indexes,
+        - ``image_ids.npy``: int32 array of the ids of the images the questions refer to,
+        - ``type_ids.npy``: int16 array of the question type indexes (-1 if unknown),
+        - ``<name>.bin`` & ``<name>_offsets.npy``: string tables (UTF-8 encoded strings, concatenated & their \
+        offsets), e.g. the original questions,
+        - ``meta.json``: names of the question types & of the string tables.
+
+    The columns are memory-mapped on first access (i.e. by each ``DataLoader`` worker using the store), so \
+    that they are shared by all processes through the page cache instead of being copied in each of them.
+
+    """
+
+    def __init__(self, path):
+        """
+        Opens an existing store.
+
+        :param path: Path to the directory of the store.
+        :type path: str
+
+        """
+        self.path = path
+
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        self.type_names = meta['type_names']
+        self.string_tables = meta['string_tables']
+
+        # Mapped on first access, in the process using the store.
+        self._columns = {}
+
+    @staticmethod
+    def create(path, tokens, answers, image_ids, types, strings=None):
+        """
+        Creates a new store.
+
+        :param path: Path to the directory of the store (created if needed).
+        :type path: str
+
+        :param tokens: Tokenized questions (list of lists of word indexes).
+        :type tokens: list
+
+        :param answers: Answer indexes.
+        :type answers: list
+
+        :param image_ids: Image ids.
+        :type image_ids: list
+
+        :param types: Question types (list of str or None if unknown).
+        :type types: list
+
+        :param strings: Dictionary of string tables (lists of str, e.g. ``{'questions': [...]}``) (DEFAULT: None).
+        :type strings: dict
+
+        :return: ``QuestionStore``.
+
+        """
+        os.makedirs(path, exist_ok=True)
+        strings = strings or {}
+
+        def save(name, array):
+            np.save(os.path.join(path, name + '.npy'), array)
+
+        lengths = np.fromiter((len(question) for question in tokens), dtype=np.int64, count=len(tokens))
+        save('offsets', np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64))
+        save('tokens', np.fromiter((token for question in tokens for token in question), dtype=np.int32,
+                                   count=int(lengths.sum())))
+
+        save('answers', np.asarray(answers, dtype=np.int16))
+        save('image_ids', np.asarray(image_ids, dtype=np.int32))
+
+        type_names = sorted(set(type_name for type_name in types if type_name is not None))
+        type_index = {type_name: i for i, type_name in enumerate(type_names)}
+        save('type_ids', np.asarray([type_index.get(type_name, -1) for type_name in types], dtype=np.int16))
+
+        for name, table in strings.items():
+            encoded = [string.encode('utf-8') for string in table]
+            with open(os.path.join(path, name + '.bin'), 'wb') as f:
+                f.write(b''.join(encoded))
+            save(name + '_offsets', np.concatenate([[0], np.cumsum([len(s) for s in encoded])]).astype(np.int64))
+
+        # written last: signals that the store is complete.
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'type_names': type_names, 'string_tables': sorted(strings.keys())}, f)
+
+        return QuestionStore(path)
+
+    @staticmethod
+    def exists(path):
+        """
+        :param path: Path to the directory of the store.
+        :type path: str
+
+        :return: True if a (complete) store exists at ``path``.
+
+        """
+        return os.path.isfile(os.path.join(path, 'meta.json'))
+
+    def column(self, name):
+        """
+        Returns a column of the store (mapped in read-only mode on first access).
+
+        :param name: Name of the column, e.g. ``answers``.
+        :type name: str
+
+        :return: ``np.memmap``.
+
+        """
+        if name not in self._columns:
+            filename = os.path.join(self.path, name + '.bin')
+            if name in self.string_tables:
+                self._columns[name] = np.memmap(filename, dtype=np.uint8, mode='r') \
+                    if os.path.getsize(filename) > 0 else np.zeros(0, dtype=np.uint8)
+            else:
+                self._columns[name] = np.load(os.path.join(self.path, name + '.npy'), mmap_mode='r')
+        return self._columns[name]
+
+    @property
+    def answers(self):
+        """
+        :return: Array of the answer indexes.
+
+        """
+        return self.column('answers')
+
+    @property
+    def image_ids(self):
+        """
+        :return: Array of the image ids.
+
+        """
+        return self.column('image_ids')
+
+    @property
+    def type_ids(self):
+        """
+        :return: Array of the question type indexes (-1 if unknown).
+
+        """
+        return self.column('type_ids')
+
+    @property
+    def lengths(self):
+        """
+        :return: Array of the lengths (number of tokens) of the questions.
+
+        """
+        return np.diff(self.column('offsets'))
+
+    def get_tokens(self, index):
+        """
+        Returns the tokens of a question.
+
+        :param index: Index of the question.
+        :type index: int
+
+        :return: ``np.array`` of int32 (view on the mapped file).
+
+        """
+        offsets = self.column('offsets')
+        return self.column('tokens')[offsets[index]:offsets[index + 1]]
+
+    def get_type(self, index):
+        """
+        Returns the type of a question.
+
+        :param index: Index of the question.
+        :type index: int
+
+        :return: Name of the question type, None if unknown.
+
+        """
+        type_id = self.type_ids[index]
+        return self.type_names[type_id] if type_id >= 0 else None
+
+    def get_string(self, name, index):
+        """
+        Returns a string of a string table.
+
+        :param name: Name of the string table, e.g. ``questions``.
+        :type name: str
+
+        :param index: Index of the question.
+        :type index: int
+
+        :return: str.
+
+        """
+        offsets = self.column(name + '_offsets')
+        return self.column(name)[offsets[index]:offsets[index + 1]].tobytes().decode('utf-8')
+
+    def __len__(self):
+        """
+        :return: Number of questions in the store.
+
+        """
+        return len(self.answers)
+
+    def __getstate__(self):
+        """
+        Drops the mappings when pickling the store (e.g. when sending it to ``DataLoader`` workers started with \
+        the "spawn" method), they will be recreated on first access.
+
+        """
+        state = self.__dict__.copy()
+        state['_columns'] = {}
+        return state
+
+
+if __name__ == '__main__':
+    from tempfile import mkdtemp
+
+    store = QuestionStore.create(os.path.join(mkdtemp(), 'questions'), tokens=[[1, 2, 3], [4, 2]], answers=[0, 1],
+                                 image_ids=[7, 7], types=['count', None],
+                                 strings={'questions': ['How many cubes ?', 'Any sphere ?']})
+
+    store = QuestionStore(store.path)
+    for i in range(len(store)):
+        print('"{}": tokens {}, answer {}, image {}, type {}'.format(store.get_string('questions', i),
+                                                                   store.get_tokens(i), store.answers[i],
+                                                                   store.image_ids[i], store.get_type(i)))
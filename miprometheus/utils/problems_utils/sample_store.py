@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+sample_store.py: contains the ``SampleStore`` & ``SampleStoreWriter`` classes, a store of samples (dicts of \
+tensors of varying shapes) kept in memory-mapped shards, indexed by the index of the sample.
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+import os
+import json
+import pickle
+import numpy as np
+import torch
+
+from miprometheus.utils.problems_utils.data_preparation import atomic_open
+
+
+class SampleStoreWriter(object):
+    """
+    Writes a shard of a ``SampleStore``: a directory containing, for every key of the samples:
+
+        - ``<key>.bin``: the (flattened) values of the samples, concatenated,
+        - ``<key>.offsets.npy``: the offsets [N+1] of the samples in ``<key>.bin`` (in number of elements),
+        - ``<key>.shapes.npy``: the shapes [N, NDIM] of the values,
+
+    the indices [N] of the samples (``indices.npy``) & a description of the keys (``meta.json``, written last: \
+    a shard without it is incomplete, and ignored).
+
+    .. note::
+
+        The values are read back with their type (tensor, ``np.array`` or scalar). The values which are not \
+        numerical (e.g. strings) are pickled in ``<key>.pkl`` instead.
+
+    """
+
+    def __init__(self, path):
+        """
+        Creates the directory of the shard.
+
+        :param path: Path to the directory of the shard.
+        :type path: str
+
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        self.indices = []
+        self.closed = False
+        # Per key: dict(dtype, kind, file, offsets, shapes) or dict(objects).
+        self.keys = {}
+
+    def append(self, index, sample):
+        """
+        Appends a sample to the shard.
+
+        .. warning::
+
+            All the samples must contain the same keys, whose values have the same type & number of dimensions.
+
+        :param index: Index of the sample.
+        :type index: int
+
+        :param sample: Sample, e.g. ``DataDict`` of tensors.
+        :type sample: Mapping
+
+        """
+        for key, value in sample.items():
+            if key not in self.keys:
+                self.keys[key] = self.add_key(key, value)
+            entry = self.keys[key]
+
+            if 'objects' in entry:
+                entry['objects'].append(value)
+                continue
+
+            array = value.cpu().numpy() if torch.is_tensor(value) else np.asarray(value)
+            entry['file'].write(np.ascontiguousarray(array, dtype=entry['dtype']).tobytes())
+            entry['offsets'].append(entry['offsets'][-1] + array.size)
+            entry['shapes'].append(array.shape)
+
+        self.indices.append(index)
+
+    def add_key(self, key, value):
+        """
+        Creates the entry of a new key, depending on the type of its (first) value.
+
+        :param key: Key.
+        :type key: str
+
+        :param value: First value of the key.
+
+        :return: Entry (dict).
+
+        """
+        array = value.cpu().numpy() if torch.is_tensor(value) else np.asarray(value)
+
+        if array.dtype.kind not in 'biuf':
+            # Not a numerical array: pickle the values.
+            return {'objects': []}
+
+        if torch.is_tensor(value):
+            kind = 'tensor'
+        elif isinstance(value, np.ndarray):
+            kind = 'array'
+        else:
+            kind = 'scalar'
+
+        return {'dtype': array.dtype,
+                'kind': kind,
+                'file': open(os.path.join(self.path, key + '.bin'), 'wb'),
+                'offsets': [0],
+                'shapes': []}
+
+    def close(self):
+        """
+        Writes the offsets, shapes, indices & description of the keys, completing the shard (only once).
+
+        """
+        if self.closed:
+            return
+        self.closed = True
+
+        meta = {}
+        for key, entry in self.keys.items():
+            if 'objects' in entry:
+                with open(os.path.join(self.path, key + '.pkl'), 'wb') as f:
+                    pickle.dump(entry['objects'], f)
+                meta[key] = {'objects': True}
+                continue
+
+            entry['file'].close()
+            np.save(os.path.join(self.path, key + '.offsets.npy'), np.asarray(entry['offsets'], dtype=np.int64))
+            np.save(os.path.join(self.path, key + '.shapes.npy'),
+                    np.asarray(entry['shapes'], dtype=np.int64).reshape(len(entry['shapes']), -1))
+            meta[key] = {'dtype': entry['dtype'].str, 'kind': entry['kind']}
+
+        np.save(os.path.join(self.path, 'indices.npy'), np.asarray(self.indices, dtype=np.int64))
+
+        # Written last, atomically: marks the shard as complete.
+        with atomic_open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+
+class SampleStore(object):
+    """
+    Store of samples, kept in a directory of shards (subdirectories written by ``SampleStoreWriter``).
+
+    The values are memory-mapped (lazily, i.e. by each ``DataLoader`` worker using the store): reading a sample \
+    returns views on the mapped files, which are shared by all processes through the page cache.
+
+    .. note::
+
+        The files are mapped in copy-on-write mode, so the returned views are writable (e.g. \
+        ``torch.from_numpy`` accepts them) while the files are never modified.
+
+    """
+
+    def __init__(self, path):
+        """
+        Opens an existing store (i.e. its complete shards).
+
+        :param path: Path to the directory of the store.
+        :type path: str
+
+        """
+        self.path = path
+
+        self.shards = []
+        self.metas = []
+        indices, shard_ids, rows = [], [], []
+
+        for name in sorted(os.listdir(path)) if os.path.isdir(path) else []:
+            shard_path = os.path.join(path, name)
+            if not os.path.isfile(os.path.join(shard_path, 'meta.json')):
+                continue
+
+            with open(os.path.join(shard_path, 'meta.json'), 'r') as f:
+                self.metas.append(json.load(f))
+            shard_indices = np.load(os.path.join(shard_path, 'indices.npy'))
+
+            indices.append(shard_indices)
+            shard_ids.append(np.full(len(shard_indices), len(self.shards), dtype=np.int64))
+            rows.append(np.arange(len(shard_indices), dtype=np.int64))
+            self.shards.append(shard_path)
+
+        # Locations of the samples, sorted by index.
+        indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64)
+        order = np.argsort(indices, kind='stable')
+        self.indices = indices[order]
+        self.shard_ids = np.concatenate(shard_ids)[order] if shard_ids else indices
+        self.rows = np.concatenate(rows)[order] if rows else indices
+
+        # Mapped on first access, in the process using the store.
+        self._arrays = None
+
+    @staticmethod
+    def exists(path):
+        """
+        :param path: Path to the directory of the store.
+        :type path: str
+
+        :return: True if a store with at least one complete shard exists at ``path``.
+
+        """
+        return os.path.isdir(path) and any(os.path.isfile(os.path.join(path, name, 'meta.json'))
+                                           for name in os.listdir(path))
+
+    def load_shard(self, shard_id):
+        """
+        Maps the values of a shard.
+
+        :param shard_id: Number of the shard.
+        :type shard_id: int
+
+        :return: dict: key -> (values, offsets, shapes, kind) or key -> list of objects.
+
+        """
+        shard_path = self.shards[shard_id]
+        arrays = {}
+        for key, meta in self.metas[shard_id].items():
+            if meta.get('objects', False):
+                with open(os.path.join(shard_path, key + '.pkl'), 'rb') as f:
+                    arrays[key] = pickle.load(f)
+                continue
+
+            filename = os.path.join(shard_path, key + '.bin')
+            dtype = np.dtype(meta['dtype'])
+            # np.memmap cannot map empty files.
+            values = np.memmap(filename, dtype=dtype, mode='c') if os.path.getsize(filename) > 0 \
+                else np.zeros(0, dtype=dtype)
+
+            arrays[key] = (values, np.load(os.path.join(shard_path, key + '.offsets.npy')),
+                           np.load(os.path.join(shard_path, key + '.shapes.npy')), meta['kind'])
+        return arrays
+
+    def get_location(self, index):
+        """
+        :param index: Index of the sample.
+        :type index: int
+
+        :return: Number of the shard & row of the sample in the shard.
+
+        """
+        position = np.searchsorted(self.indices, index)
+        if position >= len(self.indices) or self.indices[position] != index:
+            raise KeyError('Sample {} not found in the sample store {}'.format(index, self.path))
+
+        return self.shard_ids[position], self.rows[position]
+
+    def __contains__(self, index):
+        """
+        :param index: Index of the sample.
+        :type index: int
+
+        :return: True if the sample is in the store.
+
+        """
+        position = np.searchsorted(self.indices, index)
+        return position < len(self.indices) and self.indices[position] == index
+
+    def __getitem__(self, index):
+        """
+        Returns a sample.
+
+        :param index: Index of the sample.
+        :type index: int
+
+        :return: dict of the values of the sample (tensors & ``np.array`` being views on the mapped files), \
+        in the order in which they were written.
+
+        """
+        shard_id, row = self.get_location(index)
+
+        if self._arrays is None:
+            self._arrays = {}
+        if shard_id not in self._arrays:
+            self._arrays[shard_id] = self.load_shard(shard_id)
+
+        sample = {}
+        for key, entry in self._arrays[shard_id].items():
+            if isinstance(entry, list):
+                sample[key] = entry[row]
+                continue
+
+            values, offsets, shapes, kind = entry
+            value = np.asarray(values[offsets[row]:offsets[row + 1]]).reshape(tuple(shapes[row]))
+            if kind == 'tensor':
+                sample[key] = torch.from_numpy(value)
+            elif kind == 'array':
+                sample[key] = value
+            else:
+                sample[key] = value.item()
+
+        return sample
+
+    def __len__(self):
+        """
+        :return: Number of samples in the store.
+
+        """
+        return len(self.indices)
+
+    def __getstate__(self):
+        """
+        Drops the mappings when pickling the store (e.g. when sending it to ``DataLoader`` workers started with \
+        the "spawn" method), they will be recreated on first access.
+
+        """
+        state = self.__dict__.copy()
+        state['_arrays'] = None
+        return state
+
+
+if __name__ == '__main__':
+    from tempfile import mkdtemp
+
+    store_path = mkdtemp()
+
+    # Two shards, written e.g. by two processes.
+    for shard, shard_indices in enumerate([[2, 0], [1]]):
+        writer = SampleStoreWriter(os.path.join(store_path, 'shard_{}'.format(shard)))
+        for i in shard_indices:
+            writer.append(i, {'sequence': torch.ones(i + 1, 3) * i, 'length': i + 1, 'name': 'sample {}'.format(i)})
+        writer.close()
+
+    store = SampleStore(store_path)
+    for i in range(len(store)):
+        print(i, store[i])
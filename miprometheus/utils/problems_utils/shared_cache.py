@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+shared_cache.py: contains the ``SharedTensorCache`` class, a size-bounded LRU cache of fixed-size tensors (e.g. \
+decoded images), living in shared memory so that all ``DataLoader`` workers of a problem use the same cache.
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+import torch
+import multiprocessing
+
+
+class SharedTensorCache(object):
+    """
+    LRU cache of tensors of a given shape & type, indexed by (non-negative) integer keys (e.g. image ids).
+
+    The cached tensors are stored in slots of a single tensor allocated in shared memory (along with the keys, \
+    the last access times of the slots & the hit/miss counters), accessed under a ``multiprocessing.Lock``.
+
+    .. warning::
+
+        The cache must be created before the ``DataLoader`` workers are started (i.e. in the constructor of the \
+        problem), so that they inherit the shared memory.
+
+    """
+
+    def __init__(self, max_size, shape, dtype=torch.float32):
+        """
+        Allocates the cache.
+
+        :param max_size: Maximum size of the cached tensors (in MB).
+        :type max_size: int
+
+        :param shape: Shape of a cached tensor, e.g. [3, 480, 320].
+        :type shape: list
+
+        :param dtype: Type of the cached tensors (DEFAULT: torch.float32).
+
+        """
+        self.shape = tuple(shape)
+        item_size = torch.tensor([], dtype=dtype).element_size() * int(torch.Size(self.shape).numel())
+        self.capacity = max(1, int(max_size * 2**20) // item_size)
+
+        self.slots = torch.zeros((self.capacity,) + self.shape, dtype=dtype).share_memory_()
+        # -1: free slot.
+        self.keys = torch.full((self.capacity,), -1, dtype=torch.int64).share_memory_()
+        self.last_used = torch.zeros(self.capacity, dtype=torch.int64).share_memory_()
+        # [clock, hits, misses]
+        self.counters = torch.zeros(3, dtype=torch.int64).share_memory_()
+
+        self.lock = multiprocessing.Lock()
+
+    def _tick(self, slot):
+        """
+        Marks a slot as the most recently used one (must be called while holding the lock).
+
+        """
+        self.counters[0] += 1
+        self.last_used[slot] = self.counters[0]
+
+    def get(self, key):
+        """
+        Returns the tensor cached under a key.
+
+        :param key: Key, e.g. image id.
+        :type key: int
+
+        :return: A copy of the cached tensor, or None if the key is not cached.
+
+        """
+        with self.lock:
+            slot = (self.keys == key).nonzero()
+            if len(slot) == 0:
+                self.counters[2] += 1
+                return None
+
+            slot = slot[0, 0]
+            self._tick(slot)
+            self.counters[1] += 1
+            return self.slots[slot].clone()
+
+    def put(self, key, value):
+        """
+        Caches a tensor, evicting the least recently used one if the cache is full.
+
+        :param key: Key, e.g. image id.
+        :type key: int
+
+        :param value: Tensor to cache (of shape ``self.shape``).
+        :type value: torch.Tensor
+
+        """
+        with self.lock:
+            if (self.keys == key).any():
+                return
+
+            # the free slots have never been used.
+            slot = torch.argmin(self.last_used)
+            self.keys[slot] = key
+            self.slots[slot].copy_(value)
+            self._tick(slot)
+
+    @property
+    def hits(self):
+        """
+        :return: Number of cache hits (all processes).
+
+        """
+        return int(self.counters[1])
+
+    @property
+    def misses(self):
+        """
+        :return: Number of cache misses (all processes).
+
+        """
+        return int(self.counters[2])
+
+    def __len__(self):
+        """
+        :return: Number of cached tensors.
+
+        """
+        return int((self.keys >= 0).sum())
+
+
+if __name__ == '__main__':
+    cache = SharedTensorCache(max_size=1, shape=[3, 128, 128])
+    print('Capacity: {} tensors'.format(cache.capacity))
+
+    # cache 6 "images", then access the first ones again: the least recently used ones were evicted.
+    for key in range(6):
+        if cache.get(key) is None:
+            cache.put(key, torch.full((3, 128, 128), key))
+    for key in range(3):
+        cache.get(key)
+
+    print('Cached: {}, hits: {}, misses: {}'.format(len(cache), cache.hits, cache.misses))
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+progress_stream.py: contains classes used to stream the progress of (concurrent) experiments through a \
+shared, append-only file:
+
+    - ``ProgressReporter`` writes compact progress records (one json object per line),
+    - ``ProgressMonitor`` reads them and summarizes the state of all experiments in a status table, with an ETA.
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+import os
+import json
+import math
+import time
+from datetime import timedelta
+from collections import OrderedDict
+
+
+class ProgressReporter(object):
+    """
+    Writes the progress records of a single experiment to an append-only file.
+
+    .. note::
+
+        Every record is written with a single ``write()`` on a file opened in append mode, so the (short) records \
+        of several experiments sharing the same file are not interleaved.
+
+    """
+
+    def __init__(self, filename, experiment, total_episodes=None, interval=5.0):
+        """
+        Constructor of the ``ProgressReporter``. Opens the file and writes the initial record.
+
+        :param filename: Path to the progress file.
+        :type filename: str
+
+        :param experiment: Identifier of the experiment (e.g. its log directory).
+        :type experiment: str
+
+        :param total_episodes: Expected number of training episodes, if known (DEFAULT: None).
+        :type total_episodes: int
+
+        :param interval: Minimal interval (in seconds) between two records (DEFAULT: 5.0).
+        :type interval: float
+
+        """
+        self.experiment = experiment
+        self.total_episodes = total_episodes
+        self.interval = interval
+
+        self.progress_file = open(filename, 'a', 1)
+
+        self.start_time = time.time()
+        self.last_time = self.start_time
+        self.samples = 0
+
+        self.write_record({'status': 'started'})
+
+    def write_record(self, record):
+        """
+        Writes a record, extended with the experiment identifier, pid, total number of episodes and time.
+
+        :param record: Record to write.
+        :type record: dict
+
+        """
+        if self.progress_file is None:
+            return
+
+        record.update({'id': self.experiment,
+                       'pid': os.getpid(),
+                       'total': self.total_episodes,
+                       'time': time.time(),
+                       'elapsed': time.time() - self.start_time})
+        self.progress_file.write(json.dumps(record) + '\n')
+
+    def report(self, stat_col, batch_size):
+        """
+        Accumulates the number of processed samples and writes a progress record (at most every ``interval`` \
+        seconds) with the last collected values of episode, epoch, loss & acc (if present) and the throughput.
+
+        .. note::
+
+            Should be called at every episode.
+
+        :param stat_col: ``StatisticsCollector`` containing the statistics of the last episode.
+
+        :param batch_size: Number of samples in the last episode.
+        :type batch_size: int
+
+        """
+        self.samples += batch_size
+
+        now = time.time()
+        # Always report the first episode.
+        if (now - self.last_time < self.interval) and (self.last_time != self.start_time):
+            return
+
+        record = {'status': 'running',
+                  'samples_per_sec': self.samples / max(now - self.last_time, 1e-6)}
+        for key in ['episode', 'epoch', 'loss', 'acc']:
+            if key in stat_col and len(stat_col[key]) > 0:
+                record[key] = float(stat_col[key][-1])
+
+        self.write_record(record)
+
+        self.last_time = now
+        self.samples = 0
+
+    def close(self, status='finished'):
+        """
+        Writes the final record and closes the file.
+
+        :param status: Final status of the experiment (e.g. 'finished', 'interrupted').
+        :type status: str
+
+        """
+        if self.progress_file is None:
+            return
+
+        self.write_record({'status': status})
+        self.progress_file.close()
+        self.progress_file = None
+
+
+class ProgressMonitor(object):
+    """
+    Reads the progress records written by several ``ProgressReporter`` into a single file and keeps the last \
+    state of every experiment.
+    """
+
+    def __init__(self, filename, stall_timeout=600.0):
+        """
+        Constructor of the ``ProgressMonitor``.
+
+        :param filename: Path to the progress file.
+        :type filename: str
+
+        :param stall_timeout: Time (in seconds) without record after which a running experiment \
+        is considered stalled (DEFAULT: 600.0).
+        :type stall_timeout: float
+
+        """
+        self.filename = filename
+        self.stall_timeout = stall_timeout
+
+        # Position in the file, so that every update only reads the new records.
+        self.offset = 0
+        self.experiments = OrderedDict()
+
+    def update(self):
+        """
+        Reads the (complete) records appended to the file since the last update.
+
+        """
+        if not os.path.isfile(self.filename):
+            return
+
+        with open(self.filename, 'rb') as f:
+            f.seek(self.offset)
+            for line in f:
+                # Incomplete record - will be read during the next update.
+                if not line.endswith(b'\n'):
+                    break
+                self.offset += len(line)
+
+                try:
+                    record = json.loads(line.decode())
+                except ValueError:
+                    continue
+
+                state = self.experiments.setdefault(record['id'], {})
+                state.update(record)
+
+    def get_status(self, state, now):
+        """
+        Returns the status of an experiment, detecting the stalled and diverged ones.
+
+        :param state: Last state of the experiment.
+        :type state: dict
+
+        :param now: Current time.
+        :type now: float
+
+        :return: Status (str).
+
+        """
+        status = state['status']
+        if status in ['started', 'running']:
+            if 'loss' in state and not math.isfinite(state['loss']):
+                status = 'diverged'
+            elif now - state['time'] > self.stall_timeout:
+                status = 'stalled'
+        return status
+
+    def estimate_duration(self, state):
+        """
+        Estimates the total duration of an experiment, using its progress.
+
+        :param state: Last state of the experiment.
+        :type state: dict
+
+        :return: Estimated duration (in seconds), ``None`` if unknown.
+
+        """
+        if state['status'] not in ['started', 'running']:
+            return state['elapsed']
+        if state.get('total') is None or state.get('episode', 0) <= 0:
+            return None
+        return state['elapsed'] * state['total'] / state['episode']
+
+    def summarize(self, num_experiments=None, num_slots=1):
+        """
+        Creates the status table of all experiments, with an ETA of the whole grid.
+
+        :param num_experiments: Total number of experiments in the grid (used to count the pending ones).
+        :type num_experiments: int
+
+        :param num_slots: Number of experiments running concurrently (DEFAULT: 1).
+        :type num_slots: int
+
+        :return: Status table (str).
+
+        """
+        now = time.time()
+
+        rows = []
+        counts = {}
+        durations = []
+        remaining = 0.0
+        for experiment, state in self.experiments.items():
+            status = self.get_status(state, now)
+            counts[status] = counts.get(status, 0) + 1
+
+            duration = self.estimate_duration(state)
+            if duration is not None:
+                durations.append(duration)
+                if status in ['started', 'running']:
+                    remaining += max(duration - state['elapsed'], 0.0)
+
+            episode = '{:d}'.format(int(state['episode'])) if 'episode' in state else '-'
+            if state.get('total') is not None:
+                episode += '/{:d}'.format(int(state['total']))
+
+            rows.append([os.path.normpath(experiment).split(os.sep)[-3:], str(state['pid']), episode,
+                         '{:d}'.format(int(state['epoch'])) if 'epoch' in state else '-',
+                         '{:.6f}'.format(state['loss']) if 'loss' in state else '-',
+                         '{:.4f}'.format(state['acc']) if 'acc' in state else '-',
+                         '{:.1f}'.format(state['samples_per_sec']) if 'samples_per_sec' in state else '-',
+                         '{:.0f}s'.format(now - state['time']), status])
+
+        # Add the pending experiments, assuming they will last as long as the average one.
+        pending = 0
+        if num_experiments is not None:
+            pending = max(num_experiments - len(self.experiments), 0)
+            counts['pending'] = pending
+
+        if len(durations) > 0:
+            eta = (remaining + pending * sum(durations) / len(durations)) / max(num_slots, 1)
+            eta_str = str(timedelta(seconds=int(eta)))
+        else:
+            eta_str = 'unknown'
+
+        header = ['experiment', 'pid', 'episode', 'epoch', 'loss', 'acc', 'samples/s', 'updated', 'status']
+        rows = [header] + [['/'.join(row[0])] + row[1:] for row in rows]
+        widths = [max([len(row[i]) for row in rows]) for i in range(len(header))]
+
+        table_str = 'Grid progress: {} - ETA: {}\n'.format(
+            ', '.join(['{} {}'.format(count, status) for status, count in sorted(counts.items())]), eta_str)
+        table_str += '=' * (sum(widths) + 3 * (len(widths) - 1)) + '\n'
+        for row in rows:
+            table_str += ' | '.join([value.ljust(width) for value, width in zip(row, widths)]) + '\n'
+
+        return table_str
+
+
+if __name__ == '__main__':
+    from tempfile import NamedTemporaryFile
+    from miprometheus.utils.statistics_collector import StatisticsCollector
+
+    progress_file = NamedTemporaryFile(suffix='.jsonl', delete=False)
+
+    stat_col = StatisticsCollector()
+    stat_col.add_statistic('loss', '{:12.10f}')
+    stat_col.add_statistic('episode', '{:06d}')
+
+    reporter = ProgressReporter(progress_file.name, './experiments/SerialRecall/NTM/20181018_120000/',
+                                total_episodes=100, interval=0)
+    for episode in range(10):
+        stat_col['episode'] = episode
+        stat_col['loss'] = 1.0 / (episode + 1)
+        reporter.report(stat_col, batch_size=64)
+
+    monitor = ProgressMonitor(progress_file.name)
+    monitor.update()
+    print(monitor.summarize(num_experiments=4, num_slots=2))
+
+    reporter.close()
+    monitor.update()
+    print(monitor.summarize(num_experiments=4, num_slots=2))
+    os.remove(progress_file.name)
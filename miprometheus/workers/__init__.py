@@ -1,14 +1,23 @@
-# Base workers.
-from .worker import Worker
-from .trainer import Trainer
-from .offline_trainer import OffLineTrainer
-from .online_trainer import OnLineTrainer
-from .tester import Tester
+from miprometheus.utils.lazy_module import lazy_module
 
-# Grid workers.
-from .grid_worker import GridWorker
-from .grid_trainer_cpu import GridTrainerCPU
-from .grid_trainer_gpu import GridTrainerGPU
-from .grid_tester_cpu import GridTesterCPU
-from .grid_tester_gpu import GridTesterGPU
-from .grid_analyzer import GridAnalyzer
+# The workers are imported on first use.
+lazy_module(__name__, {
+    # Base workers.
+    'Worker': '.worker',
+    'Trainer': '.trainer',
+    'OffLineTrainer': '.offline_trainer',
+    'OnLineTrainer': '.online_trainer',
+    'Tester': '.tester',
+    'DataPreparer': '.data_preparer',
+
+    # Grid workers.
+    'GridWorker': '.grid_worker',
+    'GridTrainerCPU': '.grid_trainer_cpu',
+    'GridTrainerGPU': '.grid_trainer_gpu',
+    'GridTesterCPU': '.grid_tester_cpu',
+    'GridTesterGPU': '.grid_tester_gpu',
+    'GridAnalyzer': '.grid_analyzer',
+    'GridSlotScheduler': '.grid_slot_scheduler',
+    'GridTaskQueue': '.grid_task_queue',
+    'GridQueueWorker': '.grid_queue_worker'
+})
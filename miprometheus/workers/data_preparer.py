@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+data_preparer.py:
+
+    - This file contains the implementation of the ``DataPreparer``, a worker pre-building the dataset artefacts \
+    (extracted features, processed questions, generated datasets, downloaded corpora etc.) of the problems used \
+    by a set of experiments, e.g. before starting a grid.
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+import os
+import sys
+import yaml
+import subprocess
+from tempfile import NamedTemporaryFile
+
+from miprometheus.workers.worker import Worker
+from miprometheus.problems.problem_factory import ProblemFactory
+
+
+class DataPreparer(Worker):
+    """
+    Worker instantiating the problems of the ``training``, ``validation`` and ``testing`` sections of an \
+    experiment configuration, which builds their missing dataset artefacts.
+
+    The problems coordinate the preparation of their artefacts through file locks: the ``DataPreparer`` \
+    can thus safely run while experiments using the same ``data_folder`` are started.
+
+    """
+
+    def __init__(self, name="DataPreparer"):
+        """
+        Calls the ``Worker`` constructor, adds some additional params to parser.
+
+        :param name: Name of the worker (DEFAULT: "DataPreparer").
+        :type name: str
+
+        """
+        # Call base constructor to set up app state, registry and add default params.
+        super(DataPreparer, self).__init__(name)
+
+        self.parser.add_argument('--grid',
+                                 dest='grid_configs',
+                                 type=str,
+                                 default='',
+                                 help='Name of the grid configuration file(s), separated with coma ",". The artefacts '
+                                      'of all grid tasks will be prepared (each one in a separate process).')
+
+    def setup_experiment(self):
+        """
+        Setups the worker:
+
+            - Calls the ``super(self).setup_experiment()`` to parse arguments,
+            - Loads the configuration file(s) passed with ``--c`` (if any).
+
+        """
+        super(DataPreparer, self).setup_experiment()
+
+        if self.flags.config == '' and self.flags.grid_configs == '':
+            print('Please pass configuration file(s) as --c parameter or grid configuration file(s) as --grid parameter')
+            exit(-1)
+
+        if self.flags.config != '':
+            # Get the list of configurations which need to be loaded.
+            configs_to_load = self.recurrent_config_parse(self.flags.config, [])
+
+            # Read the YAML files one by one - but in reverse order -> overwrite the first indicated config(s)
+            for config in reversed(configs_to_load):
+                self.params.add_config_params_from_yaml(config)
+                print('Loaded configuration from file {}'.format(config))
+
+    def get_grid_tasks_configs(self, grid_config, tmp_files):
+        """
+        Returns the configuration file(s) of the tasks of a grid, in the format used by the ``--c`` argument.
+
+        The ``grid_overwrite`` and task-specific ``overwrite`` sections are stored into temporary files.
+
+        :param grid_config: Path to the grid configuration file.
+        :type grid_config: str
+
+        :param tmp_files: List to which the names of the temporary files are appended.
+        :type tmp_files: list
+
+        :return: List of str.
+
+        """
+        with open(grid_config, 'r') as stream:
+            grid_dict = yaml.safe_load(stream)
+
+        def dump(section):
+            tmp_file = NamedTemporaryFile(mode='w', suffix='.yaml', delete=False)
+            yaml.dump(section, tmp_file, default_flow_style=False)
+            tmp_file.close()
+            tmp_files.append(tmp_file.name)
+            return tmp_file.name
+
+        grid_overwrite = dump(grid_dict['grid_overwrite']) if 'grid_overwrite' in grid_dict else None
+
+        configs = []
+        for task in grid_dict.get('grid_tasks', []):
+            if 'default_configs' not in task:
+                continue
+            current_configs = task['default_configs']
+            if grid_overwrite is not None:
+                current_configs = grid_overwrite + ',' + current_configs
+            if 'overwrite' in task:
+                current_configs = dump(task['overwrite']) + ',' + current_configs
+            configs.append(current_configs)
+
+        return configs
+
+    def run_experiment(self):
+        """
+        Prepares the artefacts:
+
+            - Of the problems of the experiment loaded with ``--c``,
+            - Of all tasks of the grids passed with ``--grid``: as the configuration registry is shared by \
+            the whole process, each task is prepared by a separate ``DataPreparer`` process.
+
+        """
+        if self.flags.config != '':
+            for section in ['training', 'validation', 'testing']:
+                # Skip the sections missing in the configuration (e.g. no testing section).
+                if section not in self.params or 'problem' not in self.params[section]:
+                    continue
+                self.logger.info('Preparing the data of the {} problem'.format(section))
+                ProblemFactory.build_problem(self.params[section]['problem'])
+
+        tmp_files = []
+        try:
+            for grid_config in self.flags.grid_configs.replace(" ", "").split(','):
+                if grid_config == '':
+                    continue
+                if not os.path.isfile(grid_config):
+                    self.logger.error('Grid configuration file {} does not exist'.format(grid_config))
+                    exit(-2)
+
+                for configs in self.get_grid_tasks_configs(grid_config, tmp_files):
+                    self.logger.info('Preparing the data of the grid task {}'.format(configs))
+                    returncode = subprocess.call([sys.executable, '-m', 'miprometheus.workers.data_preparer',
+                                                  '--c', configs, '--ll', self.flags.log_level])
+                    if returncode != 0:
+                        self.logger.error('Preparation of the grid task {} failed with code {}'.format(configs,
+                                                                                                       returncode))
+                        exit(returncode)
+        finally:
+            for tmp_file in tmp_files:
+                os.remove(tmp_file)
+
+        self.logger.info('Data prepared.')
+
+
+def main():
+    """
+    Entry point function for the ``DataPreparer``.
+
+    """
+    data_preparer = DataPreparer()
+    # parse args, load configuration.
+    data_preparer.setup_experiment()
+    # GO!
+    data_preparer.run_experiment()
+
+
+if __name__ == '__main__':
+
+    main()
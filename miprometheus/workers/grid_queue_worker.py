@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+grid_queue_worker.py:
+
+    - This file contains the implementation of a worker executing the experiments stored in a shared \
+    ``GridTaskQueue``, filled by a grid trainer or tester started with the ``--queue`` argument. \
+    Any number of such workers, running on different hosts sharing a filesystem, can execute the grid together.
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+import os
+import socket
+import subprocess
+from time import sleep
+from functools import partial
+from multiprocessing.pool import ThreadPool
+
+from miprometheus.workers.grid_worker import GridWorker
+from miprometheus.workers.grid_task_queue import GridTaskQueue
+from miprometheus.workers.grid_slot_scheduler import get_cuda_devices
+
+
+class GridQueueWorker(GridWorker):
+    """
+    Grid Worker claiming the experiments from a shared task queue and executing them on the local CPUs.
+
+    While an experiment is running, the worker regularly sends a heartbeat to the queue. The experiments \
+    of the workers which stopped sending heartbeats (e.g. because their host died) are put back in the queue.
+
+    """
+
+    def __init__(self, name="GridQueueWorker", use_gpu=False):
+        """
+        Constructor for the ``GridQueueWorker``:
+
+            - Calls the base constructor to set the worker's name and add default command lines arguments,
+            - Adds some ``GridQueueWorker`` specific command line arguments.
+
+        :param name: Name of the worker (DEFAULT: "GridQueueWorker").
+        :type name: str
+
+        :param use_gpu: Indicates whether the worker should use GPU or not.
+        :type use_gpu: bool
+
+        """
+        # call base constructor
+        super(GridQueueWorker, self).__init__(name=name, use_gpu=use_gpu)
+
+        self.parser.add_argument('--m',
+                                 dest='max_concurrent_runs',
+                                 type=int,
+                                 default=-1,
+                                 help='Value limiting the number of concurently running experiments on this host.'
+                                      'The set limit will be truncated by number of available CPUs.'
+                                      ' (DEFAULT=-1, meaning that it will be set to the number of CPUs)')
+
+        self.parser.add_argument('--heartbeat',
+                                 dest='heartbeat_interval',
+                                 type=float,
+                                 default=30,
+                                 help='Interval (in seconds) between two heartbeats sent to the queue by a running '
+                                      'experiment. (DEFAULT=30)')
+
+        self.parser.add_argument('--timeout',
+                                 dest='heartbeat_timeout',
+                                 type=float,
+                                 default=300,
+                                 help='Time (in seconds) without heartbeat after which a running experiment is '
+                                      'considered dead and put back in the queue. (DEFAULT=300)')
+
+        self.parser.add_argument('--max_attempts',
+                                 dest='max_attempts',
+                                 type=int,
+                                 default=3,
+                                 help='Maximum number of times an experiment can be claimed before being marked '
+                                      'as failed. (DEFAULT=3)')
+
+    def setup_grid_experiment(self):
+        """
+        Setups the worker:
+
+            - Calls the ``super(self).setup_experiment()`` to parse arguments,
+
+            - Opens the task queue indicated by ``--queue``.
+
+        """
+        super(GridQueueWorker, self).setup_grid_experiment()
+
+        # Check if queue file was selected.
+        if self.flags.queue == '':
+            print('Please pass the task queue file as --queue parameter.')
+            exit(-1)
+
+        # Check if file exists.
+        if not os.path.isfile(self.flags.queue):
+            print('Error: Task queue file {} does not exist.'.format(self.flags.queue))
+            exit(-2)
+
+        if self.flags.heartbeat_interval >= self.flags.heartbeat_timeout:
+            self.logger.warning('The heartbeat interval ({}s) should be (much) smaller than the heartbeat timeout ({}s)'
+                                .format(self.flags.heartbeat_interval, self.flags.heartbeat_timeout))
+
+        self.max_concurrent_runs = self.flags.max_concurrent_runs
+
+        self.queue = GridTaskQueue(self.flags.queue)
+        self.logger.info('Number of pending experiments in the queue: {}'.format(self.queue.count('pending')))
+
+        # The experiments enqueued by GPU grids are spread over the CUDA devices of the host.
+        self.cuda_devices = get_cuda_devices()
+        self.experiments_done = 0
+
+    def run_grid_experiment(self):
+        """
+        Main function of the ``GridQueueWorker``.
+
+        Runs as many "slots" as the maximum concurrent runs allowed or maximum available cores, each one \
+        claiming & executing experiments until the queue is exhausted.
+
+        """
+        # Ask for confirmation - optional.
+        if self.flags.confirm:
+            input('Press any key to continue')
+
+        # Check max number of child processes.
+        if self.max_concurrent_runs <= 0:  # We need at least one proces!
+            max_processes = len(os.sched_getaffinity(0))
+        else:
+            # Take into account the minimum value.
+            max_processes = min(len(os.sched_getaffinity(0)), self.max_concurrent_runs)
+        self.logger.info('Executing experiments from the queue using {} CPU(s) concurrently.'.format(max_processes))
+
+        # Run in as many threads as there are CPUs available to the script.
+        with ThreadPool(processes=max_processes) as pool:
+            func = partial(GridQueueWorker.run_experiment, self)
+            pool.map(func, range(max_processes))
+
+        self.logger.info('Task queue exhausted: {} done, {} failed.'.format(self.queue.count('done'),
+                                                                            self.queue.count('failed')))
+
+    def run_experiment(self, slot):
+        """
+        Claims & executes experiments from the queue, until there are no more pending or running experiments.
+
+        .. note::
+
+            The slot keeps waiting while other experiments are still running, as they can be put back \
+            in the queue if their worker dies.
+
+        .. note::
+
+            The experiments using the GPU (``--gpu``) are assigned to a CUDA device through \
+            ``CUDA_VISIBLE_DEVICES``, the slots being dealt round-robin over the devices of the host.
+
+        :param slot: Index of the slot (used to identify the worker in the queue).
+        :type slot: int
+
+        """
+        worker = '{}:{}:{}'.format(socket.gethostname(), os.getpid(), slot)
+
+        env = dict(os.environ)
+        gpu_env = dict(env)
+        if len(self.cuda_devices) > 0:
+            gpu_env.update(self.cuda_devices[slot % len(self.cuda_devices)].env)
+
+        while True:
+            # Put back the experiments of the dead workers.
+            requeued = self.queue.requeue_stale_tasks(self.flags.heartbeat_timeout, self.flags.max_attempts)
+            if requeued > 0:
+                self.logger.warning('Put back {} experiment(s) of dead worker(s) in the queue'.format(requeued))
+
+            task = self.queue.claim_task(worker)
+
+            if task is None:
+                # Nothing to do: stop or wait for the experiments of other workers.
+                if self.queue.count('pending') == 0 and self.queue.count('running') == 0:
+                    break
+                sleep(self.flags.heartbeat_interval)
+                continue
+
+            task_id, command_str, cwd = task
+            # Use the working directory of the grid that filled the queue, if it exists on this host.
+            if cwd is not None and not os.path.isdir(cwd):
+                cwd = None
+
+            self.logger.info("Starting: {}".format(command_str))
+            with open(os.devnull, 'w') as devnull:
+                process = subprocess.Popen(command_str.split(), stdout=devnull, cwd=cwd,
+                                           env=gpu_env if '--gpu' in command_str.split() else env)
+
+                lost = False
+                while True:
+                    try:
+                        returncode = process.wait(timeout=self.flags.heartbeat_interval)
+                        break
+                    except subprocess.TimeoutExpired:
+                        if not self.queue.heartbeat(task_id, worker):
+                            # The experiment was put back in the queue (and possibly claimed by another worker).
+                            self.logger.warning("Lost the ownership of the experiment, stopping: {}".format(command_str))
+                            process.kill()
+                            lost = True
+
+            if lost:
+                continue
+
+            self.queue.complete_task(task_id, worker, returncode)
+            self.experiments_done += 1
+            self.logger.info("Finished: {}".format(command_str))
+
+            self.logger.info('Number of experiments done by this worker: {}.'.format(self.experiments_done))
+
+            if returncode != 0:
+                self.logger.info("Experiment exited with code: {}".format(returncode))
+
+
+def main():
+    """
+    Entry point function for the ``GridQueueWorker``.
+
+    """
+    grid_queue_worker = GridQueueWorker()
+
+    # parse args and open the task queue.
+    grid_queue_worker.setup_grid_experiment()
+
+    # GO!
+    grid_queue_worker.run_grid_experiment()
+
+
+if __name__ == '__main__':
+
+    main()
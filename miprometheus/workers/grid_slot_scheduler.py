@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+grid_slot_scheduler.py:
+
+    - Contains the definition of the ``GridSlotScheduler`` class, which maps the experiments of a grid to \
+    "slots" of devices (CPU sockets or CUDA devices). A new experiment is started as soon as a running one \
+    finishes and frees its slot.
+
+    - Also contains helper functions listing the devices (``get_cpu_sockets``, ``get_cuda_devices``).
+
+"""
+__author__ = "Alexis Asseman, Tomasz Kornuta"
+
+import os
+import glob
+from queue import Queue
+from functools import partial
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+
+Device = namedtuple('Device', ['name', 'slots', 'env', 'cpus'])
+Device.__doc__ = """
+Device on which experiments are executed.
+
+    - name: Name of the device (used for logging),
+    - slots: Number of experiments that can run concurrently on the device,
+    - env: Environment variables set for the experiments running on the device,
+    - cpus: List of CPU cores the experiments are pinned to (``None`` for no pinning).
+"""
+
+
+def get_cpu_sockets(slots_per_device=-1):
+    """
+    Lists the CPU sockets (restricted to the cores available to the current process) as devices.
+
+    .. note::
+
+        The experiments sharing a socket evenly split its cores: ``OMP_NUM_THREADS`` is set by the \
+        ``GridSlotScheduler``, depending on the number of slots of the socket actually used.
+
+    :param slots_per_device: Number of slots of each socket (DEFAULT: -1, meaning one slot per core).
+    :type slots_per_device: int
+
+    :return: List of ``Device``.
+
+    """
+    available_cpus = os.sched_getaffinity(0)
+
+    # Group the cores by physical package.
+    sockets = {}
+    for path in glob.glob('/sys/devices/system/cpu/cpu[0-9]*/topology/physical_package_id'):
+        cpu = int(path.split('/')[-3][3:])
+        if cpu not in available_cpus:
+            continue
+        with open(path, 'r') as f:
+            sockets.setdefault(int(f.read()), []).append(cpu)
+
+    # No topology information available: consider a single socket.
+    if len(sockets) == 0:
+        sockets = {0: list(available_cpus)}
+
+    devices = []
+    for socket_id in sorted(sockets.keys()):
+        cpus = sorted(sockets[socket_id])
+        slots = len(cpus) if slots_per_device <= 0 else slots_per_device
+        devices.append(Device('socket:{}'.format(socket_id), slots, {}, cpus))
+
+    return devices
+
+
+def get_cuda_devices(slots_per_device=-1):
+    """
+    Lists the CUDA devices. The experiments are assigned to a device through ``CUDA_VISIBLE_DEVICES``.
+
+    .. note::
+
+        If the current process is itself restricted to some devices (through ``CUDA_VISIBLE_DEVICES``), \
+        the experiments are assigned to these devices only.
+
+    :param slots_per_device: Number of slots of each device (DEFAULT: -1, meaning one slot per device).
+    :type slots_per_device: int
+
+    :return: List of ``Device``.
+
+    """
+    import torch
+
+    # Identifiers of the devices visible to the current process, as indexed by torch.
+    visible_devices = [device_id.strip() for device_id in os.environ.get('CUDA_VISIBLE_DEVICES', '').split(',')
+                       if device_id.strip() != '']
+
+    slots = 1 if slots_per_device <= 0 else slots_per_device
+    devices = []
+    for index in range(torch.cuda.device_count()):
+        device_id = visible_devices[index] if index < len(visible_devices) else str(index)
+        devices.append(Device('cuda:{}'.format(device_id), slots, {'CUDA_VISIBLE_DEVICES': device_id}, None))
+
+    return devices
+
+
+class GridSlotScheduler(object):
+    """
+    Executes the experiments of a grid on the slots offered by a list of devices.
+
+    Each device advertises a number of slots, i.e. of experiments it can run concurrently. The free slots are kept \
+    in a queue: an experiment is started as soon as a slot is available, and the completion callback of the \
+    experiment puts its slot back in the queue.
+
+    """
+
+    def __init__(self, devices, max_concurrent_runs=-1):
+        """
+        Constructor of the ``GridSlotScheduler``.
+
+        The slots are interleaved between devices (i.e. the first slot of each device comes first), so that \
+        experiments are spread over all devices before being packed.
+
+        The experiments sharing the cores of a device evenly split them: ``OMP_NUM_THREADS`` is set from the \
+        number of slots of the device remaining after the truncation to ``max_concurrent_runs``.
+
+        :param devices: List of ``Device``.
+        :type devices: list
+
+        :param max_concurrent_runs: Maximum number of experiments running concurrently, the number of slots \
+        will be truncated to it (DEFAULT: -1, meaning no limit).
+        :type max_concurrent_runs: int
+
+        """
+        slots = []
+        for index in range(max([device.slots for device in devices], default=0)):
+            slots.extend([device for device in devices if index < device.slots])
+
+        if max_concurrent_runs > 0:
+            slots = slots[:max_concurrent_runs]
+
+        if len(slots) == 0:
+            raise ValueError('There must be at least one slot to execute the experiments')
+
+        # Split the cores of each device between the slots actually used.
+        used_devices = {}
+        for device in slots:
+            if device.name not in used_devices:
+                num_slots = len([slot for slot in slots if slot.name == device.name])
+                env = dict(device.env)
+                if device.cpus is not None:
+                    env['OMP_NUM_THREADS'] = str(max(1, len(device.cpus) // num_slots))
+                used_devices[device.name] = device._replace(slots=num_slots, env=env)
+        slots = [used_devices[device.name] for device in slots]
+
+        self.num_slots = len(slots)
+        self.free_slots = Queue()
+        for device in slots:
+            self.free_slots.put(device)
+
+    def release_slot(self, device, _):
+        """
+        Completion (and error) callback: puts the slot back in the queue of free slots.
+
+        :param device: ``Device`` the experiment was running on.
+
+        :param _: Result (or exception) of the experiment, ignored.
+
+        """
+        self.free_slots.put(device)
+
+    def run(self, func, experiments):
+        """
+        Executes all experiments, returns when all of them are finished.
+
+        :param func: Function executing one experiment, called as ``func(experiment, device=device)``.
+
+        :param experiments: List of experiments.
+        :type experiments: list
+
+        """
+        with ThreadPool(processes=self.num_slots) as pool:
+            for experiment in experiments:
+                # Wait (without polling) for a free slot.
+                device = self.free_slots.get()
+                pool.apply_async(partial(func, device=device), (experiment,),
+                                 callback=partial(self.release_slot, device),
+                                 error_callback=partial(self.release_slot, device))
+
+            # Equivalent of what would usually be called "join" for threads.
+            pool.close()
+            pool.join()
+
+
+if __name__ == '__main__':
+    from time import sleep, time
+
+    def experiment(duration, device=None):
+        sleep(duration)
+        print('Finished experiment lasting {}s on {}'.format(duration, device.name))
+
+    # Treat the CPU sockets as devices, packing 2 experiments per socket.
+    scheduler = GridSlotScheduler(get_cpu_sockets(slots_per_device=2))
+    start = time()
+    scheduler.run(experiment, [0.2, 0.1, 0.1, 0.3, 0.1, 0.2])
+    print('Executed on {} slots in {:.2f}s'.format(scheduler.num_slots, time() - start))
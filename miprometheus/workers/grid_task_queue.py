@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+grid_task_queue.py:
+
+    - Contains the definition of the ``GridTaskQueue`` class, a task queue stored in a single SQLite file. \
+    When the file is located on a shared filesystem, several ``GridQueueWorker`` processes (possibly running \
+    on different hosts) can claim & execute the tasks of a grid experiment.
+
+"""
+__author__ = "Tomasz Kornuta & Vincent Marois"
+
+import os
+import time
+import sqlite3
+from contextlib import contextmanager
+
+
+class GridTaskQueue(object):
+    """
+    Task queue shared by several grid workers, backed by a SQLite database file.
+
+    Each task is a command (string) that will be executed by one of the workers. A task goes through the \
+    following states:
+
+        - ``pending``: waiting to be claimed,
+        - ``running``: claimed by a worker, which must update its heartbeat regularly,
+        - ``done``: the command finished (whatever its return code),
+        - ``failed``: the task was requeued too many times (i.e. its workers died repeatedly).
+
+    .. note::
+
+        Every operation opens its own connection, so a single ``GridTaskQueue`` object can be used \
+        from several threads. Claims are made atomic by taking the database write lock \
+        (``BEGIN IMMEDIATE``) before selecting the task.
+
+    """
+
+    def __init__(self, filename, timeout=60.0):
+        """
+        Constructor of the ``GridTaskQueue``. Creates the database (and the tasks table) if needed.
+
+        :param filename: Path to the SQLite file storing the queue.
+        :type filename: str
+
+        :param timeout: How long (in seconds) an operation waits for the database lock held by \
+        another process (DEFAULT: 60.0).
+        :type timeout: float
+
+        """
+        self.filename = filename
+        self.timeout = timeout
+
+        with self.connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS tasks ("
+                         "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         "command TEXT NOT NULL, "
+                         "cwd TEXT, "
+                         "status TEXT NOT NULL DEFAULT 'pending', "
+                         "worker TEXT, "
+                         "attempts INTEGER NOT NULL DEFAULT 0, "
+                         "heartbeat REAL, "
+                         "returncode INTEGER)")
+
+    @contextmanager
+    def connect(self):
+        """
+        Opens a new connection to the database, in autocommit mode (transactions are explicit).
+
+        :return: ``sqlite3.Connection`` (closed when exiting the context).
+
+        """
+        conn = sqlite3.connect(self.filename, timeout=self.timeout, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def add_tasks(self, commands, cwd=None):
+        """
+        Adds tasks to the queue.
+
+        :param commands: List of commands to be executed (one per task).
+        :type commands: list
+
+        :param cwd: Directory from which the commands should be executed (DEFAULT: current working directory).
+        :type cwd: str
+
+        :return: Number of added tasks.
+
+        """
+        if cwd is None:
+            cwd = os.getcwd()
+
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT INTO tasks (command, cwd) VALUES (?, ?)",
+                             [(command, cwd) for command in commands])
+            conn.execute("COMMIT")
+
+        return len(commands)
+
+    def claim_task(self, worker):
+        """
+        Atomically claims the oldest pending task.
+
+        :param worker: Identifier of the worker claiming the task (e.g. "host:pid:thread").
+        :type worker: str
+
+        :return: Tuple (task_id, command, cwd) or ``None`` if there are no pending tasks.
+
+        """
+        with self.connect() as conn:
+            # Take the write lock before looking for a task, so no other worker can claim the same one.
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT id, command, cwd FROM tasks WHERE status = 'pending' "
+                               "ORDER BY id LIMIT 1").fetchone()
+            if row is not None:
+                conn.execute("UPDATE tasks SET status = 'running', worker = ?, heartbeat = ?, "
+                             "attempts = attempts + 1 WHERE id = ?", (worker, time.time(), row[0]))
+            conn.execute("COMMIT")
+
+        return row
+
+    def heartbeat(self, task_id, worker):
+        """
+        Signals that the worker executing the task is still alive.
+
+        :param task_id: Id of the task.
+        :type task_id: int
+
+        :param worker: Identifier of the worker executing the task.
+        :type worker: str
+
+        :return: False if the task is not owned by that worker anymore (i.e. was requeued), True otherwise.
+
+        """
+        with self.connect() as conn:
+            cursor = conn.execute("UPDATE tasks SET heartbeat = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                                  (time.time(), task_id, worker))
+        return cursor.rowcount == 1
+
+    def complete_task(self, task_id, worker, returncode):
+        """
+        Marks the task as done.
+
+        :param task_id: Id of the task.
+        :type task_id: int
+
+        :param worker: Identifier of the worker that executed the task.
+        :type worker: str
+
+        :param returncode: Return code of the executed command.
+        :type returncode: int
+
+        """
+        with self.connect() as conn:
+            conn.execute("UPDATE tasks SET status = 'done', returncode = ? WHERE id = ? AND worker = ?",
+                         (returncode, task_id, worker))
+
+    def requeue_stale_tasks(self, timeout, max_attempts=3):
+        """
+        Puts back in the queue the running tasks whose worker did not send a heartbeat for ``timeout`` seconds \
+        (i.e. most likely died). Tasks that were already attempted ``max_attempts`` times are marked as failed.
+
+        :param timeout: Heartbeat timeout (in seconds).
+        :type timeout: float
+
+        :param max_attempts: Maximum number of attempts per task (DEFAULT: 3).
+        :type max_attempts: int
+
+        :return: Number of requeued tasks.
+
+        """
+        deadline = time.time() - timeout
+
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE tasks SET status = 'failed' WHERE status = 'running' AND heartbeat < ? "
+                         "AND attempts >= ?", (deadline, max_attempts))
+            cursor = conn.execute("UPDATE tasks SET status = 'pending', worker = NULL "
+                                  "WHERE status = 'running' AND heartbeat < ?", (deadline,))
+            conn.execute("COMMIT")
+
+        return cursor.rowcount
+
+    def count(self, status=None):
+        """
+        Counts the tasks in the queue.
+
+        :param status: If set, counts only the tasks in the given state ('pending', 'running', 'done', 'failed').
+        :type status: str
+
+        :return: Number of tasks.
+
+        """
+        with self.connect() as conn:
+            if status is None:
+                row = conn.execute("SELECT COUNT(*) FROM tasks").fetchone()
+            else:
+                row = conn.execute("SELECT COUNT(*) FROM tasks WHERE status = ?", (status,)).fetchone()
+        return row[0]
+
+
+if __name__ == '__main__':
+    from tempfile import NamedTemporaryFile
+
+    queue_file = NamedTemporaryFile(suffix='.sqlite', delete=False)
+    queue = GridTaskQueue(queue_file.name)
+    queue.add_tasks(['echo 1', 'echo 2'])
+
+    task_id, command, cwd = queue.claim_task('worker_a')
+    print('worker_a claimed task {}: {} (in {})'.format(task_id, command, cwd))
+
+    # Pretend worker_a died: its task goes back to the queue.
+    print('Requeued tasks: {}'.format(queue.requeue_stale_tasks(timeout=-1)))
+    print('worker_a heartbeat accepted: {}'.format(queue.heartbeat(task_id, 'worker_a')))
+
+    while True:
+        task = queue.claim_task('worker_b')
+        if task is None:
+            break
+        queue.complete_task(task[0], 'worker_b', 0)
+
+    print('Done tasks: {}/{}'.format(queue.count('done'), queue.count()))
+    os.remove(queue_file.name)
@@ -29,11 +29,10 @@ __author__ = "Tomasz Kornuta & Vincent Marois"
 
 import os
 import shutil
-import subprocess
 from functools import partial
-from multiprocessing.pool import ThreadPool
 
 from miprometheus.workers.grid_worker import GridWorker
+from miprometheus.workers.grid_slot_scheduler import GridSlotScheduler
 
 
 class GridTesterCPU(GridWorker):
@@ -78,6 +77,13 @@ class GridTesterCPU(GridWorker):
                                     'The set limit will be truncated by number of available CPUs/GPUs.'
                                     ' (DEFAULT=-1, meaning that it will be set to the number of CPUs/GPUs)')
 
+        self.parser.add_argument('--s',
+                                 dest='slots_per_device',
+                                 type=int,
+                                 default=-1,
+                                 help='Number of experiments that can run concurrently on a single device (CPU socket'
+                                      ' or GPU). (DEFAULT=-1, meaning one per CPU core or one per GPU)')
+
 
     def setup_grid_experiment(self):
         """
@@ -104,6 +110,7 @@ class GridTesterCPU(GridWorker):
         # Get grid settings.
         experiment_repetitions = self.flags.experiment_repetitions
         self.max_concurrent_runs = self.flags.max_concurrent_runs
+        self.slots_per_device = self.flags.slots_per_device
 
         # get all sub-directories paths in outdir, repeating according to flags.num
         self.experiments_list = []
@@ -129,33 +136,35 @@ class GridTesterCPU(GridWorker):
         """
         Main function of the ``GridTesterCPU``.
 
-        Maps the grid experiments to CPU cores in the limit of the maximum concurrent runs allowed or maximum\
-         available cores.
+        Maps the grid experiments to the slots of the CPU sockets (by default one slot per core) in the limit \
+        of the maximum concurrent runs allowed.
 
         """
         # Ask for confirmation - optional.
         if self.flags.confirm:
             input('Press any key to continue')
 
-        # Check max number of child processes. 
-        if self.max_concurrent_runs <= 0: # We need at least one proces!
-            max_processes = len(os.sched_getaffinity(0))
-        else:    
-            # Take into account the minimum value.
-            max_processes = min(len(os.sched_getaffinity(0)), self.max_concurrent_runs)
-        self.logger.info('Spanning experiments using {} CPU(s) concurrently.'.format(max_processes))
+        # Delegate the execution to the mip-grid-worker(s) - optional.
+        if self.flags.queue != '':
+            self.enqueue_grid_experiment()
+            return
 
-        # Run in as many threads as there are CPUs available to the script.
-        with ThreadPool(processes=max_processes) as pool:
-            func = partial(GridTesterCPU.run_experiment, self, prefix="")
-            pool.map(func, self.experiments_list)
+        # Get the slots of the devices, truncated by the max number of concurrent runs (if > 0).
+        devices = self.get_devices()
+        scheduler = GridSlotScheduler(devices, self.max_concurrent_runs)
+        self.logger.info('Spanning experiments using {} slot(s) on {} concurrently.'.format(
+            scheduler.num_slots, ', '.join([device.name for device in devices])))
+
+        # Start an experiment every time a slot is freed.
+        func = partial(GridTesterCPU.run_experiment, self, prefix="")
+        scheduler.run(func, self.experiments_list)
 
         self.logger.info('Grid test experiments finished.')
 
 
-    def run_experiment(self, experiment_path: str, prefix=""):
+    def get_experiment_command(self, experiment_path: str, prefix=""):
         """
-        Runs a test on the specified model (experiment_path) using the ``Tester``.
+        Returns the command running the ``Tester`` on the specified model (experiment_path).
 
         :param experiment_path: Path to an experiment folder containing a trained model.
         :type experiment_path: str
@@ -169,34 +178,53 @@ class GridTesterCPU(GridWorker):
             - Command-line arguments such as the logging interval (``--li``) and log level (``--ll``) are passed \
              to the used ``Trainer``.
 
+        :return: Command (str), or ``None`` if the experiment folder does not contain a trained model.
+
         """
         path_to_model = os.path.join(experiment_path, 'models/model_best.pt')
 
-        # check if models list is empty
+        # check if the model exists
         if not os.path.isfile(path_to_model):
             self.logger.warning('The indicated model {} does not exist on file.'.format(path_to_model))
+            return None
+
+        command_str = "{}mip-tester --model {} --li {} --ll {}".format(prefix, path_to_model,
+                                                                       self.flags.logging_interval,
+                                                                       self.flags.log_level)
+        # Add gpu flag if required.
+        if self.app_state.use_CUDA:
+            command_str += " --gpu "
+
+        return command_str
 
-        else:
-
-            # Run the test
-            command_str = "{}mip-tester --model {} --li {} --ll {}".format(prefix, path_to_model,
-                                                                                       self.flags.logging_interval,
-                                                                                       self.flags.log_level)
-            # Add gpu flag if required.
-            if self.app_state.use_CUDA:
-                command_str += " --gpu "
-
-            self.logger.info("Starting: {}".format(command_str))
-            with open(os.devnull, 'w') as devnull:
-                result = subprocess.run(command_str.split(" "), stdout=devnull)
-            self.experiments_done += 1
-            self.logger.info("Finished: {}".format(command_str))
-            print()
-            self.logger.info(
-                'Number of experiments done: {}/{}.'.format(self.experiments_done, len(self.experiments_list)))
-
-            if result.returncode != 0:
-                self.logger.info("Testing exited with code: {}".format(result.returncode))
+    def run_experiment(self, experiment_path: str, prefix="", device=None):
+        """
+        Runs a test on the specified model (experiment_path) using the ``Tester``.
+
+        :param experiment_path: Path to an experiment folder containing a trained model.
+        :type experiment_path: str
+
+        :param prefix: Prefix to position before the command string (e.g. 'cuda-gpupick -n 1'). Optional.
+        :type prefix: str
+
+        :param device: ``Device`` the experiment was assigned to. Optional.
+
+        """
+        # Run the test - unless there is no model to test.
+        command_str = self.get_experiment_command(experiment_path, prefix)
+        if command_str is None:
+            return
+
+        self.logger.info("Starting{}: {}".format('' if device is None else ' on ' + device.name, command_str))
+        returncode = self.execute_command(command_str, device)
+        self.experiments_done += 1
+        self.logger.info("Finished: {}".format(command_str))
+        print()
+        self.logger.info(
+            'Number of experiments done: {}/{}.'.format(self.experiments_done, len(self.experiments_list)))
+
+        if returncode != 0:
+            self.logger.info("Testing exited with code: {}".format(returncode))
 
 
 def main():
@@ -28,13 +28,10 @@ grid_tester_gpu.py:
 
 __author__ = "Tomasz Kornuta & Vincent Marois"
 
-import shutil
 import torch
-from time import sleep
-from functools import partial
-from multiprocessing.pool import ThreadPool
 
 from miprometheus.workers.grid_tester_cpu import GridTesterCPU
+from miprometheus.workers.grid_slot_scheduler import get_cuda_devices
 
 
 class GridTesterGPU(GridTesterCPU):
@@ -43,7 +40,8 @@ class GridTesterGPU(GridTesterCPU):
 
     Reuses the ``Tester`` to start one test experiment.
 
-    Inherits from ``GridTesterCPU`` as the constructor is identical.
+    Inherits from ``GridTesterCPU`` as the constructor & ``run_grid_experiment`` are identical:
+    only the devices (CUDA devices instead of CPU sockets) differ.
 
     """
 
@@ -74,58 +72,25 @@ class GridTesterGPU(GridTesterCPU):
 
         """
         super(GridTesterGPU, self).setup_grid_experiment()
-        # Check the presence of the CUDA-compatible devices.
-        if (torch.cuda.device_count() == 0):
+        # Check the presence of the CUDA-compatible devices (not needed when only filling the task queue).
+        if (self.flags.queue == '') and (torch.cuda.device_count() == 0):
             self.logger.error("Cannot use GPU as there are no CUDA-compatible devices present in the system!")
             exit(-1)
 
 
-    def run_grid_experiment(self):
+    def get_devices(self):
         """
-        Main function of the ``GridTesterGPU``.
+        Returns the CUDA devices, with ``self.slots_per_device`` slots each (-1 meaning one slot per device).
 
-        Maps the grid experiments to CPU cores in the limit of the maximum concurrent runs allowed or maximum\
-         available cores.
+        .. note::
+
+            Each experiment is assigned to a device through ``CUDA_VISIBLE_DEVICES``, so that several \
+            (small) experiments can be packed on a single device.
+
+        :return: List of ``Device``.
 
         """
-        # Ask for confirmation - optional.
-        if self.flags.confirm:
-            input('Press any key to continue')
-
-        # Check the presence of cuda-gpupick
-        if shutil.which('cuda-gpupick') is not None:
-            prefix_str = "cuda-gpupick -n1 "
-        else:
-            self.logger.warning("Cannot localize the 'cuda-gpupick' script, disabling it")
-            prefix_str = ''
-
-        # Check max number of child processes. 
-        if self.max_concurrent_runs <= 0: # We need at least one proces!
-            max_processes = torch.cuda.device_count()
-        else:    
-            # Take into account the minimum value.
-            max_processes = min(torch.cuda.device_count(), self.max_concurrent_runs)
-        self.logger.info('Spanning experiments using {} GPU(s) concurrently.'.format(max_processes))
-
-        # Run in as many threads as there are GPUs available to the script.
-        with ThreadPool(processes=max_processes) as pool:
-            # This contains a list of `AsyncResult` objects. To check if completed and get result.
-            thread_results = []
-
-            for task in self.experiments_list:
-                func = partial(GridTesterGPU.run_experiment, self, prefix=prefix_str)
-                thread_results.append(pool.apply_async(func, (task,)))
-
-                # Check every 3 seconds if there is a (supposedly) free GPU to start a task on
-                sleep(3)
-                while [r.ready() for r in thread_results].count(False) >= torch.cuda.device_count():
-                    sleep(3)
-
-            # Equivalent of what would usually be called "join" for threads
-            for r in thread_results:
-                r.wait()
-
-        self.logger.info('Grid training experiments finished.')
+        return get_cuda_devices(self.slots_per_device)
 
 
 def main():
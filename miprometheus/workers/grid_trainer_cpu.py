@@ -29,14 +29,15 @@ __author__ = "Alexis Asseman, Ryan McAvoy, Tomasz Kornuta, Vincent Marois"
 import os
 import shutil
 import yaml
-import subprocess
+import threading
 from time import sleep
 from datetime import datetime
 from functools import partial
 from tempfile import NamedTemporaryFile
-from multiprocessing.pool import ThreadPool
 
 from miprometheus.workers.grid_worker import GridWorker
+from miprometheus.workers.grid_slot_scheduler import GridSlotScheduler
+from miprometheus.utils.progress_stream import ProgressMonitor
 
 
 class GridTrainerCPU(GridWorker):
@@ -87,6 +88,13 @@ class GridTrainerCPU(GridWorker):
                                       "2: Add the histograms of the model's biases & weights gradients "
                                       "(Warning: Even slower).")
 
+        self.parser.add_argument('--status',
+                                 dest='status_interval',
+                                 type=float,
+                                 default=60,
+                                 help='Interval (in seconds) between two logs of the status table summarizing the '
+                                      'progress of the running experiments. A value <= 0 disables it. (Default: 60)')
+
     def setup_grid_experiment(self):
         """
         Setups a specific experiment.
@@ -142,12 +150,22 @@ class GridTrainerCPU(GridWorker):
             print("Error: The 'grid_settings' section must define 'experiment_repetitions' and 'max_concurrent_runs'.")
             exit(-5)
 
+        # Number of experiments that can share a single device - optional.
+        self.slots_per_device = grid_dict['grid_settings'].get('slots_per_device', -1)
+
+        # When using a shared task queue, the temporary configuration files must be visible to all hosts:
+        # put them next to the queue file.
+        if self.flags.queue != '':
+            tmp_dir = os.path.dirname(os.path.abspath(self.flags.queue))
+        else:
+            tmp_dir = None
+
         # Check the presence of grid_overwrite section.
         if 'grid_overwrite' not in grid_dict:
             grid_overwrite_filename = None
         else:
             # Create temporary file with settings that will be overwritten for all tasks.
-            grid_overwrite_file = NamedTemporaryFile(mode='w', delete=False)
+            grid_overwrite_file = NamedTemporaryFile(mode='w', delete=False, dir=tmp_dir)
             yaml.dump(grid_dict['grid_overwrite'], grid_overwrite_file, default_flow_style=False)
             grid_overwrite_filename = grid_overwrite_file.name
 
@@ -157,7 +175,7 @@ class GridTrainerCPU(GridWorker):
             exit(-6)
 
         # Create temporary file
-        param_interface_file = NamedTemporaryFile(mode='w', delete=False)
+        param_interface_file = NamedTemporaryFile(mode='w', delete=False, dir=tmp_dir)
         yaml.dump(self.params.to_dict(), param_interface_file, default_flow_style=False)
 
         configs = []
@@ -177,7 +195,7 @@ class GridTrainerCPU(GridWorker):
                 if 'overwrite' in task:
                     # Create temporary file with settings that will be overwritten
                     # only for that particular task.
-                    overwrite_files.append(NamedTemporaryFile(mode='w', delete=False))
+                    overwrite_files.append(NamedTemporaryFile(mode='w', delete=False, dir=tmp_dir))
                     yaml.dump(task['overwrite'], overwrite_files[-1], default_flow_style=False)
                     current_configs = overwrite_files[-1].name + ',' + current_configs
 
@@ -213,38 +231,69 @@ class GridTrainerCPU(GridWorker):
             else:
                 break
 
+        # File to which the trainers will report their progress.
+        self.progress_file = os.path.join(self.outdir_str, 'progress.jsonl')
+
+    def monitor_progress(self, num_slots, stop_event):
+        """
+        Regularly logs the status table of the experiments (using the records reported by the trainers), \
+        until the indicated event is set.
+
+        :param num_slots: Number of experiments running concurrently (used to compute the ETA).
+        :type num_slots: int
+
+        :param stop_event: Event signalling the end of the grid experiment.
+        :type stop_event: ``threading.Event``
+
+        """
+        monitor = ProgressMonitor(self.progress_file)
+
+        while not stop_event.wait(self.flags.status_interval):
+            monitor.update()
+            self.logger.info(monitor.summarize(len(self.experiments_list), num_slots))
 
     def run_grid_experiment(self):
         """
         Main function of the ``GridTrainerCPU``.
 
-        Maps the grid experiments to CPU cores in the limit of the maximum concurrent runs allowed or maximum\
-         available cores.
+        Maps the grid experiments to the slots of the CPU sockets (by default one slot per core) in the limit \
+        of the maximum concurrent runs allowed.
 
         """
         # Ask for confirmation - optional.
         if self.flags.confirm:
             input('Press any key to continue')
 
-        # Check max number of child processes. 
-        if self.max_concurrent_runs <= 0: # We need at least one proces!
-            max_processes = len(os.sched_getaffinity(0))
-        else:    
-            # Take into account the minimum value.
-            max_processes = min(len(os.sched_getaffinity(0)), self.max_concurrent_runs)
-        self.logger.info('Spanning experiments using {} CPU(s) concurrently.'.format(max_processes))
+        # Delegate the execution to the mip-grid-worker(s) - optional.
+        if self.flags.queue != '':
+            self.enqueue_grid_experiment()
+            return
+
+        # Get the slots of the devices, truncated by the max number of concurrent runs (if > 0).
+        devices = self.get_devices()
+        scheduler = GridSlotScheduler(devices, self.max_concurrent_runs)
+        self.logger.info('Spanning experiments using {} slot(s) on {} concurrently.'.format(
+            scheduler.num_slots, ', '.join([device.name for device in devices])))
+
+        # Periodically log the progress of the experiments - optional.
+        stop_event = threading.Event()
+        if self.flags.status_interval > 0:
+            monitor_thread = threading.Thread(target=self.monitor_progress, args=(scheduler.num_slots, stop_event))
+            monitor_thread.daemon = True
+            monitor_thread.start()
+
+        # Start an experiment every time a slot is freed.
+        func = partial(GridTrainerCPU.run_experiment, self, prefix="")
+        scheduler.run(func, self.experiments_list)
 
-        # Run in as many threads as there are CPUs available to the script.
-        with ThreadPool(processes=max_processes) as pool:
-            func = partial(GridTrainerCPU.run_experiment, self, prefix="")
-            pool.map(func, self.experiments_list)
+        stop_event.set()
 
         self.logger.info('Grid training experiments finished.')
 
 
-    def run_experiment(self, experiment_configs: str, prefix=""):
+    def get_experiment_command(self, experiment_configs: str, prefix=""):
         """
-        Setups the overall grid of experiments.
+        Returns the command starting the indicated ``Trainer`` on a single experiment of the grid.
 
         :param experiment_configs: Configuration file(s) passed to the trainer using its `--c` argument. If indicating\
          several config files, they must be separated with coma ",".
@@ -260,7 +309,9 @@ class GridTrainerCPU(GridWorker):
             - Visualization is deactivated to avoid any user interaction.
             - Command-line arguments such as the logging interval (``--li``), tensorboard (``--t``) and log level \
             (``--ll``) are passed to the used ``Trainer``.
+            - The ``Trainer`` reports its progress to the grid progress file (``--progress``).
 
+        :return: Command (str).
 
         """
         # set the command to be executed using the indicated Trainer
@@ -282,16 +333,36 @@ class GridTrainerCPU(GridWorker):
         if self.flags.tensorboard is not None:
             command_str += " --t " + str(self.flags.tensorboard)
 
-        self.logger.info("Starting: {}".format(command_str))
-        with open(os.devnull, 'w') as devnull:
-            result = subprocess.run(command_str.split(" "), stdout=devnull)
+        # Report the progress to the grid trainer.
+        command_str += " --progress " + self.progress_file
+
+        return command_str
+
+    def run_experiment(self, experiment_configs: str, prefix="", device=None):
+        """
+        Runs a single training experiment of the grid.
+
+        :param experiment_configs: Configuration file(s) passed to the trainer using its `--c` argument. If indicating\
+         several config files, they must be separated with coma ",".
+        :type experiment_configs: str
+
+        :param prefix: Prefix to position before the command string (e.g. 'cuda-gpupick -n 1'). Optional.
+        :type prefix: str
+
+        :param device: ``Device`` the experiment was assigned to. Optional.
+
+        """
+        command_str = self.get_experiment_command(experiment_configs, prefix)
+
+        self.logger.info("Starting{}: {}".format('' if device is None else ' on ' + device.name, command_str))
+        returncode = self.execute_command(command_str, device)
         self.experiments_done += 1
         self.logger.info("Finished: {}".format(command_str))
 
         self.logger.info('Number of experiments done: {}/{}.'.format(self.experiments_done, len(self.experiments_list)))
 
-        if result.returncode != 0:
-            self.logger.info("Training exited with code: {}".format(result.returncode))
+        if returncode != 0:
+            self.logger.info("Training exited with code: {}".format(returncode))
 
 
 def main():
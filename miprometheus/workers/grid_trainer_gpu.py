@@ -27,13 +27,10 @@ grid_trainer_gpu.py:
 
 __author__ = "Alexis Asseman, Younes Bouhadjar, Vincent Marois"
 
-import shutil
 import torch
-from time import sleep
-from functools import partial
-from multiprocessing.pool import ThreadPool
 
 from miprometheus.workers.grid_trainer_cpu import GridTrainerCPU
+from miprometheus.workers.grid_slot_scheduler import get_cuda_devices
 
 
 class GridTrainerGPU(GridTrainerCPU):
@@ -42,7 +39,8 @@ class GridTrainerGPU(GridTrainerCPU):
 
     Reuses a ``Trainer`` (can specify the ``classic`` one or the ``flexible`` one) to start one experiment.
 
-    Inherits from ``GridTrainerCPU`` as the constructor & ``setup_grid_experiment`` are identical.
+    Inherits from ``GridTrainerCPU`` as the constructor, ``setup_grid_experiment`` & ``run_grid_experiment`` are identical:
+    only the devices (CUDA devices instead of CPU sockets) differ.
 
     """
     def __init__(self, name="GridTrainerGPU", use_gpu=True):
@@ -73,57 +71,25 @@ class GridTrainerGPU(GridTrainerCPU):
 
         """
         super(GridTrainerGPU, self).setup_grid_experiment()
-        # Check the presence of the CUDA-compatible devices.
-        if (torch.cuda.device_count() == 0):
+        # Check the presence of the CUDA-compatible devices (not needed when only filling the task queue).
+        if (self.flags.queue == '') and (torch.cuda.device_count() == 0):
             self.logger.error("Cannot use GPU as there are no CUDA-compatible devices present in the system!")
             exit(-1)
 
 
-    def run_grid_experiment(self):
+    def get_devices(self):
         """
-        Main function of the ``GridTrainerGPU``.
+        Returns the CUDA devices, with ``self.slots_per_device`` slots each (-1 meaning one slot per device).
 
-        Maps the grid experiments to CUDA devices in the limit of the maximum concurrent runs allowed.
+        .. note::
+
+            Each experiment is assigned to a device through ``CUDA_VISIBLE_DEVICES``, so that several \
+            (small) experiments can be packed on a single device.
+
+        :return: List of ``Device``.
 
         """
-        # Ask for confirmation - optional.
-        if self.flags.confirm:
-            input('Press any key to continue')
-
-        # Check the presence of cuda-gpupick
-        if shutil.which('cuda-gpupick') is not None:
-            prefix_str = "cuda-gpupick -n1 "
-        else:
-            self.logger.warning("Cannot localize the 'cuda-gpupick' script, disabling it")
-            prefix_str = ''
-
-        # Check max number of child processes. 
-        if self.max_concurrent_runs <= 0: # We need at least one proces!
-            max_processes = torch.cuda.device_count()
-        else:    
-            # Take into account the minimum value.
-            max_processes = min(torch.cuda.device_count(), self.max_concurrent_runs)
-        self.logger.info('Spanning experiments using {} GPU(s) concurrently.'.format(max_processes))
-
-        # Run in as many threads as there are GPUs available to the script.
-        with ThreadPool(processes=max_processes) as pool:
-            # This contains a list of `AsyncResult` objects. To check if completed and get result.
-            thread_results = []
-
-            for task in self.experiments_list:
-                func = partial(GridTrainerGPU.run_experiment, self, prefix=prefix_str)
-                thread_results.append(pool.apply_async(func, (task,)))
-
-                # Check every 3 seconds if there is a (supposedly) free GPU to start a task on
-                sleep(3)
-                while [r.ready() for r in thread_results].count(False) >= max_processes:
-                    sleep(3)
-
-            # Equivalent of what would usually be called "join" for threads
-            for r in thread_results:
-                r.wait()
-
-        self.logger.info('Grid training experiments finished.')
+        return get_cuda_devices(self.slots_per_device)
 
 
 def main():
@@ -27,12 +27,16 @@ grid_worker.py:
 """
 __author__ = "Vincent Marois & Tomasz Kornuta"
 
+import os
 import logging
 import argparse
+import subprocess
 from abc import abstractmethod
 
 from miprometheus.utils.app_state import AppState
 from miprometheus.utils.param_interface import ParamInterface
+from miprometheus.workers.grid_task_queue import GridTaskQueue
+from miprometheus.workers.grid_slot_scheduler import get_cpu_sockets
 
 
 class GridWorker(object):
@@ -143,6 +147,14 @@ class GridWorker(object):
                                  help='Request user confirmation before starting the grid experiment.'
                                       '  (Default: False)')
 
+        self.parser.add_argument('--queue',
+                                 dest='queue',
+                                 type=str,
+                                 default='',
+                                 help='Path to a (SQLite) task queue file, located on a filesystem shared between '
+                                      'the hosts. If set, the grid experiments are not executed locally but pushed '
+                                      'to the queue, and executed by the mip-grid-worker processes. (Default: \'\')')
+
     def setup_grid_experiment(self):
         """
         Setups the overall grid of experiments.
@@ -183,6 +195,81 @@ class GridWorker(object):
                                                    "seed_torch": -1,
                                                    "dataloader": {'num_workers': 0}})
 
+    @abstractmethod
+    def get_experiment_command(self, experiment, prefix=""):
+        """
+        Returns the command line executing a single experiment of the grid.
+
+        .. note::
+
+            Abstract. Should be implemented in the subclasses executing experiments through base workers.
+
+
+        :param experiment: Element of ``self.experiments_list`` (e.g. config file(s) or path to an experiment).
+
+        :param prefix: Prefix to position before the command string (e.g. 'cuda-gpupick -n 1'). Optional.
+        :type prefix: str
+
+        :return: Command (str), or ``None`` if the experiment must be skipped.
+
+        """
+
+    def get_devices(self):
+        """
+        Returns the devices the experiments will be mapped to.
+
+        By default, these are the CPU sockets, with ``self.slots_per_device`` slots each (-1 meaning one slot \
+        per core). GPU workers should override this method.
+
+        :return: List of ``Device``.
+
+        """
+        return get_cpu_sockets(self.slots_per_device)
+
+    def execute_command(self, command_str, device=None):
+        """
+        Executes the command of a single experiment, optionally on the indicated device (i.e. setting its \
+        environment variables and pinning the process to its CPU cores).
+
+        :param command_str: Command to execute.
+        :type command_str: str
+
+        :param device: ``Device`` the experiment was assigned to (DEFAULT: None).
+
+        :return: Return code of the command.
+
+        """
+        env = dict(os.environ)
+        if device is not None:
+            env.update(device.env)
+
+        command = command_str.split(" ")
+        # Pin the experiment (and the processes it will spawn) to the cores of the device, before it starts
+        # (e.g. its BLAS/OpenMP thread pools). N.B.: preexec_fn is not safe in the threads of the grid workers.
+        if device is not None and device.cpus is not None:
+            command = ['taskset', '-c', ','.join(str(cpu) for cpu in device.cpus)] + command
+
+        with open(os.devnull, 'w') as devnull:
+            process = subprocess.Popen(command, stdout=devnull, env=env)
+            return process.wait()
+
+    def enqueue_grid_experiment(self):
+        """
+        Pushes the commands of all experiments of the grid to the shared task queue indicated by ``--queue`` \
+        instead of executing them locally.
+
+        The tasks will then be claimed and executed by (any number of) ``GridQueueWorker`` processes.
+
+        """
+        queue = GridTaskQueue(self.flags.queue)
+        commands = [self.get_experiment_command(experiment) for experiment in self.experiments_list]
+        # Skip the experiments which cannot be executed (e.g. no trained model to test).
+        commands = [command for command in commands if command is not None]
+        queue.add_tasks(commands)
+
+        self.logger.info('Pushed {} experiments to the task queue {}. Please start mip-grid-worker(s) to '
+                         'execute them.'.format(len(commands), self.flags.queue))
+
     @abstractmethod
     def run_grid_experiment(self):
         """
@@ -92,7 +92,7 @@ class OffLineTrainer(Trainer):
             self.logger.info("Setting the Epoch Limit to: {}".format(self.epoch_limit))
 
         # Calculate the epoch size in terms of episodes.
-        epoch_size = self.training_problem.get_epoch_size(self.params["training"]["problem"]["batch_size"])
+        epoch_size = len(self.training_dataloader)
         self.logger.info('Epoch size in terms of training episodes: {}'.format(epoch_size))
 
         # Terminal condition III: max episodes. Optional.
@@ -106,6 +106,9 @@ class OffLineTrainer(Trainer):
             self.logger.info("Setting the Episode Limit to: {}".format(self.episode_limit))
         self.logger.info('\n' + '='*80)
 
+        # Expected number of training episodes (used for progress reporting).
+        self.total_episodes = min(self.episode_limit, self.epoch_limit * epoch_size)
+
     def run_experiment(self):
         """
         Main function of the ``Trainer``.
@@ -161,6 +164,7 @@ class OffLineTrainer(Trainer):
         # Initialize TensorBoard and statistics collection.
         self.initialize_statistics_collection()
         self.initialize_tensorboard()
+        self.initialize_progress_reporting(self.total_episodes)
 
         try:
             '''
@@ -245,6 +249,12 @@ class OffLineTrainer(Trainer):
                     if episode % self.flags.logging_interval == 0:
                         self.logger.info(self.training_stat_col.export_to_string())
 
+                    # 4.4. Report progress (e.g. to the grid trainer).
+                    self.report_progress()
+
+                    # 4.5. Adapt the curriculum to the training performance (if set).
+                    self.update_curriculum(self.training_stat_col, 'training', episode)
+
                     # 5. Check visualization of training data.
                     if self.app_state.visualize:
 
@@ -287,8 +297,9 @@ class OffLineTrainer(Trainer):
                                                      self.training_stat_col, self.training_stat_agg,
                                                      episode, '[Epoch {}]'.format(epoch))
 
-                # Apply curriculum learning - change some of the Problem parameters
-                self.curric_done = self.training_problem.curriculum_learning_update_params(episode)
+                # Apply curriculum learning - change some of the Problem parameters (fixed schedule).
+                if self.curriculum_controller is None:
+                    self.curric_done = self.training_problem.curriculum_learning_update_params(episode)
 
                 # Perform full validation!
 
@@ -304,6 +315,9 @@ class OffLineTrainer(Trainer):
                 # Save the model using the average validation loss.
                 self.model.save(self.model_dir, self.validation_stat_agg)
 
+                # Adapt the curriculum to the validation performance (if set).
+                self.update_curriculum(self.validation_stat_agg, 'validation', episode)
+
                 # Terminal conditions.
                 # I - the loss is < threshold (only when curriculum learning is finished if set.)
                 # We check that condition only in validation step!
@@ -340,6 +354,7 @@ class OffLineTrainer(Trainer):
             self.model.save(self.model_dir, self.validation_stat_agg)
 
             self.logger.info('Experiment finished!')
+            self.finalize_progress_reporting('finished')
 
         except SystemExit as e:
             # the training did not end properly
@@ -351,6 +366,8 @@ class OffLineTrainer(Trainer):
             # Finalize statistics collection.
             self.finalize_statistics_collection()
             self.finalize_tensorboard()
+            # Does nothing if the experiment finished properly.
+            self.finalize_progress_reporting('interrupted')
 
 
 def main():
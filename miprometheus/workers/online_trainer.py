@@ -95,7 +95,7 @@ class OnLineTrainer(Trainer):
             self.logger.info("Setting the Epoch Limit to: {}".format(self.epoch_limit))
 
         # Calculate the epoch size in terms of episodes.
-        epoch_size = self.training_problem.get_epoch_size(self.params["training"]["problem"]["batch_size"])
+        epoch_size = len(self.training_dataloader)
         self.logger.info('Epoch size in terms of training episodes: {}'.format(epoch_size))
 
         # Terminal condition III: max episodes. Mandatory.
@@ -108,6 +108,9 @@ class OnLineTrainer(Trainer):
             self.logger.info("Setting the Episode Limit to: {}".format(self.episode_limit))
         self.logger.info('\n' + '='*80)
 
+        # Expected number of training episodes (used for progress reporting).
+        self.total_episodes = min(self.episode_limit, self.epoch_limit * epoch_size)
+
     def run_experiment(self):
         """
         Main function of the ``OnLineTrainer``, runs the experiment.
@@ -148,8 +151,10 @@ class OnLineTrainer(Trainer):
         # Initialize TensorBoard and statistics collection.
         self.initialize_statistics_collection()
         self.initialize_tensorboard()
+        self.initialize_progress_reporting(self.total_episodes)
 
         # cycle the DataLoader -> infinite iterator
+        epoch_size = len(self.training_dataloader)
         self.training_dataloader = self.cycle(self.training_dataloader)
 
         try:
@@ -232,6 +237,12 @@ class OnLineTrainer(Trainer):
                 if episode % self.flags.logging_interval == 0:
                     self.logger.info(self.training_stat_col.export_to_string())
 
+                # 4.4. Report progress (e.g. to the grid trainer).
+                self.report_progress()
+
+                # 4.5. Adapt the curriculum to the training performance (if set).
+                self.update_curriculum(self.training_stat_col, 'training', episode)
+
                 # 5. Check visualization of training data.
                 if self.app_state.visualize:
 
@@ -256,6 +267,9 @@ class OnLineTrainer(Trainer):
                     # Save the model using the latest validation statistics.
                     self.model.save(self.model_dir, self.validation_stat_col)
 
+                    # Adapt the curriculum to the validation performance (if set).
+                    self.update_curriculum(self.validation_stat_col, 'validation', episode)
+
                     # Terminal conditions.
                     # I. the loss is < threshold (only when curriculum learning is finished if set.)
                     # We check that condition only in validation step!
@@ -291,8 +305,7 @@ class OnLineTrainer(Trainer):
                     break
 
                 # Check if we are at the end of the 'epoch': indicate that the DataLoader is now cycling.
-                if ((episode + 1) % self.training_problem.get_epoch_size(
-                        self.params['training']['problem']['batch_size'])) == 0:
+                if ((episode + 1) % epoch_size) == 0:
 
                     # Epoch just ended!
                     # Inform the problem class that the epoch has ended.
@@ -302,8 +315,9 @@ class OnLineTrainer(Trainer):
                     self.aggregate_and_export_statistics(self.model, self.training_problem, 
                             self.training_stat_col, self.training_stat_agg, episode, '[Full Training]')
 
-                    # Apply curriculum learning - change some of the Problem parameters
-                    self.curric_done = self.training_problem.curriculum_learning_update_params(episode)
+                    # Apply curriculum learning - change some of the Problem parameters (fixed schedule).
+                    if self.curriculum_controller is None:
+                        self.curric_done = self.training_problem.curriculum_learning_update_params(episode)
 
                     # IV. Epoch limit has been reached.
                     if epoch+1 >= self.epoch_limit:
@@ -338,6 +352,7 @@ class OnLineTrainer(Trainer):
             self.model.save(self.model_dir, self.validation_stat_agg)
 
             self.logger.info('Experiment finished!')
+            self.finalize_progress_reporting('finished')
 
         except SystemExit as e:
             # the training did not end properly
@@ -349,6 +364,8 @@ class OnLineTrainer(Trainer):
             # Finalize statistics collection.
             self.finalize_statistics_collection()
             self.finalize_tensorboard()
+            # Does nothing if the experiment finished properly.
+            self.finalize_progress_reporting('interrupted')
 
 
 def main():
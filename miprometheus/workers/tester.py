@@ -29,7 +29,6 @@ import os
 import torch
 from time import sleep
 from datetime import datetime
-from torch.utils.data.dataloader import DataLoader
 
 from miprometheus.workers.worker import Worker
 from miprometheus.models.model_factory import ModelFactory
@@ -186,22 +185,12 @@ class Tester(Worker):
         self.problem = ProblemFactory.build_problem(self.params['testing']['problem'])
 
         # build the DataLoader on top of the Problem class
-        self.dataloader = DataLoader(dataset=self.problem,
-                                     batch_size=self.params['testing']['problem']['batch_size'],
-                                     shuffle=self.params['testing']['dataloader']['shuffle'],
-                                     sampler=self.params['testing']['dataloader']['sampler'],
-                                     batch_sampler=self.params['testing']['dataloader']['batch_sampler'],
-                                     num_workers=self.params['testing']['dataloader']['num_workers'],
-                                     collate_fn=self.problem.collate_fn,
-                                     pin_memory=self.params['testing']['dataloader']['pin_memory'],
-                                     drop_last=self.params['testing']['dataloader']['drop_last'],
-                                     timeout=self.params['testing']['dataloader']['timeout'],
-                                     worker_init_fn=self.problem.worker_init_fn)
+        self.dataloader = self.build_dataloader(self.problem, self.params['testing'])
 
         # check if the maximum number of episodes is specified, if not put a
         # default equal to the size of the dataset (divided by the batch size)
         # So that by default, we loop over the test set once.
-        max_test_episodes = self.problem.get_epoch_size(self.params['testing']['problem']['batch_size'])
+        max_test_episodes = len(self.dataloader)
 
         self.params['testing']['problem'].add_default_params({'max_test_episodes': max_test_episodes})
         if self.params["testing"]["problem"]["max_test_episodes"] == -1:
@@ -30,7 +30,6 @@ import torch
 from time import sleep
 from random import randrange
 from datetime import datetime
-from torch.utils.data.dataloader import DataLoader
 
 from miprometheus.workers.worker import Worker
 from miprometheus.models.model_factory import ModelFactory
@@ -38,6 +37,8 @@ from miprometheus.problems.problem_factory import ProblemFactory
 
 from miprometheus.utils.statistics_collector import StatisticsCollector
 from miprometheus.utils.statistics_aggregator import StatisticsAggregator
+from miprometheus.utils.progress_stream import ProgressReporter
+from miprometheus.utils.curriculum_controller import CurriculumController
 
 
 class Trainer(Worker):
@@ -87,6 +88,14 @@ class Trainer(Worker):
                                       "2: Only during validation episodes.\n"
                                       "3: Only during the last validation, after the training is completed.\n")
 
+        self.parser.add_argument('--progress',
+                                 dest='progress',
+                                 type=str,
+                                 default='',
+                                 help='Path to an (append-only) file to which compact progress records will be '
+                                      'regularly written. Used by the grid trainers to monitor their experiments.'
+                                      ' (Default: \'\')')
+
     def setup_experiment(self):
         """
         Sets up experiment of all trainers:
@@ -118,7 +127,8 @@ class Trainer(Worker):
 
                 >>> self.training_dataloader = DataLoader(dataset=self.training_problem, ...)
 
-            - Handles curriculum learning if indicated:
+            - Handles curriculum learning if indicated (``CurriculumController`` if the ``adaptive`` subsection \
+              is present, else the fixed schedule of the problem):
 
                 >>> if 'curriculum_learning' in self.params['training']:
                 >>> ...
@@ -220,17 +230,7 @@ class Trainer(Worker):
         self.training_problem = ProblemFactory.build_problem(self.params['training']['problem'])
 
         # build the DataLoader on top of the Problem class, using the associated configuration section.
-        self.training_dataloader = DataLoader(dataset=self.training_problem,
-                                              batch_size=self.params['training']['problem']['batch_size'],
-                                              shuffle=self.params['training']['dataloader']['shuffle'],
-                                              sampler=self.params['training']['dataloader']['sampler'],
-                                              batch_sampler=self.params['training']['dataloader']['batch_sampler'],
-                                              num_workers=self.params['training']['dataloader']['num_workers'],
-                                              collate_fn=self.training_problem.collate_fn,
-                                              pin_memory=self.params['training']['dataloader']['pin_memory'],
-                                              drop_last=self.params['training']['dataloader']['drop_last'],
-                                              timeout=self.params['training']['dataloader']['timeout'],
-                                              worker_init_fn=self.training_problem.worker_init_fn)
+        self.training_dataloader = self.build_dataloader(self.training_problem, self.params['training'])
 
         # parse the curriculum learning section in the loaded configuration.
         if 'curriculum_learning' in self.params['training']:
@@ -247,10 +247,20 @@ class Trainer(Worker):
             self.must_finish_curriculum = self.params['training']['curriculum_learning']['must_finish']
             self.logger.info("Curriculum Learning activated")
 
+            # Adaptive curriculum learning replaces the fixed schedule.
+            if 'adaptive' in self.params['training']['curriculum_learning']:
+                self.curriculum_controller = CurriculumController(
+                    self.params['training']['curriculum_learning']['adaptive'],
+                    self.params['training']['curriculum_learning'], self.training_problem)
+                self.curric_done = self.curriculum_controller.is_done()
+            else:
+                self.curriculum_controller = None
+
         else:
             # If not using curriculum learning then it does not have to be finished.
             self.must_finish_curriculum = False
             self.curric_done = True
+            self.curriculum_controller = None
 
         ################# VALIDATION PROBLEM ################# 
         
@@ -258,17 +268,7 @@ class Trainer(Worker):
         self.validation_problem = ProblemFactory.build_problem(self.params['validation']['problem'])
 
         # build the DataLoader on top of the validation problem
-        self.validation_dataloader = DataLoader(dataset=self.validation_problem,
-                                                batch_size=self.params['validation']['problem']['batch_size'],
-                                                shuffle=self.params['validation']['dataloader']['shuffle'],
-                                                sampler=self.params['validation']['dataloader']['sampler'],
-                                                batch_sampler=self.params['validation']['dataloader']['batch_sampler'],
-                                                num_workers=self.params['validation']['dataloader']['num_workers'],
-                                                collate_fn=self.validation_problem.collate_fn,
-                                                pin_memory=self.params['validation']['dataloader']['pin_memory'],
-                                                drop_last=self.params['validation']['dataloader']['drop_last'],
-                                                timeout=self.params['validation']['dataloader']['timeout'],
-                                                worker_init_fn=self.validation_problem.worker_init_fn)
+        self.validation_dataloader = self.build_dataloader(self.validation_problem, self.params['validation'])
 
         # Generate a single batch used for partial validation.
         #self.validation_batch = self.validation_problem.collate_fn(next(iter(self.validation_problem)))
@@ -334,6 +334,77 @@ class Trainer(Worker):
         # add 'aggregators' for the epoch.
         stat_agg.add_aggregator('epoch', '{:02d}')
 
+    def predict_evaluate_collect(self, model, problem, data_dict, stat_col, episode, epoch=None):
+        """
+        Calls base method and collects the curriculum statistics (if the adaptive curriculum learning is active \
+        and the ``StatisticsCollector`` tracks them, i.e. for the training).
+
+        :param model: trainable model.
+        :type model: ``models.model.Model`` or a subclass
+
+        :param problem: problem generating samples.
+        :type problem: ``problems.problem.problem`` or a subclass
+
+        :param data_dict: contains the batch of samples to pass to the model.
+        :type data_dict: ``DataDict``
+
+        :param stat_col: statistics collector used for logging accuracy etc.
+        :type stat_col: ``StatisticsCollector``
+
+        :param episode: current episode index
+        :type episode: int
+
+        :param epoch: current epoch index.
+        :type epoch: int, optional
+
+        :return: logits, loss
+
+        """
+        logits, loss = super(Trainer, self).predict_evaluate_collect(model, problem, data_dict, stat_col,
+                                                                     episode, epoch)
+
+        if self.curriculum_controller is not None and 'curriculum_level' in stat_col:
+            self.curriculum_controller.collect_statistics(stat_col)
+
+        return logits, loss
+
+    def aggregate_statistics(self, stat_col, stat_agg):
+        """
+        Calls base method and aggregates the curriculum statistics (if collected).
+
+        :param stat_col: ``StatisticsCollector``.
+
+        :param stat_agg: ``StatisticsAggregator``.
+
+        """
+        super(Trainer, self).aggregate_statistics(stat_col, stat_agg)
+
+        if self.curriculum_controller is not None and 'curriculum_level' in stat_agg:
+            self.curriculum_controller.aggregate_statistics(stat_col, stat_agg)
+
+    def update_curriculum(self, stat_obj, source, episode):
+        """
+        Feeds the adaptive curriculum learning with the last value of the monitored statistic (if it is active \
+        and monitors the indicated source).
+
+        :param stat_obj: ``StatisticsCollector`` (last value used) or ``StatisticsAggregator``.
+
+        :param source: Source of the statistics: 'training' or 'validation'.
+        :type source: str
+
+        :param episode: current episode index.
+        :type episode: int
+
+        """
+        if self.curriculum_controller is None or self.curriculum_controller.source != source:
+            return
+
+        value = stat_obj[self.curriculum_controller.statistic]
+        if isinstance(value, list):
+            value = value[-1]
+
+        self.curric_done = self.curriculum_controller.update(value, episode)
+
     def initialize_statistics_collection(self):
         """
         - Initializes all ``StatisticsCollectors`` and ``StatisticsAggregators`` used by a given worker: \
@@ -350,6 +421,8 @@ class Trainer(Worker):
         self.add_statistics(self.training_stat_col)
         self.training_problem.add_statistics(self.training_stat_col)
         self.model.add_statistics(self.training_stat_col)
+        if self.curriculum_controller is not None:
+            self.curriculum_controller.add_statistics(self.training_stat_col)
         # Create the csv file to store the training statistics.
         self.training_batch_stats_file = self.training_stat_col.initialize_csv_file(self.log_dir, 'training_statistics.csv')
 
@@ -358,6 +431,8 @@ class Trainer(Worker):
         self.add_aggregators(self.training_stat_agg)
         self.training_problem.add_aggregators(self.training_stat_agg)
         self.model.add_aggregators(self.training_stat_agg)
+        if self.curriculum_controller is not None:
+            self.curriculum_controller.add_aggregators(self.training_stat_agg)
         # Create the csv file to store the training statistic aggregations.
         self.training_set_stats_file = self.training_stat_agg.initialize_csv_file(self.log_dir, 'training_set_agg_statistics.csv')
 
@@ -428,6 +503,49 @@ class Trainer(Worker):
         if self.validation_set_writer is not None:
             self.validation_set_writer.close()
 
+    def initialize_progress_reporting(self, total_episodes=None):
+        """
+        Creates the ``ProgressReporter`` writing to the file indicated by ``--progress`` (if set).
+
+        :param total_episodes: Expected number of training episodes (``None`` or infinite if unknown).
+
+        """
+        if self.flags.progress != '':
+            if total_episodes is not None and total_episodes == float('inf'):
+                total_episodes = None
+            self.progress_reporter = ProgressReporter(self.flags.progress, self.log_dir, total_episodes)
+        else:
+            self.progress_reporter = None
+
+    def report_progress(self):
+        """
+        Reports the progress of the training (at most every few seconds) using the last collected training \
+        statistics. Should be called at every episode.
+
+        """
+        if self.progress_reporter is None:
+            return
+
+        # Use the real size of the batch if collected by the problem.
+        if 'batch_size' in self.training_stat_col and len(self.training_stat_col['batch_size']) > 0:
+            batch_size = self.training_stat_col['batch_size'][-1]
+        else:
+            batch_size = self.params['training']['problem']['batch_size']
+
+        self.progress_reporter.report(self.training_stat_col, batch_size)
+
+    def finalize_progress_reporting(self, status):
+        """
+        Writes the final progress record, with the indicated status.
+
+        :param status: Final status of the training (e.g. 'finished', 'interrupted').
+        :type status: str
+
+        """
+        if self.progress_reporter is not None:
+            self.progress_reporter.close(status)
+            self.progress_reporter = None
+
     def validate_on_batch(self, valid_batch, episode, epoch=None):
         """
         Performs a validation of the model using the provided batch.
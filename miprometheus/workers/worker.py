@@ -35,6 +35,9 @@ import numpy as np
 import logging.config
 from random import randrange
 from abc import abstractmethod
+from collections.abc import Mapping
+
+from torch.utils.data.dataloader import DataLoader
 
 # Import utils.
 from miprometheus.utils.app_state import AppState
@@ -310,7 +313,12 @@ class Worker(object):
         loss_values = stat_col['loss']
 
         # Calculate default aggregates.
-        stat_agg.aggregators['loss'] = torch.mean(torch.tensor(loss_values))
+        if 'batch_size' in stat_col and len(stat_col['batch_size']) == len(loss_values):
+            # Average over the samples (the batches may have different sizes).
+            batch_sizes = torch.tensor(stat_col['batch_size']).float()
+            stat_agg.aggregators['loss'] = torch.sum(torch.tensor(loss_values) * batch_sizes) / batch_sizes.sum()
+        else:
+            stat_agg.aggregators['loss'] = torch.mean(torch.tensor(loss_values))
         stat_agg.aggregators['loss_min'] = min(loss_values)
         stat_agg.aggregators['loss_max'] = max(loss_values)
         stat_agg.aggregators['loss_std'] = 0.0 if len(loss_values) <= 1 else torch.std(torch.tensor(loss_values))
@@ -434,6 +442,93 @@ class Worker(object):
         else:
             self.logger.warning('GPU flag is disabled, using CPU.')
 
+    def build_dataloader(self, problem, params):
+        """
+        Builds the ``DataLoader`` on top of a problem, using the ``dataloader`` configuration section.
+
+        .. note::
+
+            The ``batch_sampler`` can be selected by name, e.g.:
+
+                >>> dataloader:
+                >>>     batch_sampler:
+                >>>         name: LengthBucketBatchSampler
+                >>>         boundaries: [10, 15, 20]
+
+            In this case, the other parameters of the section are passed to the batch sampler (along with the \
+            lengths of the samples provided by ``problem.get_sample_lengths()``, the ``batch_size`` & \
+            ``drop_last``), and the ``shuffle`` & ``sampler`` parameters of the ``DataLoader`` are ignored.
+
+            If the problem reads whole batches at once (``problem.batch_getitem``), the lists of indices produced \
+            by the batch sampler are passed to its ``__getitem__`` (see ``BatchIndexSampler``).
+
+        :param problem: Problem.
+        :type problem: ``Problem``
+
+        :param params: Section of the configuration containing the ``problem`` & ``dataloader`` sections, \
+        e.g. ``self.params['training']``.
+
+        :return: ``DataLoader``.
+
+        """
+        dataloader_params = params['dataloader']
+        batch_size = params['problem']['batch_size']
+        batch_sampler = dataloader_params['batch_sampler']
+
+        if isinstance(batch_sampler, Mapping):
+            # Build the batch sampler from its configuration.
+            import miprometheus.utils.problems_utils as problems_utils
+            sampler_params = dict(batch_sampler)
+            name = sampler_params.pop('name', None)
+            if name is None or not name.endswith('BatchSampler') or name not in dir(problems_utils):
+                self.logger.error("Batch sampler '{}' not found in miprometheus.utils.problems_utils".format(name))
+                exit(-1)
+
+            sampler_params.setdefault('drop_last', dataloader_params['drop_last'])
+            batch_sampler = getattr(problems_utils, name)(problem.get_sample_lengths(), batch_size=batch_size,
+                                                          **sampler_params)
+            self.logger.info('Using the {} ({} batches per epoch)'.format(name, len(batch_sampler)))
+
+        if problem.batch_getitem:
+            # The problem reads whole batches at once: pass it the lists of indices of the batches.
+            from torch.utils.data.sampler import BatchSampler, RandomSampler, SequentialSampler
+            from miprometheus.utils.problems_utils.batch_index_sampler import BatchIndexSampler, unwrap_batch
+
+            if batch_sampler is None:
+                sampler = dataloader_params['sampler']
+                if sampler is None:
+                    sampler = RandomSampler(problem) if dataloader_params['shuffle'] else SequentialSampler(problem)
+                batch_sampler = BatchSampler(sampler, batch_size, dataloader_params['drop_last'])
+
+            return DataLoader(dataset=problem,
+                              batch_size=1,
+                              sampler=BatchIndexSampler(batch_sampler),
+                              num_workers=dataloader_params['num_workers'],
+                              collate_fn=unwrap_batch,
+                              pin_memory=dataloader_params['pin_memory'],
+                              timeout=dataloader_params['timeout'],
+                              worker_init_fn=problem.worker_init_fn)
+
+        if batch_sampler is not None:
+            return DataLoader(dataset=problem,
+                              batch_sampler=batch_sampler,
+                              num_workers=dataloader_params['num_workers'],
+                              collate_fn=problem.collate_fn,
+                              pin_memory=dataloader_params['pin_memory'],
+                              timeout=dataloader_params['timeout'],
+                              worker_init_fn=problem.worker_init_fn)
+
+        return DataLoader(dataset=problem,
+                          batch_size=batch_size,
+                          shuffle=dataloader_params['shuffle'],
+                          sampler=dataloader_params['sampler'],
+                          num_workers=dataloader_params['num_workers'],
+                          collate_fn=problem.collate_fn,
+                          pin_memory=dataloader_params['pin_memory'],
+                          drop_last=dataloader_params['drop_last'],
+                          timeout=dataloader_params['timeout'],
+                          worker_init_fn=problem.worker_init_fn)
+
     def predict_evaluate_collect(self, model, problem, data_dict, stat_col, episode, epoch=None):
         """
         Function that performs the following:
@@ -215,6 +215,8 @@ setup(
              'mip-grid-tester-cpu=miprometheus.workers.grid_tester_cpu:main',
              'mip-grid-tester-gpu=miprometheus.workers.grid_tester_gpu:main',
              'mip-grid-analyzer=miprometheus.workers.grid_analyzer:main',
+             'mip-grid-worker=miprometheus.workers.grid_queue_worker:main',
+             'mip-prepare-data=miprometheus.workers.data_preparer:main',
          ],
      },
 